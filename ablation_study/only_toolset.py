@@ -2,16 +2,15 @@ import os
 import sys
 import openai
 import json
-import requests
 from urllib.parse import quote
 from typing import List, Union
-from requests.exceptions import ProxyError
-from urllib3.exceptions import MaxRetryError
-import time
 import argparse
 from dotenv import load_dotenv
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "agent_core")))
 from evaluation_llm.evaluator import evaluate_csv  
+from http_client import fetch_data
+from hpo_graph import default_hpo_graph
 
 load_dotenv()
 
@@ -31,9 +30,8 @@ def is_id(s):
 
 def hpo_id(phenotype_name):
     url_name = f"https://ontology.jax.org/api/hp/search?q={quote(phenotype_name)}&page=0&limit=10"
-    response = requests.get(url_name)
-    if response.status_code == 200:
-        data = response.json()
+    data = fetch_data(url_name)
+    if data:
         for term in data.get('terms', []):
             name = term.get('name', '')
             synonyms = term.get('synonyms', [])
@@ -48,20 +46,6 @@ def get_phenotype_id(phenotype_term):
         return f"HP:{phenotype_term}"
     return hpo_id(phenotype_term)
 
-def fetch_data(url, headers=None, params=None, max_retries=3, delay=5):
-    for _ in range(max_retries):
-        try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except (MaxRetryError, ProxyError) as e:
-            print(f"Connection error: {e}. Retrying...")
-            time.sleep(delay)
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
-            break
-    return None
-
 def phenotypes_info_extractor(phenotype_term):
     phenotype_id = get_phenotype_id(phenotype_term)
     url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}"
@@ -89,6 +73,9 @@ def phenotypes_gene_extractor(phenotype_term):
 def phenotypes_parents_extractor(phenotype_term):
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        graph = default_hpo_graph()
+        if graph is not None and phenotype_id in graph:
+            return graph.describe(graph.parents(phenotype_id)) or "Not Found"
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/parents"
         data = fetch_data(url_id)
         if data:
@@ -101,6 +88,9 @@ def phenotypes_children_extractor(phenotype_term):
         phenotype_id=None
         results = []
         phenotype_id = get_phenotype_id(phenotype_term)
+        graph = default_hpo_graph()
+        if graph is not None and phenotype_id in graph:
+            return graph.describe(graph.children(phenotype_id)) or "Not Found"
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/children"
         data = fetch_data(url_id)
         if data:
@@ -113,6 +103,9 @@ def phenotypes_descendants_extractor(phenotype_term):
         results = []
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        graph = default_hpo_graph()
+        if graph is not None and phenotype_id in graph:
+            return graph.describe(graph.descendants(phenotype_id)) or "Not Found"
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/descendants"
         data = fetch_data(url_id)
         if data:
@@ -5,9 +5,9 @@ from langchain.agents import initialize_agent
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from typing import List, Union, Dict, Any, Optional
+from functools import partial
 from urllib.parse import urlencode, quote
-from urllib3.exceptions import MaxRetryError, ProxyError
-import requests
+import asyncio
 import json
 import time
 import re
@@ -15,24 +15,82 @@ import sys
 import os
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from http_client import fetch_data, afetch_data
+from tool_runtime import tool_run
+from negative_cache import known_missing, record_missing
+from gene_index import SUMMARY_BATCH, default_gene_index
+from deadline import fan_out
+from hpo_graph import default_hpo_graph
+from annotation_index import default_annotation_index
+from annotation_store import aannotation, ahpo_gene_id, annotation, hpo_gene_id
+from uniprot import match_protein_accession, protein_output
+import fuzzy_index
+import lexicon_snapshot
+import metrics
+
 load_dotenv()
 bioontology_api_key = os.getenv("BIOONTOLOGY_API_KEY")
 
 def is_id(s):
             return s.startswith("HP:") and s[3:].isdigit()    
 
+HPO_ID_RESOLUTIONS = metrics.Counter("bioragent_hpo_id_resolutions_total",
+                                     "Phenotype names resolved to HP IDs, by source (lexicon, fuzzy, search, miss).")
+
+_phenotype_indexes = None
+
+def _local_phenotype_indexes():
+    """The Phenotypes.csv lexicon snapshot and the fuzzy lexicon index, opened on first use."""
+    global _phenotype_indexes
+    if _phenotype_indexes is None:
+        _phenotype_indexes = (lexicon_snapshot.phenotypes(), fuzzy_index.load_index())
+    return _phenotype_indexes
+
+def local_hpo_id(phenotype_name):
+    """The HP ID of ``phenotype_name`` in Phenotypes.csv, exactly or as the closest fuzzy match, else None."""
+    lexicon, index = _local_phenotype_indexes()
+    match = lexicon.lookup(phenotype_name)
+    if match:
+        HPO_ID_RESOLUTIONS.inc(source="lexicon")
+        return match.ids[0]
+    if index is not None:
+        for candidate in index.search(phenotype_name, k=10):
+            if candidate.source == "phenotypes":
+                HPO_ID_RESOLUTIONS.inc(source="fuzzy")
+                return lexicon.ids_for(candidate.name)[0]
+    return None
+
+def _pick_hpo_id(data, phenotype_name):
+    for term in data.get('terms', []):
+        name = term.get('name', '')
+        synonyms = term.get('synonyms', [])
+        if phenotype_name.lower() in name.lower() or any(phenotype_name.lower() in synonym.lower() for synonym in synonyms):
+            return term.get('id')
+    return None
+
+def _hpo_search_url(phenotype_name):
+    return f"https://ontology.jax.org/api/hp/search?q={quote(phenotype_name)}&page=0&limit=10"
+
+def _hpo_id_from(data, phenotype_name):
+    if data is not None and not data.get('terms'):
+        # The search itself answered and found nothing: remember the miss.
+        record_missing("hpo_id", phenotype_name)
+    term_id = _pick_hpo_id(data, phenotype_name) if data else None
+    HPO_ID_RESOLUTIONS.inc(source="search" if term_id else "miss")
+    return term_id
+
 def hpo_id(phenotype_name):
-    url_name = f"https://ontology.jax.org/api/hp/search?q={quote(phenotype_name)}&page=0&limit=10"    
-    response = requests.get(url_name)   
-    if response.status_code == 200:
-        data = response.json()        
-        for term in data.get('terms', []):
-            name = term.get('name', '')
-            synonyms = term.get('synonyms', [])           
-            if phenotype_name.lower() in name.lower() or any(phenotype_name.lower() in synonym.lower() for synonym in synonyms):
-                return term.get('id')
-            else:
-                return None
+    term_id = local_hpo_id(phenotype_name)
+    if term_id or known_missing("hpo_id", phenotype_name):
+        return term_id
+    return _hpo_id_from(fetch_data(_hpo_search_url(phenotype_name)), phenotype_name)
+
+async def ahpo_id(phenotype_name):
+    term_id = local_hpo_id(phenotype_name)
+    if term_id or known_missing("hpo_id", phenotype_name):
+        return term_id
+    return _hpo_id_from(await afetch_data(_hpo_search_url(phenotype_name)), phenotype_name)
 
 def get_phenotype_id(phenotype_term):
         if is_id(phenotype_term):
@@ -41,37 +99,67 @@ def get_phenotype_id(phenotype_term):
             return f"HP:{phenotype_term}"
         return hpo_id(phenotype_term)
 
-def fetch_data(url, headers=None, params=None, max_retries=3, delay=5):
-    for _ in range(max_retries):
-        try:
-            response = requests.get(url, headers=headers, params=params)  
-            response.raise_for_status() 
-            time.sleep(0.4) 
-            return response.json() 
-        except (MaxRetryError, ProxyError) as e:
-            print(f"Connection error: {e}. Retrying...")
-            time.sleep(delay)  
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
-            break  
-    return None 
+async def aget_phenotype_id(phenotype_term):
+        if is_id(phenotype_term):
+            return phenotype_term
+        if phenotype_term.isdigit():
+            return f"HP:{phenotype_term}"
+        return await ahpo_id(phenotype_term)
+
+def _local_hpo_relatives(phenotype_id, relation):
+    """A term's ``relation`` ("parents", "children", ...) from the local HPO graph; None when the graph lacks the term."""
+    graph = default_hpo_graph()
+    if graph is None or phenotype_id not in graph:
+        return None
+    return graph.describe(getattr(graph, relation)(phenotype_id)) or "Not Found"
+
+def _local_entity(term, kind):
+    """The CURIE of a gene/disease/phenotype term in the offline annotation index, or None."""
+    index = default_annotation_index()
+    return index.resolve(term, kind) if index is not None and term else None
+
+def _local_annotations(entity_id, relation):
+    """An entity's associations (or a disease's phenotype ``categories``) from the offline annotation
+    index; None when there is no index or the entity is not in it."""
+    index = default_annotation_index()
+    if index is None or not entity_id:
+        return None
+    return index.categories(entity_id) if relation == "categories" else index.related(entity_id, relation)
 
 class PhenotypesInfoTool(BaseTool):
     name = "Phenotypes Info Extractor"
     description = "Use this tool to extract information from a given symptom/Phenotypes name"
+    @tool_run
     def _run(self, phenotype_term: str) -> str:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}"       
         data = fetch_data(url_id)
         return data if data else "Not Found"   
+
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> str:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}"
+        data = await afetch_data(url_id)
+        return data if data else "Not Found"
                    
 class PhenotypesParentsTool(BaseTool):
     name = "Phenotypes Parents Extractor"
     description = "Use this tool to extract parents from a given symptom/Phenotypes name"
+    @tool_run
     def _run(self, phenotype_term: str) -> str:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_hpo_relatives(phenotype_id, "parents")
+        if local is not None:
+            return local
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/parents"
         data = fetch_data(url_id)
         if data:
@@ -80,13 +168,33 @@ class PhenotypesParentsTool(BaseTool):
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> str:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_hpo_relatives(phenotype_id, "parents")
+        if local is not None:
+            return local
+        url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/parents"
+        data = await afetch_data(url_id)
+        if data:
+            return [{'id': item['id'], 'name': item['name'], 'descendantCount': item['descendantCount']} for item in data]
+        return "Not Found"
+
 class PhenotypesChildrenTool(BaseTool):
     name = "Phenotypes Childrens Extractor"
     description = "Use this tool to extract symptom/Phenotypes children from a given symptom/Phenotypes name"
+    @tool_run
     def _run(self, phenotype_term: str) -> str:
         phenotype_id=None
         results = []
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_hpo_relatives(phenotype_id, "children")
+        if local is not None:
+            return local
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/children"
         data = fetch_data(url_id)
         if data:
@@ -95,91 +203,149 @@ class PhenotypesChildrenTool(BaseTool):
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> str:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_hpo_relatives(phenotype_id, "children")
+        if local is not None:
+            return local
+        url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/children"
+        data = await afetch_data(url_id)
+        if data:
+            return [{'id': item['id'], 'name': item['name'], 'descendantCount': item['descendantCount']} for item in data]
+        return "Not Found"
+
 class PhenotypesDiseaseTool(BaseTool):
     name = "Phenotypes Disease Extractor"
     description = "Use this tool to extract diseases associated with the given phenotypes/symptom name"
+    @tool_run
     def _run(self, phenotype_term: str) -> Union[List[str], str]:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
-        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(phenotype_id))}"
-        data = fetch_data(url_annotation)     
-        if data and 'diseases' in data:
-            return data['diseases']
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_annotations(phenotype_id, "diseases")
+        if local is not None:
+            return local or "Not Found"
+        record = annotation(phenotype_id)
+        if record and record.diseases is not None:
+            return record.diseases
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> Union[List[str], str]:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_annotations(phenotype_id, "diseases")
+        if local is not None:
+            return local or "Not Found"
+        record = await aannotation(phenotype_id)
+        if record and record.diseases is not None:
+            return record.diseases
+        return "Not Found"
+
 class PhenotypesGeneTool(BaseTool):
     name = "Phenotypes Gene Extractor"
     description = "Use this tool to extract genes associated with a given phenotypes/symptom name."
+    @tool_run
     def _run(self, phenotype_term: str) -> Union[List[str], str]:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
-        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(phenotype_id))}"
-        data = fetch_data(url_annotation)    
-        if data and 'genes' in data:
-            return data['genes']
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_annotations(phenotype_id, "genes")
+        if local is not None:
+            return local or "Not Found"
+        record = annotation(phenotype_id)
+        if record and record.genes is not None:
+            return record.genes
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> Union[List[str], str]:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        local = _local_annotations(phenotype_id, "genes")
+        if local is not None:
+            return local or "Not Found"
+        record = await aannotation(phenotype_id)
+        if record and record.genes is not None:
+            return record.genes
+        return "Not Found"
+
 class GenePhenotypesTool(BaseTool):
     name = "Gene Phenotypes Extractor"
     description = "Use this tool to extract Phenotypes associated with a gene for a given term"
+    @tool_run
     def _run(self, gene_term: str) -> Union[List[str], str]:
-        gene_id = None
-
-        def is_gene_id(s):
-            return s.startswith("NCBIGene:") and s[9:].isdigit()
-        if is_gene_id(gene_term):
-            gene_id = gene_term
-        elif gene_term.isdigit():
-            gene_id = f"NCBIGene:{gene_term}"
-        else:
-            url_name = f"https://ontology.jax.org/api/network/search/gene?q={quote(gene_term)}&page=0&limit=10"
-            response = fetch_data(url_name)
-            if response and 'results' in response and len(response['results']) > 0:
-                gene_id = response['results'][0]['id']
-            else:
-                return "Not Found"
+        local = _local_annotations(_local_entity(gene_term, "gene"), "phenotypes")
+        if local is not None:
+            return local or "Not Found"
+        gene_id = hpo_gene_id(gene_term)
         if gene_id is None:
             return "Not Found"
-        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(gene_id))}"
-        response = fetch_data(url_annotation)
-        if response and 'phenotypes' in response:
-            return response['phenotypes']
+        record = annotation(gene_id)
+        if record and record.phenotypes is not None:
+            return record.phenotypes
 
         return "Not Found"   
+
+    @tool_run
+    async def _arun(self, gene_term: str) -> Union[List[str], str]:
+        local = _local_annotations(_local_entity(gene_term, "gene"), "phenotypes")
+        if local is not None:
+            return local or "Not Found"
+        gene_id = await ahpo_gene_id(gene_term)
+        if gene_id is None:
+            return "Not Found"
+        record = await aannotation(gene_id)
+        if record and record.phenotypes is not None:
+            return record.phenotypes
+        return "Not Found"
     
 class GeneDiseaseTool(BaseTool):
     name = "Gene Diseases Extractor"
     description = "Use this tool to extract Diseases associated with a gene for a given term"
-    def _run(self, gene_term: str) -> Union[List[str], str]:        
-        gene_id = None
-        def is_gene_id(s):
-            return s.startswith("NCBIGene:") and s[9:].isdigit()
-
-        if is_gene_id(gene_term):
-            gene_id = gene_term
-        elif gene_term.isdigit():
-            gene_id = f"NCBIGene:{gene_term}"
-        else:
-            url_name = f"https://ontology.jax.org/api/network/search/gene?q={quote(gene_term)}&page=0&limit=10"
-            response = fetch_data(url_name)
-            if response and 'results' in response and len(response['results']) > 0:
-                gene_id = response['results'][0]['id']
-            else:
-                return "Not Found" 
+    @tool_run
+    def _run(self, gene_term: str) -> Union[List[str], str]:
+        local = _local_annotations(_local_entity(gene_term, "gene"), "diseases")
+        if local is not None:
+            return local or "Not Found"
+        gene_id = hpo_gene_id(gene_term)
+        if gene_id is None:
+            return "Not Found"
+        record = annotation(gene_id)
+        if record and record.diseases is not None:
+            return record.diseases
+        return "Not Found"
+
+    @tool_run
+    async def _arun(self, gene_term: str) -> Union[List[str], str]:
+        local = _local_annotations(_local_entity(gene_term, "gene"), "diseases")
+        if local is not None:
+            return local or "Not Found"
+        gene_id = await ahpo_gene_id(gene_term)
         if gene_id is None:
             return "Not Found"
-        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(gene_id))}"
-        response = fetch_data(url_annotation)
-        if response and 'diseases' in response:
-            return response['diseases']
+        record = await aannotation(gene_id)
+        if record and record.diseases is not None:
+            return record.diseases
         return "Not Found"
 
 class DiseasePhenotypesTool(BaseTool):
     name = "Disease Phenotypes Extractor"
     description = "Use this tool to extract the phenotypes associated with the given disease name."
+    @tool_run
     def _run(self, disease_term: str) -> Union[str, None]:
+            local = _local_annotations(_local_entity(disease_term, "disease"), "categories")
+            if local is not None:
+                return local or "Not Found"
             disease_id=None
             def is_disease_id(s):
                  return (s.startswith("OMIM:") and s[5:].isdigit()) or (s.startswith("ORPHA:") and s[6:].isdigit())
@@ -187,39 +353,60 @@ class DiseasePhenotypesTool(BaseTool):
                 if is_disease_id(disease_term):
                     disease_id=disease_term
                 else:
-                    url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(str(disease_id))}&page=0&limit=10"
+                    url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_term)}&page=0&limit=10"
                     response = fetch_data(url_name) 
-                    if response and 'results' in response:
+                    if response and response.get('results'):
                         disease_name = response['results'][0]['name']
                         if disease_name.lower() == disease_term.lower():
                             disease_id = response['results'][0]['id']                                       
                 if disease_id is None:
                     return "Not Found"
-                url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(disease_id))}"
-                response = fetch_data(url_annotation) 
-                if response and 'categories' in response:
-                    return response['categories']
+                record = annotation(disease_id)
+                if record and record.categories is not None:
+                    return record.categories
                 else:
                     return "Not Found"
             else:
                 disease_id = f"OMIM:{disease_term}"
-                url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(disease_id)}"
-                response = fetch_data(url_annotation)  
-                if response and 'categories' in response:
-                    return response['categories']
+                record = annotation(disease_id)
+                if record and record.categories is not None:
+                    return record.categories
                 else:
                     disease_id = f"ORPHA:{disease_term}"
-                    url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(disease_id)}"
-                    response = fetch_data(url_annotation) 
-                    if response and 'categories' in response:
-                        return response['categories']
+                    record = annotation(disease_id)
+                    if record and record.categories is not None:
+                        return record.categories
                     else:
                         return "Not Found"                 
+
+    @tool_run
+    async def _arun(self, disease_term: str) -> Union[str, None]:
+        local = _local_annotations(_local_entity(disease_term, "disease"), "categories")
+        if local is not None:
+            return local or "Not Found"
+        if disease_term.isdigit():
+            candidates = [f"OMIM:{disease_term}", f"ORPHA:{disease_term}"]
+        elif (disease_term.startswith("OMIM:") and disease_term[5:].isdigit()) or \
+                (disease_term.startswith("ORPHA:") and disease_term[6:].isdigit()):
+            candidates = [disease_term]
+        else:
+            url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_term)}&page=0&limit=10"
+            response = await afetch_data(url_name)
+            candidates = []
+            if response and response.get('results') and \
+                    response['results'][0]['name'].lower() == disease_term.lower():
+                candidates = [response['results'][0]['id']]
+        for disease_id in candidates:
+            record = await aannotation(disease_id)
+            if record and record.categories is not None:
+                return record.categories
+        return "Not Found"
                
 class ProteinInfoTool(BaseTool):
     name = "Protein Information Extractor"
     description = "Use this tool to extract protein information from UniProt API"
 
+    @tool_run
     def _run(self, term: str) -> Optional[str]:
         search_url = f'https://rest.uniprot.org/uniprotkb/search?query={term}'
         base_url = "https://www.ebi.ac.uk/proteins/api/proteins"
@@ -227,197 +414,249 @@ class ProteinInfoTool(BaseTool):
         if not search_response:
             print(f"Error: Unable to fetch data from UniProt.")
             return None
+        protein_id = match_protein_accession(term, search_response)
+        if protein_id:
+            protein_response = fetch_data(f"{base_url}/{protein_id}")
+            if not protein_response:
+                print(f"Error: Unable to fetch detailed protein information for '{protein_id}'.")
+                return None
+            return protein_output(protein_response)
+        print(f"No matching protein found for '{term}'.")
+        return None
 
-        for entry in search_response.get('results', []):
-            primary_accession = entry.get('primaryAccession', '')
-            uni_protkb_id = entry.get('uniProtkbId', '')
-            recommended_name = entry.get('proteinDescription', {}).get('recommendedName', {}).get('fullName', {}).get('value', '')
-            alternative_names = [
-                name.get('fullName', {}).get('value', '') 
-                for name in entry.get('proteinDescription', {}).get('alternativeNames', [])
-            ]
-
-            if term.lower() in (primary_accession.lower(), *map(str.lower, alternative_names)) or \
-               f"{term}_HUMAN".lower() == uni_protkb_id.lower():
-                protein_id = primary_accession
-                protein_url = f"{base_url}/{protein_id}"
-
-                protein_response = fetch_data(protein_url)
-                if not protein_response:
-                    print(f"Error: Unable to fetch detailed protein information for '{protein_id}'.")
-                    return None
-                comment_types = {
-                    "FUNCTION": [],
-                    "PTM": [],
-                    "SUBUNIT": [],
-                    "INTERACTION": [],
-                    "TISSUE_SPECIFICITY": [],
-                    "MASS_SPECTROMETRY": [],
-                    "DISEASE": [],
-                    "POLYMORPHISM": [],
-                    "MISCELLANEOUS": [],
-                    "SIMILARITY": [],
-                    "CAUTION": []
-                }
-
-                for comment in protein_response.get('comments', []):
-                    comment_type = comment.get('type')
-                    if comment_type in comment_types:
-                        if comment_type == "INTERACTION":
-                            comment_types[comment_type].extend(comment.get('interactions', []))
-                        elif comment_type == "MASS_SPECTROMETRY":
-                            comment_types[comment_type].append({
-                                "type": comment.get('type'),
-                                "molecule": comment.get('molecule'),
-                                "method": comment.get('method'),
-                                "mass": comment.get('mass'),
-                                "error": comment.get('error')
-                            })
-                        elif comment_type == "DISEASE":
-                            comment_types[comment_type].append({
-                                "type": comment.get('type'),
-                                "diseaseId": comment.get('diseaseId'),
-                                "acronym": comment.get('acronym'),
-                                "dbReference": comment.get('dbReference'),
-                                "description": comment.get('description', {}).get('value', '')
-                            })
-                        else:
-                            comment_types[comment_type].extend(
-                                text.get('value', '') for text in comment.get('text', []) if isinstance(text, dict)
-                            )
-
-                output = {
-                    "id": protein_response.get("id"),
-                    "accession": protein_response.get("accession"),
-                    "secondaryAccession": protein_response.get("secondaryAccession"),
-                    "protein": protein_response.get("protein"),
-                    "alternativeName": protein_response.get("alternativeName"),
-                    "gene": protein_response.get("gene"),
-                    "comments": comment_types,
-                    "sequence": protein_response.get("sequence", {}).get("sequence", "")
-                }
-                return json.dumps(output, indent=4)
-
+    @tool_run
+    async def _arun(self, term: str) -> Optional[str]:
+        search_url = f'https://rest.uniprot.org/uniprotkb/search?query={term}'
+        base_url = "https://www.ebi.ac.uk/proteins/api/proteins"
+        search_response = await afetch_data(search_url)
+        if not search_response:
+            print(f"Error: Unable to fetch data from UniProt.")
+            return None
+        protein_id = match_protein_accession(term, search_response)
+        if protein_id:
+            protein_response = await afetch_data(f"{base_url}/{protein_id}")
+            if not protein_response:
+                print(f"Error: Unable to fetch detailed protein information for '{protein_id}'.")
+                return None
+            return protein_output(protein_response)
         print(f"No matching protein found for '{term}'.")
         return None
     
+GENE_SYMBOL_URL = "https://api.ncbi.nlm.nih.gov/datasets/v2alpha/gene/symbol/{}/taxon/9606"
+GENE_SUMMARY_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+ENSEMBL_SYMBOL_URL = "https://grch37.rest.ensembl.org/lookup/symbol/homo_sapiens/{}?"
+
+def _gene_terms(search_term):
+    if isinstance(search_term, list):
+        search_term = ','.join(search_term)
+    return [term.strip() for term in search_term.split(',')]
+
+def _local_gene_records(term):
+    index = default_gene_index()
+    return index.lookup(term) if index else []
+
+def _gene_symbol_headers():
+    return {"accept": "application/json", "api-key": os.getenv("NCBI_API_KEY")}
+
+def _symbol_gene_id(response):
+    if response and 'reports' in response:
+        return str(response['reports'][0]['gene']['gene_id'])
+    return None
+
+def _resolve_gene_id(term):
+    if term.isdigit():
+        return term
+    return _symbol_gene_id(fetch_data(GENE_SYMBOL_URL.format(term), headers=_gene_symbol_headers()))
+
+async def _aresolve_gene_id(term):
+    if term.isdigit():
+        return term
+    return _symbol_gene_id(await afetch_data(GENE_SYMBOL_URL.format(term), headers=_gene_symbol_headers()))
+
+def _summary_batches(local, gene_ids):
+    """esummary parameters covering every resolved gene and every indexed gene still missing a summary,
+    SUMMARY_BATCH IDs per request so the URL stays within what E-utilities accepts for a GET."""
+    ids = [record.gene_id for records in local.values() for record in records
+           if not record.summary and record.gene_id.isdigit()]
+    ids = list(dict.fromkeys(ids + [gene_id for gene_id in gene_ids.values() if gene_id]))
+    return [{'db': 'gene', 'id': ','.join(ids[i:i + SUMMARY_BATCH]), 'retmode': 'json'}
+            for i in range(0, len(ids), SUMMARY_BATCH)]
+
+def _merged_summaries(responses):
+    """The esummary documents of all batches by gene ID; IDs esummary could not find are left out."""
+    fetched = {}
+    for response in responses:
+        for gene_id, document in ((response or {}).get('result') or {}).items():
+            if gene_id != 'uids' and isinstance(document, dict) and 'error' not in document:
+                fetched[gene_id] = document
+    return fetched
+
+def _local_gene_info(records, fetched):
+    """An esummary-shaped result for indexed genes, preferring documents fetched for them."""
+    summaries = {record.gene_id: fetched[record.gene_id].get('summary', '') for record in records
+                 if record.gene_id in fetched}
+    if any(summaries.values()):
+        # Keep them, so the next lookup of these genes needs no network call at all.
+        default_gene_index().set_summaries({gene_id: summary for gene_id, summary in summaries.items() if summary})
+    gene_info = {'uids': [record.gene_id for record in records]}
+    for record in records:
+        gene_info[record.gene_id] = fetched.get(record.gene_id) or record.esummary()
+    return gene_info
+
+def _ensembl_misses(gene_ids, fetched):
+    """Terms whose gene ID was resolved but got no esummary document; they fall back to Ensembl."""
+    return [term for term, gene_id in gene_ids.items() if gene_id and gene_id not in fetched]
+
+def _gene_information(search_terms, local, gene_ids, fetched, ensembl):
+    gene_information_dict = {}
+    for term in search_terms:
+        if local.get(term):
+            gene_information_dict[term] = _local_gene_info(local[term], fetched)
+        elif gene_ids.get(term) in fetched:
+            gene_id = gene_ids[term]
+            gene_information_dict[term] = {'uids': [gene_id], gene_id: fetched[gene_id]}
+        elif ensembl.get(term):
+            gene_information_dict[term] = ensembl[term]
+    return gene_information_dict or "Not Found"
+
 class GeneInfoTool(BaseTool):
     name = "Gene Information Tool"
     description = "Use this tool to fetch gene information with given gene name."
+    # Genes come from the local gene index when it has them; the rest are resolved to GeneIDs
+    # concurrently and every ID is summarized by one esummary call per SUMMARY_BATCH genes.
+    @tool_run
     def _run(self, search_term: Union[str, List[str]]) -> str:
-        base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
-        search_url = base_url + 'esearch.fcgi'
-        summary_url = base_url + 'esummary.fcgi'
-        base_url_gene = "https://api.ncbi.nlm.nih.gov/datasets/v2alpha/gene/symbol/"
-        headers = {
-            "accept": "application/json",
-            "api-key": os.getenv("NCBI_API_KEY")
+        search_terms = _gene_terms(search_term)
+        local = {term: _local_gene_records(term) for term in search_terms}
+        remote = [term for term in dict.fromkeys(search_terms) if not local[term]]
+        gene_ids = dict(zip(remote, fan_out([partial(_resolve_gene_id, term) for term in remote])))
+        fetched = _merged_summaries(fan_out([partial(fetch_data, GENE_SUMMARY_URL, params=params)
+                                             for params in _summary_batches(local, gene_ids)]))
+        misses = _ensembl_misses(gene_ids, fetched)
+        ensembl = dict(zip(misses, fan_out([partial(fetch_data, ENSEMBL_SYMBOL_URL.format(term),
+                                                    headers={"Content-Type": "application/json"})
+                                            for term in misses])))
+        return _gene_information(search_terms, local, gene_ids, fetched, ensembl)
+
+    @tool_run
+    async def _arun(self, search_term: Union[str, List[str]]) -> str:
+        search_terms = _gene_terms(search_term)
+        local = {term: _local_gene_records(term) for term in search_terms}
+        remote = [term for term in dict.fromkeys(search_terms) if not local[term]]
+        gene_ids = dict(zip(remote, await asyncio.gather(*(_aresolve_gene_id(term) for term in remote))))
+        fetched = _merged_summaries(await asyncio.gather(*(afetch_data(GENE_SUMMARY_URL, params=params)
+                                                          for params in _summary_batches(local, gene_ids))))
+        misses = _ensembl_misses(gene_ids, fetched)
+        ensembl = dict(zip(misses, await asyncio.gather(*(afetch_data(ENSEMBL_SYMBOL_URL.format(term),
+                                                                      headers={"Content-Type": "application/json"})
+                                                          for term in misses))))
+        return _gene_information(search_terms, local, gene_ids, fetched, ensembl)
+
+
+def _parse_bioontology_info(response, disease_name):
+    if response:
+        collection = response.get('collection', [])
+        for item in collection:
+            if disease_name.lower() in [item.get('prefLabel', '').lower()] + \
+                    [syn.lower() for syn in item.get('synonym', [])]:
+                return {
+                    'prefLabel': item.get('prefLabel', ''),
+                    'synonym': item.get('synonym', []),
+                    'definition': item.get('definition', [])
+                }
+    return None
+
+def _parse_orpha_info(response, disease_name):
+    if response and "data" in response and "results" in response["data"]:
+        data = response["data"]["results"]
+        return {
+            "ORPHAcode": data.get("ORPHAcode", ""),
+            "preferredTerm": data.get("Preferred term", ""),
+            "summary": (
+                data.get("SummaryInformation")[0].get("Definition", "")
+                if isinstance(data.get("SummaryInformation"), list) and len(data.get("SummaryInformation")) > 0
+                else ""
+            ),
+            "Synonym": data.get("Synonym", [])
         }
-        if isinstance(search_term, list):
-            search_term = ','.join(search_term)
-        search_terms = [term.strip() for term in search_term.split(',')]
-        gene_information_dict = {}
-
-        def fetch_gene_id(term: str) -> Optional[str]:
-            """Fetch gene ID for a given term."""
-            if term.isdigit():
-                return term
-            url = f"{base_url_gene}{term}/taxon/9606"
-            response = fetch_data(url, headers=headers)
-            if response and 'reports' in response:
-                return response['reports'][0]['gene']['gene_id']
-            return None
-
-        def fetch_gene_info(gene_id: str) -> Optional[dict]:
-            """Fetch detailed gene information using gene ID."""
-            search_params = {'db': 'gene', 'term': gene_id, 'retmode': 'json'}
-            search_response = fetch_data(search_url, params=search_params)
-            if search_response and 'esearchresult' in search_response:
-                gene_ids = search_response['esearchresult'].get('idlist', [])
-                if gene_ids:
-                    summary_params = {'db': 'gene', 'id': ','.join(gene_ids), 'retmode': 'json'}
-                    summary_response = fetch_data(summary_url, params=summary_params)
-                    if summary_response and 'result' in summary_response:
-                        return summary_response['result']
-            return None
-        for term in search_terms:
-            gene_id = fetch_gene_id(term)
-            if gene_id:
-                gene_info = fetch_gene_info(gene_id)
-                if gene_info:
-                    gene_information_dict[term] = gene_info
-                else:
-                    server = "https://grch37.rest.ensembl.org"
-                    ext = f"/lookup/symbol/homo_sapiens/{term}?"
-                    response = fetch_data(server + ext, headers={"Content-Type": "application/json"})
-                    if response:
-                        gene_information_dict[term] = response
-        if not gene_information_dict:
-            return "Not Found"
-        return json.dumps(gene_information_dict, indent=4)
-
+    return None
+
+def _parse_hpo_disease_info(response, disease_name):
+    if response and response.get("results"):
+        data = response["results"][0]
+        return {
+            "id": data.get("id", ""),
+            "name": data.get("name", ""),
+            "mondoId": data.get("mondoId", ""),
+            "description": data.get("description", [])
+        }
+    return None
+
+def _disease_info_sources(disease_name):
+    """(source, url, headers, parser) for every source DiseaseInfoTool combines."""
+    return [
+        ('Bioontology', f'https://data.bioontology.org/search?q={disease_name}',
+         {'Authorization': f'apikey token={bioontology_api_key}'}, _parse_bioontology_info),
+        ('Orpha', f"https://api.orphadata.com/rd-cross-referencing/orphacodes/names/{quote(disease_name)}?lang=en",
+         None, _parse_orpha_info),
+        ('HPO', f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_name)}&page=0&limit=10",
+         None, _parse_hpo_disease_info),
+    ]
 
 class DiseaseInfoTool(BaseTool):
     name = "Disease Information Extractor"
     description = "Use this tool to extract detailed disease information in JSON format for a given term"
+    @tool_run
     def _run(self, disease_name: str) -> Union[str, None]:
-        def fetch_bioontology_info(disease_name):
-            url = f'https://data.bioontology.org/search?q={disease_name}'
-            headers = {'Authorization': 'apikey token={bioontology_api_key}'}
-            response = fetch_data(url, headers=headers)
-            if response:
-                collection = response.get('collection', [])
-                for item in collection:
-                    if disease_name.lower() in [item.get('prefLabel', '').lower()] + \
-                            [syn.lower() for syn in item.get('synonym', [])]:
-                        return {
-                            'prefLabel': item.get('prefLabel', ''),
-                            'synonym': item.get('synonym', []),
-                            'definition': item.get('definition', [])
-                        }
-            return None
-
-        def fetch_orpha_info(disease_name):
-            url = f"https://api.orphadata.com/rd-cross-referencing/orphacodes/names/{quote(disease_name)}?lang=en"
-            response = fetch_data(url)
-            if response and "data" in response and "results" in response["data"]:
-                data = response["data"]["results"]
-                return {
-                    "ORPHAcode": data.get("ORPHAcode", ""),
-                    "preferredTerm": data.get("Preferred term", ""),
-                    "summary": (
-                        data.get("SummaryInformation")[0].get("Definition", "")
-                        if isinstance(data.get("SummaryInformation"), list) and len(data.get("SummaryInformation")) > 0
-                        else ""
-                    ),
-                    "Synonym": data.get("Synonym", [])
-                }
-            return None
+        combined_result = {
+            source: parse(fetch_data(url, headers=headers), disease_name)
+            for source, url, headers, parse in _disease_info_sources(disease_name)
+        }
+        combined_result = {key: value for key, value in combined_result.items() if value}
+        return combined_result if combined_result else "Not Found"
 
-        def fetch_hpo_info(disease_name):
-            url = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_name)}&page=0&limit=10"
-            response = fetch_data(url)
-            if response and response.get("results"):
-                data = response["results"][0]
-                return {
-                    "id": data.get("id", ""),
-                    "name": data.get("name", ""),
-                    "mondoId": data.get("mondoId", ""),
-                    "description": data.get("description", [])
-                }
-            return None
+    @tool_run
+    async def _arun(self, disease_name: str) -> Union[str, None]:
+        sources = _disease_info_sources(disease_name)
+        responses = await asyncio.gather(*(afetch_data(url, headers=headers) for _, url, headers, _ in sources))
         combined_result = {
-            'Bioontology': fetch_bioontology_info(disease_name),
-            'Orpha': fetch_orpha_info(disease_name),
-            'HPO': fetch_hpo_info(disease_name)
+            source: parse(response, disease_name)
+            for (source, _, _, parse), response in zip(sources, responses)
         }
         combined_result = {key: value for key, value in combined_result.items() if value}
         return combined_result if combined_result else "Not Found"
 
+def _omim_gene_symbols(summary_response):
+    """Gene symbols are the last ';'-separated part of each OMIM esummary title."""
+    annotation_result = []
+    for uid in summary_response['result']['uids']:
+        title = summary_response['result'][uid]['title']
+        parts = title.split(';')
+        if len(parts) > 1:
+            annotation_result.append(parts[-1].strip())
+    return annotation_result
+
+def _disease_search_url(disease_name):
+    return f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_name)}&page=0&limit=10"
+
+def _pick_disease_id(response, disease_name):
+    if response and response.get('results'):
+        for item in response['results']:
+            if item['name'].lower() == disease_name.lower():
+                return item['id']
+    return None
+
+def _remember_disease_gene_miss(disease_term, name_search, omim_search):
+    """Record a name that both the HPO disease search and the OMIM esearch answered with nothing."""
+    if name_search is not None and not name_search.get('results') and omim_search is not None \
+            and not omim_search.get('esearchresult', {}).get('idlist'):
+        record_missing("disease_genes", disease_term)
+
 class DiseaseGeneTool(BaseTool):
     name = "Disease Gene Extractor"
     description = "Use this tool to extract genes associated with a given disease."
 
+    @tool_run
     def _run(self, disease_term: str) -> Union[str, None]:
         def is_disease_id(s: str) -> bool:
             """Check if the string is a disease ID (OMIM or ORPHA)."""
@@ -425,21 +664,14 @@ class DiseaseGeneTool(BaseTool):
 
         def fetch_genes_by_id(disease_id: str) -> Optional[List[str]]:
             """Fetch genes associated with a disease ID."""
-            url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(disease_id)}"
-            response = fetch_data(url_annotation)
-            return response.get('genes', []) if response else None
-
-        def fetch_disease_id_by_name(disease_name: str) -> Optional[str]:
-            """Fetch disease ID by name."""
-            url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_name)}&page=0&limit=10"
-            response = fetch_data(url_name)
-            if response and 'results' in response and response['results']:
-                for item in response['results']:
-                    if item['name'].lower() == disease_name.lower():
-                        return item['id']
-            return None
-        
-        annotation_result = []
+            record = annotation(disease_id)
+            return (record.genes or []) if record else None
+
+        # An indexed disease without genes still gets the OMIM esearch fallback below.
+        local = _local_annotations(_local_entity(disease_term, "disease"), "genes")
+        if local:
+            return local
+        name_search = None
         if disease_term.isdigit():
             disease_id = f"OMIM:{disease_term}"
             genes = fetch_genes_by_id(disease_id)
@@ -454,7 +686,10 @@ class DiseaseGeneTool(BaseTool):
             if genes:
                 return genes
         else:
-            disease_id = fetch_disease_id_by_name(disease_term)
+            if known_missing("disease_genes", disease_term):
+                return "Not Found"
+            name_search = fetch_data(_disease_search_url(disease_term))
+            disease_id = _pick_disease_id(name_search, disease_term)
             if disease_id:
                 genes = fetch_genes_by_id(disease_id)
                 if genes:
@@ -470,18 +705,53 @@ class DiseaseGeneTool(BaseTool):
             summary_params = {'db': 'omim', 'id': ','.join(gene_ids), 'retmode': 'json'}
             summary_response = fetch_data(summary_url, params=summary_params)
             if summary_response and 'result' in summary_response and 'uids' in summary_response['result']:
-                for uid in summary_response['result']['uids']:
-                    title = summary_response['result'][uid]['title']
-                    parts = title.split(';')
-                    if len(parts) > 1:
-                        annotation_result.append(parts[-1].strip())
-                return annotation_result
+                return _omim_gene_symbols(summary_response)
+        _remember_disease_gene_miss(disease_term, name_search, search_response)
+        return "Not Found"
+
+    @tool_run
+    async def _arun(self, disease_term: str) -> Union[str, None]:
+        async def fetch_genes_by_id(disease_id: str) -> Optional[List[str]]:
+            record = await aannotation(disease_id)
+            return (record.genes or []) if record else None
+
+        local = _local_annotations(_local_entity(disease_term, "disease"), "genes")
+        if local:
+            return local
+        name_search = None
+        if disease_term.isdigit():
+            candidates = [f"OMIM:{disease_term}", f"ORPHA:{disease_term}"]
+        elif (disease_term.startswith("OMIM:") and disease_term[5:].isdigit()) or \
+                (disease_term.startswith("ORPHA:") and disease_term[6:].isdigit()):
+            candidates = [disease_term]
+        else:
+            if known_missing("disease_genes", disease_term):
+                return "Not Found"
+            name_search = await afetch_data(_disease_search_url(disease_term))
+            disease_id = _pick_disease_id(name_search, disease_term)
+            candidates = [disease_id] if disease_id else []
+        for disease_id in candidates:
+            genes = await fetch_genes_by_id(disease_id)
+            if genes:
+                return genes
+
+        base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+        search_params = {'db': 'omim', 'term': disease_term, 'retmode': 'json'}
+        search_response = await afetch_data(base_url + 'esearch.fcgi', params=search_params)
+        if search_response and 'esearchresult' in search_response and 'idlist' in search_response['esearchresult']:
+            gene_ids = search_response['esearchresult']['idlist']
+            summary_params = {'db': 'omim', 'id': ','.join(gene_ids), 'retmode': 'json'}
+            summary_response = await afetch_data(base_url + 'esummary.fcgi', params=summary_params)
+            if summary_response and 'result' in summary_response and 'uids' in summary_response['result']:
+                return _omim_gene_symbols(summary_response)
+        _remember_disease_gene_miss(disease_term, name_search, search_response)
         return "Not Found"
 
 
 class SNPInfoTool(BaseTool):
     name = "SNP Information Extractor"
     description = "Use this tool to extract detailed SNP information in JSON format for a given term"
+    @tool_run
     def _run(self, snp_term: str) -> Union[dict, None]:
         base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
         search_url = base_url + 'esearch.fcgi'
@@ -509,6 +779,24 @@ class SNPInfoTool(BaseTool):
             print("Failed to retrieve SNP summary information.")
             return None
         return summary_response
+
+    @tool_run
+    async def _arun(self, snp_term: str) -> Union[dict, None]:
+        base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+        search_params = {'db': 'snp', 'term': snp_term, 'retmode': 'json'}
+        search_response = await afetch_data(base_url + 'esearch.fcgi', params=search_params)
+        if not search_response:
+            return "Request failed or no results found"
+        snp_ids = search_response.get('esearchresult', {}).get('idlist', [])
+        if not snp_ids:
+            print(f"No results found for '{snp_term}'.")
+            return None
+        summary_params = {'db': 'snp', 'id': ','.join(snp_ids), 'retmode': 'json'}
+        summary_response = await afetch_data(base_url + 'esummary.fcgi', params=summary_params)
+        if not summary_response:
+            print("Failed to retrieve SNP summary information.")
+            return None
+        return summary_response
    
 sys_msg =  """
 You are an AI database administrator supported by the Human Phenotype Ontology ,UniProt and NCBI database. 
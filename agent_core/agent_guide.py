@@ -2,158 +2,457 @@ from langchain.agents import initialize_agent
 from langchain.chains.conversation.memory import ConversationBufferWindowMemory
 from langchain.tools import BaseTool
 from langchain_community.chat_models import ChatOpenAI
-from urllib.parse import quote
+from urllib.parse import quote, urlsplit
 import requests
-import csv
-import pandas as pd
+import httpx
 from typing import Optional, List, Union, Dict, Any
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import re
+from collections import Counter
 import os
+import json
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from http_client import http_get, ahttp_get
+from deadline import afan_out, budget_executor, check_deadline, fan_out
+import lexicon_snapshot
+import fuzzy_index
+import gene_index
+from annotation_index import default_annotation_index
+import entity_patterns
+from tool_runtime import Uncached, cached_call, remember_call, tool_run
+from negative_cache import known_missing, record_missing
+from rate_limit import limiter_for
+
 load_dotenv()
 
+# ExistenceCheckTool's gene, protein and SNP probes run concurrently: each HTTP
+# call is capped at PROBE_TIMEOUT seconds and the whole fan-out at PROBE_DEADLINE
+# (plus, for a batch, the time the rate limits need to let all its probes through).
+PROBE_TIMEOUT = float(os.getenv("BIORAGENT_PROBE_TIMEOUT", "10"))
+PROBE_DEADLINE = float(os.getenv("BIORAGENT_PROBE_DEADLINE", "15"))
+
 class ExistenceCheckTool(BaseTool):
     name = "ExistenceCheckTool"
-    description = "Check if the provided name exists in the database"
+    description = ("Check if the provided name exists in the database. Several names can be checked in one call "
+                   "by separating them with '; '; the result then maps each name to its types as JSON")
     
-    disease_dict: Optional[Dict[str, str]] = None  
-    pheno_dict: Optional[Dict[str, str]] = None
-    orphat_dict: Optional[Dict[str, str]] = None
+    # Lexicon or lexicon_snapshot.CompiledLexicon
+    disease_lexicon: Optional[Any] = None
+    pheno_lexicon: Optional[Any] = None
+    orphat_lexicon: Optional[Any] = None
+    fuzzy_index: Optional[Any] = None  # fuzzy_index.FuzzyIndex, None when disabled
+    gene_index: Optional[Any] = None  # gene_index.GeneIndex, None until one has been ingested
 
     def __init__(self, **data: Any):
         super().__init__(**data) 
 
-        if self.disease_dict is None: 
-            self.disease_dict = self.load_disease_data('agent_core/disease_ontology.csv')
-            self.pheno_dict = self.load_pheno_data('agent_core/Phenotypes.csv')
-            self.orphat_dict = self.load_orphat_data('agent_core/orphat.csv')
-
-    def load_disease_data(self, file_path):
-        disease_dict = {}
-        df = pd.read_csv(file_path)
-        for index, row in df.iterrows():
-            lbl = row['lbl'].lower()
-            disease_id = row['id'].lower()  
-            synonyms = row['synonyms'].lower().split(', ') if pd.notna(row['synonyms']) else []
-            disease_dict[lbl] = disease_id
-            for synonym in synonyms:
-                disease_dict[synonym] = disease_id
-        return disease_dict  
-
-    def load_orphat_data(self, file_path):
-        orphat_dict = {}
-        with open(file_path, mode='r', encoding='gbk') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                orphat_code = row['ORPHAcode'].lower()
-                preferred_term = row['Preferred term'].lower()
-                orphat_dict[orphat_code] = preferred_term
-        return orphat_dict 
-    
+        if self.disease_lexicon is None: 
+            self.disease_lexicon = lexicon_snapshot.disease_ontology()
+            self.pheno_lexicon = lexicon_snapshot.phenotypes()
+            self.orphat_lexicon = lexicon_snapshot.orphanet()
+            self.fuzzy_index = fuzzy_index.load_index()
+            self.gene_index = gene_index.default_gene_index()
 
-    def load_pheno_data(self, file_path):
-        pheno_dict = {}
-        df = pd.read_csv(file_path)
-        for index, row in df.iterrows():
-                id_key = row['ID'].lower() 
-                name_value = row['Name'].lower().split(', ')
-                for name in name_value:
-                    pheno_dict[name] = id_key  
-        return pheno_dict  
+    @staticmethod
+    def _matched_id(lexicon, name):
+        match = lexicon.lookup(name)
+        return match.ids[0] if match else None
 
     def query_disease(self, disease_name):
-        disease_name = disease_name.lower() 
-        for code, term in self.disease_dict.items():
-            if disease_name == code.lower() or disease_name == term.lower():
-                return True
-        return False
-
+        return self._matched_id(self.disease_lexicon, disease_name)
 
     def query_pheno(self, name):
-        for code, term in self.pheno_dict.items():
-            if name.lower() == code or name.lower() == term:
-                return True
-        return False
+        return self._matched_id(self.pheno_lexicon, name)
 
     def query_orphat(self, name):
-        for code, term in self.orphat_dict.items():
-            if name.lower() == code or name.lower() == term:
-                return True
-        return False
+        orpha_code = self._matched_id(self.orphat_lexicon, name)
+        return f"ORPHA:{orpha_code}" if orpha_code else None
 
-    def _run(self, name: str) -> str:
+    def _local_types(self, name):
         types_found = []
-        pheno_name = self.query_pheno(name)
-        if pheno_name:
-            types_found.append(f"Phenotypes:{name}")
-        if self.query_disease(name):
-            types_found.append(f"Disease1:{name}")
-        elif self.query_orphat(name):
-            types_found.append(f"Disease:{name}")
-        if types_found:
-          return ', '.join(types_found)
-
-        base_url_gene1 = "https://api.ncbi.nlm.nih.gov/datasets/v2alpha/gene/id/"
-        base_url_gene2= "https://api.ncbi.nlm.nih.gov/datasets/v2alpha/gene/symbol/" 
-        url_gene1 = f"{base_url_gene1}{name}"
-        url_gene2 = f"{base_url_gene2}{name}/taxon/9606"
-        headers = {
-            "accept": "application/json",
-            "api-key": os.getenv("NCBI_API_KEY")
-        }        
-        try:
-            url_gene1 = f"{base_url_gene1}{name}"
-            response_gene1 = requests.get(url_gene1, headers=headers)
-            if response_gene1.status_code == 200:
-                types_found.append(f"Gene1:{name}")
-            else:
-                url_gene2 = f"{base_url_gene2}{name}/taxon/9606"
-                response_gene2 = requests.get(url_gene2, headers=headers)
-                
-                if response_gene2.status_code == 200:
-                    result_response_gene2 = response_gene2.json()
-                    if result_response_gene2 != {}:
-                        types_found.append(f"Gene:{name}")
-                    else:
-                        server = "https://grch37.rest.ensembl.org"
-                        ext = f"/lookup/symbol/homo_sapiens/{quote(name)}?"
-                        r = requests.get(server + ext, headers={"Content-Type": "application/json"})
-                        if r.ok:
-                            types_found.append(f"Gene:{name}")
-        except requests.exceptions.RequestException:
-            pass
-       
-        base_url_protein = "https://www.ebi.ac.uk/proteins/api/proteins"
-        try:
-            url_protein = f"{base_url_protein}/{name}"
-            response_protein = requests.get(url_protein)
-            if response_protein.status_code == 200:
-                types_found.append(f"protein: {name}")
-        except requests.exceptions.RequestException:
-            pass
-
-        base_url_gene = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
-        search_url_gene = base_url_gene + 'esearch.fcgi'
-        search_url_snp = search_url_gene 
-        search_params = {
-            'db': 'snp',
-            'term': name,
-            'retmode': 'json'
-        }
-        try:
-            search_response_snp = requests.get(search_url_snp, params=search_params)
-            if search_response_snp.status_code == 200:
-                snp_result = search_response_snp.json()
-                if snp_result.get('esearchresult', {}).get('idlist', []):
-                    types_found.append(f"SNP: {name}")
-
-        except requests.exceptions.RequestException:
-            pass
-        return ', '.join(types_found) if types_found else "not found."
-    
+        pheno_id = self.query_pheno(name)
+        if pheno_id:
+            types_found.append(f"Phenotypes:{name} ({pheno_id})")
+        disease_id = self.query_disease(name)
+        if disease_id:
+            types_found.append(f"Disease1:{name} ({disease_id})")
+        else:
+            orpha_id = self.query_orphat(name)
+            if orpha_id:
+                types_found.append(f"Disease:{name} ({orpha_id})")
+        return types_found or self._gene_types(name)
+
+    def _gene_types(self, name):
+        """Answer GeneIDs, symbols and aliases known to the local gene index."""
+        if self.gene_index is None:
+            return []
+        records = self.gene_index.lookup(name)
+        if not records:
+            return []
+        if name.strip().isdigit():
+            return [f"Gene1:{name} ({records[0].symbol})"]
+        return [f"Gene:{name} ({record.gene_id})" if record.symbol.lower() == name.strip().lower()
+                else f"Gene:{name} (alias of {record.symbol}, {record.gene_id})" for record in records]
+
+    def _fuzzy_types(self, name):
+        # Only asked once the probes found nothing: a near-miss of a lexicon term ("Ataxin" ~ "ataxia")
+        # may well be a gene or protein. Upper-case single tokens are symbols, never misspelled terms.
+        if self.fuzzy_index is None or name.strip().isupper() or entity_patterns.classify(name) is not None:
+            return []
+        candidates = self.fuzzy_index.search(name, k=10)
+        if not candidates:
+            return []
+        best = {}
+        for c in candidates:
+            best.setdefault(c.source, c.name)
+        types_found = []
+        if "phenotypes" in best:
+            pheno_name = best["phenotypes"]
+            types_found.append(f"Phenotypes:{pheno_name} ({self.query_pheno(pheno_name)}; closest match for '{name}')")
+        if "disease_ontology" in best:
+            disease_name = best["disease_ontology"]
+            types_found.append(f"Disease1:{disease_name} ({self.query_disease(disease_name)}; closest match for '{name}')")
+        elif "orphanet" in best:
+            orpha_name = best["orphanet"]
+            types_found.append(f"Disease:{orpha_name} ({self.query_orphat(orpha_name)}; closest match for '{name}')")
+        return types_found
+
+    def _identifier_types(self, match):
+        """Answer an ontology identifier recognized by ``entity_patterns`` from the lexicons or the annotation index.
+
+        An identifier its lexicon does not list is not found; one no local source can check is reported
+        as unverified rather than confirmed on its syntax alone.
+        """
+        lexicon = {"phenotypes": self.pheno_lexicon, "disease_ontology": self.disease_lexicon,
+                   "orphanet": self.orphat_lexicon}.get(match.rule.lexicon)
+        if lexicon is not None:
+            names = lexicon.names_for(match.lexicon_id)
+            return f"{match.rule.entity}:{names[0]} ({match.identifier})" if names else "not found."
+        index = default_annotation_index()
+        name = index.name(match.identifier) if index is not None else None
+        if name:
+            return f"{match.rule.entity}:{name} ({match.identifier})"
+        return f"{match.rule.entity}:{match.identifier} (unverified: well-formed identifier, not checked)"
+
+    def _probed_answer(self, name, answer, responses):
+        """The probes' answer, or the closest lexicon terms when they found nothing; a miss is remembered."""
+        if answer == "not found.":
+            types_found = self._fuzzy_types(name)
+            if types_found:
+                return ', '.join(types_found)
+        return _remember_miss(name, answer, responses)
+
+    def _local_answer(self, name, matched):
+        """The answer for ``name`` when no network probe is needed, else None."""
+        if matched is not None and matched.rule.probe is None:
+            entity_patterns.record(matched, probes_run=0)
+            return self._identifier_types(matched)
+        if matched is None:
+            types_found = self._local_types(name)
+            if types_found:
+                return ', '.join(types_found)
+        return None
+
+    def _names(self, value):
+        """The names to check.
+
+        Commas are part of many disease names ("Deafness, autosomal dominant 1"), so a string that is not
+        itself a known term is split at them only when every part is a known term or a recognized
+        identifier ("TP53, BRCA1").
+        """
+        names = _split_names(value)
+        if not isinstance(value, str) or value.strip().startswith("[") or len(names) != 1:
+            return names
+        if self._local_types(names[0]):
+            return names
+        parts = _split_names(NAME_COMMA.split(names[0]))
+        if len(parts) > 1 and all(entity_patterns.classify(part) is not None or self._local_types(part)
+                                  for part in parts):
+            return parts
+        return names
+
+    def _batch_probes(self, name):
+        """The probes ``name`` needs in a batch, or the local answer in place of them."""
+        matched = entity_patterns.classify(name)
+        answer = self._local_answer(name, matched)
+        if answer is not None:
+            return answer, ()
+        if known_missing("existence", name):
+            return "not found.", ()
+        if matched is not None and matched.rule.exclusive:
+            entity_patterns.record(matched, probes_run=1)
+            return None, (matched.rule.probe,)
+        if matched is not None:
+            entity_patterns.record(matched, probes_run=entity_patterns.FULL_PROBE_COUNT)
+        return None, PROBE_NAMES
+
+    @tool_run
+    def _run(self, name: Union[str, List[str]]) -> str:
+        names = self._names(name)
+        if len(names) == 1:
+            return self._check(names[0])
+        return self._check_batch(names)
+
+    def _check(self, name):
+        matched = entity_patterns.classify(name)
+        answer = self._local_answer(name, matched)
+        if answer is not None:
+            return answer
+        if known_missing("existence", name):
+            return "not found."
+
+        responses = {}
+        if matched is not None:
+            responses[matched.rule.probe] = _probe_calls(name, (matched.rule.probe,))[matched.rule.probe]()
+            answer = _network_answer(name, responses)
+            if answer != "not found." or matched.rule.exclusive:
+                entity_patterns.record(matched, probes_run=1)
+                return _remember_miss(name, answer, responses)
+            entity_patterns.record(matched, probes_run=entity_patterns.FULL_PROBE_COUNT)
+
+        calls = {probe: call for probe, call in _probe_calls(name).items() if probe not in responses}
+        responses.update(zip(calls, fan_out(list(calls.values()), PROBE_DEADLINE)))
+        return self._probed_answer(name, _network_answer(name, responses), responses)
+
+    def _check_batch(self, names):
+        """Cached and local answers first, then a single fan-out over every remaining name's probes."""
+        results, calls = {}, {}
+        for name in names:
+            results[name] = cached_call(self, name)
+            if results[name] is None:
+                results[name], probes = self._batch_probes(name)
+                calls.update({(name, probe): call for probe, call in _probe_calls(name, probes).items()})
+        responses = dict(zip(calls, fan_out(list(calls.values()), _batch_deadline(calls))))
+        return _batch_answer(self, names, results, responses)
+
+    @tool_run
+    async def _arun(self, name: Union[str, List[str]]) -> str:
+        names = self._names(name)
+        if len(names) == 1:
+            return await self._acheck(names[0])
+        return await self._acheck_batch(names)
+
+    async def _acheck(self, name):
+        matched = entity_patterns.classify(name)
+        answer = self._local_answer(name, matched)
+        if answer is not None:
+            return answer
+        if known_missing("existence", name):
+            return "not found."
+
+        responses = {}
+        if matched is not None:
+            responses[matched.rule.probe] = await _aprobe_calls(name, (matched.rule.probe,))[matched.rule.probe]()
+            answer = _network_answer(name, responses)
+            if answer != "not found." or matched.rule.exclusive:
+                entity_patterns.record(matched, probes_run=1)
+                return _remember_miss(name, answer, responses)
+            entity_patterns.record(matched, probes_run=entity_patterns.FULL_PROBE_COUNT)
+
+        calls = {probe: call for probe, call in _aprobe_calls(name).items() if probe not in responses}
+        responses.update(zip(calls, await afan_out([call() for call in calls.values()], PROBE_DEADLINE)))
+        return self._probed_answer(name, _network_answer(name, responses), responses)
+
+    async def _acheck_batch(self, names):
+        results, calls = {}, {}
+        for name in names:
+            results[name] = cached_call(self, name)
+            if results[name] is None:
+                results[name], probes = self._batch_probes(name)
+                calls.update({(name, probe): call for probe, call in _aprobe_calls(name, probes).items()})
+        responses = dict(zip(calls, await afan_out([call() for call in calls.values()], _batch_deadline(calls))))
+        return _batch_answer(self, names, results, responses)
+
+
+# Names are separated by ";" or a newline. ExistenceCheckTool._names also tries commas, except one
+# between digits ("2,4-dienoyl-CoA reductase deficiency", "1, 4").
+NAME_SEPARATOR = re.compile(r"[;\n]")
+NAME_COMMA = re.compile(r"\s*(?:(?<!\d),|,(?!\s*\d))\s*")
+
+def _split_names(value):
+    """Distinct names from a list, a JSON list or a string separated by ``NAME_SEPARATOR``."""
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith("["):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                value = text.strip("[]")
+        if isinstance(value, str):
+            value = NAME_SEPARATOR.split(value)
+    names = (str(item).strip().strip("'\"").strip() for item in value)
+    return list(dict.fromkeys(name for name in names if name))
+
+def _batch_deadline(calls):
+    """PROBE_DEADLINE plus the time the per-host rate limits need to let every probe of a batch through."""
+    counts, rates = Counter(), {}
+    for name, probe in calls:
+        url = PROBE_SPECS[probe](name)[0]
+        bucket = limiter_for(url)
+        if bucket is not None:
+            host = urlsplit(url).hostname
+            counts[host] += 1
+            rates[host] = bucket.rate
+    return PROBE_DEADLINE + max((count / rates[host] for host, count in counts.items()), default=0.0)
+
+def _batch_answer(tool, names, results, responses):
+    """Maps each name to what a single-name check would have returned (``tool_run`` serializes it).
+
+    The batch as a whole is not memoized when a miss in it may be due to a failed or timed-out probe.
+    """
+    conclusive = True
+    for name in names:
+        if results[name] is None:
+            name_responses = {probe: response for (probe_name, probe), response in responses.items() if probe_name == name}
+            results[name] = tool._probed_answer(name, _network_answer(name, name_responses), name_responses)
+            remember_call(tool, results[name], name)
+            conclusive = conclusive and (results[name] != "not found." or _conclusive_miss(name_responses))
+    return results if conclusive else Uncached(results)
+
+
+# Network probes of ExistenceCheckTool as (url, headers, params).
+def _ncbi_headers():
+    return {"accept": "application/json", "api-key": os.getenv("NCBI_API_KEY")}
+
+def _gene_id_probe(name):
+    return f"https://api.ncbi.nlm.nih.gov/datasets/v2alpha/gene/id/{name}", _ncbi_headers(), None
+
+def _gene_symbol_probe(name):
+    return f"https://api.ncbi.nlm.nih.gov/datasets/v2alpha/gene/symbol/{name}/taxon/9606", _ncbi_headers(), None
+
+def _ensembl_probe(name):
+    return (f"https://grch37.rest.ensembl.org/lookup/symbol/homo_sapiens/{quote(name)}?",
+            {"Content-Type": "application/json"}, None)
+
+def _protein_probe(name):
+    return f"https://www.ebi.ac.uk/proteins/api/proteins/{name}", None, None
+
+def _snp_probe(name):
+    return "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi", None, {'db': 'snp', 'term': name, 'retmode': 'json'}
+
+def _omim_probe(name):
+    mim_number = re.findall(r"\d+", name)[-1]
+    return ("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi", None,
+            {'db': 'omim', 'term': f"{mim_number}[MIM]", 'retmode': 'json'})
+
+def _ensembl_id_probe(name):
+    return (f"https://grch37.rest.ensembl.org/lookup/id/{quote(name.strip().split('.')[0])}?",
+            {"Content-Type": "application/json"}, None)
+
+PROBE_NAMES = ("gene_id", "symbol", "protein", "snp")
+PROBE_SPECS = {"gene_id": _gene_id_probe, "symbol": _gene_symbol_probe, "protein": _protein_probe, "snp": _snp_probe,
+               "omim": _omim_probe, "ensembl_id": _ensembl_id_probe}
+
+def _probe_calls(name, probes=PROBE_NAMES):
+    """Zero-argument callables running the named probes of ``name``; "symbol" falls back to Ensembl."""
+    def gene_symbol():
+        response = _probe(*_gene_symbol_probe(name))
+        if response is not None and _json(response) == {}:
+            return response, _probe(*_ensembl_probe(name))
+        return response, None
+
+    calls = {
+        "gene_id": lambda: _probe(*_gene_id_probe(name)),
+        "symbol": gene_symbol,
+        "protein": lambda: _probe(*_protein_probe(name)),
+        "snp": lambda: _probe(*_snp_probe(name)),
+        "omim": lambda: _probe(*_omim_probe(name)),
+        "ensembl_id": lambda: _probe(*_ensembl_id_probe(name)),
+    }
+    return {probe: calls[probe] for probe in probes}
+
+def _aprobe_calls(name, probes=PROBE_NAMES):
+    """Async counterpart of ``_probe_calls``: functions returning coroutines."""
+    async def gene_symbol():
+        response = await _aprobe(*_gene_symbol_probe(name))
+        if response is not None and _json(response) == {}:
+            return response, await _aprobe(*_ensembl_probe(name))
+        return response, None
+
+    calls = {
+        "gene_id": lambda: _aprobe(*_gene_id_probe(name)),
+        "symbol": gene_symbol,
+        "protein": lambda: _aprobe(*_protein_probe(name)),
+        "snp": lambda: _aprobe(*_snp_probe(name)),
+        "omim": lambda: _aprobe(*_omim_probe(name)),
+        "ensembl_id": lambda: _aprobe(*_ensembl_id_probe(name)),
+    }
+    return {probe: calls[probe] for probe in probes}
+
+def _probe(url, headers=None, params=None):
+    try:
+        return http_get(url, headers=headers, params=params, timeout=PROBE_TIMEOUT)
+    except requests.exceptions.RequestException:
+        return None
+
+async def _aprobe(url, headers=None, params=None):
+    try:
+        return await ahttp_get(url, headers=headers, params=params, timeout=PROBE_TIMEOUT)
+    except httpx.HTTPError:
+        return None
+
+def _json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+def _network_answer(name, responses):
+    """The tool's answer from probe responses keyed by probe name (missing or None: failed or not run)."""
+    responses = dict(responses)
+    symbol, ensembl = responses.pop("symbol", None) or (None, None)
+    types_found = _probe_types(name, symbol=symbol, ensembl=ensembl, **responses)
+    return ', '.join(types_found) if types_found else "not found."
+
+def _conclusive(response):
+    return response is not None and response.status_code < 500 and response.status_code != 429
+
+def _conclusive_miss(responses):
+    """Whether every probe got a definite answer (no failure, timeout, 5xx or 429), so a miss is real."""
+    for probe, response in responses.items():
+        if probe == "symbol":
+            symbol, ensembl = response or (None, None)
+            if not _conclusive(symbol) or (symbol.status_code == 200 and _json(symbol) == {} and not _conclusive(ensembl)):
+                return False
+        elif not _conclusive(response):
+            return False
+    return True
+
+def _remember_miss(name, answer, responses):
+    """Record ``name`` in the negative cache when ``answer`` is a conclusive miss; returns ``answer``."""
+    if answer == "not found." and _conclusive_miss(responses):
+        record_missing("existence", name)
+    return answer
+
+def _esearch_hit(response):
+    result = _json(response)
+    return isinstance(result, dict) and bool(result.get('esearchresult', {}).get('idlist', []))
+
+def _probe_types(name, gene_id=None, symbol=None, ensembl=None, protein=None, snp=None, omim=None, ensembl_id=None):
+    """Combine the probe responses (None when a probe failed or ran out of time) into the types found."""
+    types_found = []
+    if gene_id is not None and gene_id.status_code == 200:
+        types_found.append(f"Gene1:{name}")
+    elif symbol is not None and symbol.status_code == 200:
+        symbol_result = _json(symbol)
+        if symbol_result is not None and symbol_result != {}:
+            types_found.append(f"Gene:{name}")
+        elif ensembl is not None and ensembl.status_code < 400:
+            types_found.append(f"Gene:{name}")
+    if protein is not None and protein.status_code == 200:
+        types_found.append(f"protein: {name}")
+    if snp is not None and snp.status_code == 200 and _esearch_hit(snp):
+        types_found.append(f"SNP: {name}")
+    if omim is not None and omim.status_code == 200 and _esearch_hit(omim):
+        types_found.append(f"Disease:{name}")
+    if ensembl_id is not None and ensembl_id.status_code == 200:
+        types_found.append(f"Gene:{name}")
+    return types_found
+
 
 user_prompt_guide = """
 Your task is to determine whether the given query is related to biomedical topics. If the query is related to biomedicine, respond with "yes, this question is related to medicine." If not, respond with "no, this question is not related to medicine."  
@@ -318,19 +617,21 @@ response_prompt = agent_guide.agent.create_prompt(
     tools=tools_guide2
 )
 def process_input(input_source, question):
+    check_deadline(f"the {input_source} step")
+    executor = budget_executor(agent_guide)
     if input_source == "user":
         agent_guide.agent.llm_chain.prompt = user_prompt
-        result = agent_guide.invoke({"input": question})
+        result = executor.invoke({"input": question})
     elif input_source == "instruction":
         agent_guide.agent.llm_chain.prompt = instruction_prompt
-        result = agent_guide.invoke({"input": question})
+        result = executor.invoke({"input": question})
     elif input_source == "evaluation":
         agent_guide.agent.llm_chain.prompt = evaluation_prompt
-        result = agent_guide.invoke({"input": question})
+        result = executor.invoke({"input": question})
     elif input_source == "refinded":
         agent_guide.agent.llm_chain.prompt = refinded_prompt
-        result = agent_guide.invoke({"input": question})
+        result = executor.invoke({"input": question})
     elif input_source == "response":
         agent_guide.agent.llm_chain.prompt = response_prompt
-        result = agent_guide.invoke({"input": question})
+        result = executor.invoke({"input": question})
     return result
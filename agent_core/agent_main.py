@@ -7,8 +7,11 @@ os.environ["HTTPS_PROXY"] = os.getenv("HTTPS_PROXY")
 
 from initialize_agents import agent_data, agent_val
 from agent_guide import process_input
+from deadline import DEFAULT_DEADLINE, DeadlineExceeded, budget_executor, check_deadline, deadline_scope, expired
 import re
 
+TIMEOUT_ANSWER = "Sorry, no answer could be retrieved within the time limit for this question."
+
 class GuideAgent:
     name: str = "GuideAgent"
 
@@ -25,36 +28,49 @@ class GuideAgent:
         return ans[0] if ans else "yes"
 
     def handle_query(self, query: str):
-        if self.is_medical_query(query):
-            input_text = f" provide the query instruction for this sentence '{query}' ,without giving a specific answer."
-            instruction = process_input("instruction", input_text)
-            instruction_output = instruction.get('output', None)
-
-            MAX_ITERATIONS = 2
-            num_try = 0
-            hasno_flag = True
-            response = DatabaseAgent.query_database(instruction_output)
-
-            while num_try < MAX_ITERATIONS and hasno_flag:
-                num_try += 1
-                hasno_flag = False
-                second_response = f"Please evaluate:Retrieved answer to the query '{query}' is '{response}',only answer 'Yes' or 'No'"
-                evaluation = process_input("evaluation", second_response)
-                evaluation_output = evaluation.get('output', None)
-                final_evaluation_result = self.process_evaluation_output(evaluation_output)
-
-                if final_evaluation_result == "no":
-                    input_text2 = f"Based on {response}, refine the query instruction to help retrieve a complete and accurate answer."
-                    refined_query = process_input("refinded", input_text2)
-                    refined_query_output = refined_query.get('output', None)
-                    response = DatabaseAgent.query_database(refined_query_output)
-                    hasno_flag = True
-
-            final_answer = f'The answer to "{query}" is {response}.'
-            validation_response = ValidationAgent.validate_answer(final_answer)
-        else:
-            instruction = process_input("response", query)
-            validation_response = instruction.get('output', None)
+        # Best retrieved answer so far, returned as is if the deadline cuts the pipeline short.
+        response = None
+        try:
+            if self.is_medical_query(query):
+                input_text = f" provide the query instruction for this sentence '{query}' ,without giving a specific answer."
+                instruction = process_input("instruction", input_text)
+                instruction_output = instruction.get('output', None)
+
+                MAX_ITERATIONS = 2
+                num_try = 0
+                hasno_flag = True
+                response = DatabaseAgent.query_database(instruction_output)
+
+                while num_try < MAX_ITERATIONS and hasno_flag and not expired():
+                    num_try += 1
+                    hasno_flag = False
+                    second_response = f"Please evaluate:Retrieved answer to the query '{query}' is '{response}',only answer 'Yes' or 'No'"
+                    evaluation = process_input("evaluation", second_response)
+                    evaluation_output = evaluation.get('output', None)
+                    final_evaluation_result = self.process_evaluation_output(evaluation_output)
+
+                    if final_evaluation_result == "no":
+                        input_text2 = f"Based on {response}, refine the query instruction to help retrieve a complete and accurate answer."
+                        refined_query = process_input("refinded", input_text2)
+                        refined_query_output = refined_query.get('output', None)
+                        refined_response = DatabaseAgent.query_database(refined_query_output)
+                        # A retrieval cut off by the deadline is likely incomplete; keep the earlier answer.
+                        if expired():
+                            break
+                        response = refined_response
+                        hasno_flag = True
+
+                final_answer = f'The answer to "{query}" is {response}.'
+                if expired():
+                    return final_answer
+                validation_response = ValidationAgent.validate_answer(final_answer)
+            else:
+                instruction = process_input("response", query)
+                validation_response = instruction.get('output', None)
+        except DeadlineExceeded:
+            if response:
+                return f'The answer to "{query}" is {response}.'
+            return TIMEOUT_ANSWER
 
         return validation_response
 
@@ -63,7 +79,8 @@ class DatabaseAgent:
     name: str = "DatabaseAgent"
     @staticmethod
     def query_database(query: str):
-        response = agent_data.invoke({"input": query})
+        check_deadline("the retrieval step")
+        response = budget_executor(agent_data).invoke({"input": query})
         answer = response.get('output', None)
         return answer
 
@@ -73,13 +90,19 @@ class ValidationAgent:
     @staticmethod
     def validate_answer(query: str):
         text = f"{query}. Please provide the most suitable final answer based on the given answer and question."
-        response = agent_val.invoke({"input": query})
+        check_deadline("the validation step")
+        response = budget_executor(agent_val).invoke({"input": query})
         final_answer = response.get('output', None)
         return final_answer
 
 guide_agent = GuideAgent()
-def run_agent(user_question: str):
-    return guide_agent.handle_query(user_question)
+def run_agent(user_question: str, deadline_s: float = None):
+    """Answer ``user_question``; with ``deadline_s`` (default ``BIORAGENT_DEADLINE``) the
+    pipeline returns the best answer gathered so far once that many seconds have passed."""
+    if deadline_s is None:
+        deadline_s = DEFAULT_DEADLINE
+    with deadline_scope(deadline_s):
+        return guide_agent.handle_query(user_question)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
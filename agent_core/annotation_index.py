@@ -0,0 +1,380 @@
+"""Offline HPO annotation index for the gene/disease/phenotype association tools.
+
+The phenotype, gene and disease association tools ask ontology.jax.org's
+``/network/annotation/{id}`` for data that HPO also publishes as bulk files.
+This module compiles those files into one memory-mappable snapshot and serves
+the associations locally; the tools go to the network only for entities the
+snapshot does not know.
+
+    phenotype.hpoa           disease -> phenotype annotations (frequency, onset, references)
+    genes_to_phenotype.txt   gene -> phenotype
+    genes_to_disease.txt     gene -> disease
+
+Every entity (``HP:``, ``NCBIGene:``, ``OMIM:``, ``ORPHA:``, ...) is keyed by a
+uint64 of its namespace and number and numbered by its position in the sorted
+key column. Each association direction is a CSR column pair (uint32 ranges over
+all entities, uint32 targets), so a query is a bisect plus a slice:
+
+    keys, names                  sorted entity keys and their labels
+    name_keys, name_entities     sorted casefolded names/symbols -> entity, to resolve free text
+    <kind>_<relation>[_ranges]   phenotype diseases/genes, gene phenotypes/diseases, disease phenotypes/genes
+    edge_frequency/onset/sources string-table indexes per disease -> phenotype edge
+    edge_aspect                  HPO aspect (P, I, C, M) per disease -> phenotype edge
+    strings                      the deduplicated metadata strings
+    ingested                     the input files the snapshot was built from
+
+Any of the three files may be left out. Relations whose file was not ingested
+are answered with None, like entities the snapshot does not know, so the tools
+still fall back to the network for them.
+
+    python agent_core/annotation_index.py build --hpoa phenotype.hpoa \\
+        --genes-to-phenotype genes_to_phenotype.txt --genes-to-disease genes_to_disease.txt
+
+Settings:
+    BIORAGENT_ANNOTATION_INDEX  compiled index file (default BIORAGENT_CACHE_DIR/hpo_annotations.bin)
+"""
+import argparse
+import bisect
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import lexicon_snapshot
+from lexicon_snapshot import _StringTable, _map_file, _pack_sections, _string_table, _unpack_sections, _write_snapshot, file_digest
+from hpo_graph import default_hpo_graph
+from response_cache import CACHE_DIR
+
+load_dotenv()
+
+ANNOTATION_INDEX_PATH = os.path.expanduser(
+    os.getenv("BIORAGENT_ANNOTATION_INDEX", os.path.join(CACHE_DIR, "hpo_annotations.bin")))
+MAGIC = b"BRHA"
+FORMAT_VERSION = 2
+
+NAMESPACES = ("HP", "NCBIGene", "OMIM", "ORPHA", "DECIPHER", "MONDO")
+KINDS = {"HP": "phenotype", "NCBIGene": "gene"}  # every other namespace is a disease
+RELATIONS = {
+    "phenotype": ("diseases", "genes"),
+    "gene": ("phenotypes", "diseases"),
+    "disease": ("phenotypes", "genes"),
+}
+RELATION_SECTIONS = tuple(f"{kind}_{relation}" for kind, relations in RELATIONS.items() for relation in relations)
+# The input file each association direction comes from.
+RELATION_SOURCES = {
+    "disease_phenotypes": "hpoa", "phenotype_diseases": "hpoa",
+    "gene_phenotypes": "genes_to_phenotype", "phenotype_genes": "genes_to_phenotype",
+    "gene_diseases": "genes_to_disease", "disease_genes": "genes_to_disease",
+}
+SECTIONS = ("keys", "names", "name_keys", "name_entities") + \
+    tuple(name for relation in RELATION_SECTIONS for name in (f"{relation}_ranges", relation)) + \
+    ("edge_frequency", "edge_onset", "edge_sources", "edge_aspect", "strings", "ingested")
+
+# HPO annotation aspects other than phenotypic abnormality (P), as the API's disease categories name them.
+ASPECT_CATEGORIES = {"I": "Inheritance", "C": "Clinical course", "M": "Clinical modifier"}
+PHENOTYPIC_ABNORMALITY = "HP:0000118"
+
+
+def entity_key(curie: str) -> Optional[int]:
+    """The uint64 key of ``PREFIX:number``, or None for an unknown namespace."""
+    prefix, _, number = str(curie).strip().partition(":")
+    if prefix not in NAMESPACES or not number.isdigit():
+        return None
+    return (NAMESPACES.index(prefix) << 32) | int(number)
+
+
+def entity_curie(key: int) -> str:
+    prefix, number = NAMESPACES[key >> 32], key & 0xFFFFFFFF
+    return f"HP:{number:07d}" if prefix == "HP" else f"{prefix}:{number}"
+
+
+def entity_kind(curie: str) -> str:
+    return KINDS.get(str(curie).partition(":")[0], "disease")
+
+
+def _read_tsv(path: str) -> Iterable[Dict[str, str]]:
+    """Rows of a tab-separated file whose ``#`` lines before the header are comments."""
+    with open(path, encoding="utf-8", newline="") as f:
+        lines = (line for line in f if not line.startswith("#"))
+        yield from csv.DictReader(lines, delimiter="\t", quoting=csv.QUOTE_NONE)
+
+
+class _Builder:
+    """Collects entities, names and associations before ``compile``."""
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+        self.edges: Dict[Tuple[str, str], Set[str]] = {}
+        self.annotations: Dict[Tuple[str, str], Dict[str, str]] = {}  # (disease, phenotype) -> metadata
+        self.ingested: Set[str] = set()  # RELATION_SOURCES values of the files read
+
+    def entity(self, curie: str, name: str = "") -> Optional[str]:
+        """Register an entity; returns its normalized CURIE, or None for an unknown namespace."""
+        key = entity_key(curie)
+        if key is None:
+            return None
+        curie = entity_curie(key)
+        if name or curie not in self.names:
+            self.names[curie] = name or self.names.get(curie, "")
+        return curie
+
+    def link(self, source: str, target: str):
+        """Record an association in both directions."""
+        for a, b in ((source, target), (target, source)):
+            self.edges.setdefault((a, entity_kind(b) + "s"), set()).add(b)
+
+    def read_hpoa(self, path: str):
+        self.ingested.add("hpoa")
+        for row in _read_tsv(path):
+            if row.get("qualifier") == "NOT":
+                continue
+            disease, phenotype = self.entity(row["database_id"], row["disease_name"]), self.entity(row["hpo_id"])
+            if not (disease and phenotype):
+                continue
+            self.link(disease, phenotype)
+            metadata = self.annotations.setdefault((disease, phenotype), {
+                "frequency": row.get("frequency", ""), "onset": row.get("onset", ""), "sources": "",
+                "aspect": row.get("aspect", "P")})
+            references = [r for r in metadata["sources"].split(";") if r] + \
+                [r for r in row.get("reference", "").split(";") if r]
+            metadata["sources"] = ";".join(dict.fromkeys(references))
+
+    def read_genes_to_phenotype(self, path: str):
+        self.ingested.add("genes_to_phenotype")
+        for row in _read_tsv(path):
+            gene = self.entity(f"NCBIGene:{row['ncbi_gene_id']}", row["gene_symbol"])
+            phenotype = self.entity(row["hpo_id"], row.get("hpo_name", ""))
+            if gene and phenotype:
+                self.link(gene, phenotype)
+
+    def read_genes_to_disease(self, path: str):
+        self.ingested.add("genes_to_disease")
+        for row in _read_tsv(path):
+            gene_id = row["ncbi_gene_id"]
+            gene = self.entity(gene_id if gene_id.startswith("NCBIGene:") else f"NCBIGene:{gene_id}", row["gene_symbol"])
+            disease = self.entity(row["disease_id"])
+            if gene and disease:
+                self.link(gene, disease)
+
+    def compile(self, digest: bytes) -> bytes:
+        phenotype_names = lexicon_snapshot.phenotypes()
+        for curie, name in self.names.items():
+            if not name and entity_kind(curie) == "phenotype":
+                labels = phenotype_names.names_for(curie)
+                self.names[curie] = labels[0] if labels else ""
+        keys = sorted(entity_key(curie) for curie in self.names)
+        curies = [entity_curie(key) for key in keys]
+        node = {curie: i for i, curie in enumerate(curies)}
+        name_pairs = sorted({(self.names[curie].casefold().encode("utf-8"), node[curie])
+                             for curie in curies if self.names[curie]})
+
+        strings: Dict[str, int] = {"": 0}
+
+        def string(value: str) -> int:
+            return strings.setdefault(value, len(strings))
+
+        sections = [array("Q", keys).tobytes(),
+                    _string_table([self.names[curie].encode("utf-8") for curie in curies]),
+                    _string_table([name for name, _ in name_pairs]),
+                    array("I", [entity for _, entity in name_pairs]).tobytes()]
+        frequency, onset, sources, aspect = array("I"), array("I"), array("I"), bytearray()
+        for relation in RELATION_SECTIONS:
+            kind, _, target_relation = relation.partition("_")
+            ranges, targets = array("I", [0]), array("I")
+            for curie in curies:
+                if entity_kind(curie) == kind:
+                    for target in sorted(node[t] for t in self.edges.get((curie, target_relation), ())):
+                        targets.append(target)
+                        if relation == "disease_phenotypes":
+                            metadata = self.annotations.get((curie, curies[target]), {})
+                            frequency.append(string(self._label(metadata.get("frequency", ""), phenotype_names)))
+                            onset.append(string(self._label(metadata.get("onset", ""), phenotype_names)))
+                            sources.append(string(metadata.get("sources", "")))
+                            aspect.append(ord((metadata.get("aspect") or "P")[0]))
+                ranges.append(len(targets))
+            sections += [ranges.tobytes(), targets.tobytes()]
+        sections += [frequency.tobytes(), onset.tobytes(), sources.tobytes(), bytes(aspect),
+                     _string_table([value.encode("utf-8") for value in strings]),
+                     _string_table([source.encode("utf-8") for source in sorted(self.ingested)])]
+        return _pack_sections(MAGIC, FORMAT_VERSION, digest, sections)
+
+    @staticmethod
+    def _label(value: str, phenotype_names) -> str:
+        """HPO frequency and onset terms by label ("HP:0040283" -> "Occasional"); ratios and percentages as is."""
+        if value.startswith("HP:"):
+            labels = phenotype_names.names_for(value)
+            return labels[0] if labels else value
+        return value
+
+
+class AnnotationIndex:
+    """Read-only association lookups over a compiled snapshot."""
+
+    def __init__(self, buffer, digest: Optional[bytes] = None):
+        self.digest, sections = _unpack_sections(buffer, MAGIC, FORMAT_VERSION, SECTIONS, digest)
+        self._buffer = buffer
+        self._keys = sections["keys"].cast("Q")
+        self._names = _StringTable(sections["names"])
+        self._name_keys = _StringTable(sections["name_keys"])
+        self._name_entities = sections["name_entities"].cast("I")
+        self._relations = {relation: (sections[f"{relation}_ranges"].cast("I"), sections[relation].cast("I"))
+                           for relation in RELATION_SECTIONS}
+        self._frequency = sections["edge_frequency"].cast("I")
+        self._onset = sections["edge_onset"].cast("I")
+        self._sources = sections["edge_sources"].cast("I")
+        self._aspect = sections["edge_aspect"]
+        self._strings = _StringTable(sections["strings"])
+        ingested = _StringTable(sections["ingested"])
+        self.ingested = frozenset(ingested.text(i) for i in range(len(ingested)))
+
+    @classmethod
+    def open(cls, path: str, digest: Optional[bytes] = None, use_mmap: bool = True) -> "AnnotationIndex":
+        return cls(_map_file(path, use_mmap), digest)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, curie: str) -> bool:
+        return self._node(curie) is not None
+
+    def _node(self, curie: str) -> Optional[int]:
+        key = entity_key(curie)
+        if key is None:
+            return None
+        i = bisect.bisect_left(self._keys, key)
+        return i if i < len(self._keys) and self._keys[i] == key else None
+
+    def _entry(self, node: int) -> dict:
+        return {"id": entity_curie(self._keys[node]), "name": self._names.text(node)}
+
+    def name(self, curie: str) -> Optional[str]:
+        node = self._node(curie)
+        return self._names.text(node) if node is not None else None
+
+    def resolve(self, term: str, kind: str) -> Optional[str]:
+        """The CURIE of a ``kind`` entity given its CURIE, bare number or exact name/symbol, if indexed."""
+        term = term.strip()
+        if term.isdigit():
+            candidates = {"gene": ["NCBIGene"], "disease": ["OMIM", "ORPHA"], "phenotype": ["HP"]}[kind]
+            curies = [f"HP:{int(term):07d}" if prefix == "HP" else f"{prefix}:{term}" for prefix in candidates]
+        elif entity_key(term) is not None:
+            curies = [term]
+        else:
+            key = term.casefold().encode("utf-8")
+            i = bisect.bisect_left(self._name_keys, key)
+            curies = []
+            while i < len(self._name_keys) and self._name_keys[i] == key:
+                curies.append(entity_curie(self._keys[self._name_entities[i]]))
+                i += 1
+        return next((curie for curie in curies if entity_kind(curie) == kind and curie in self), None)
+
+    def _targets(self, node: int, relation: str) -> Tuple[int, int, memoryview]:
+        ranges, targets = self._relations[relation]
+        return ranges[node], ranges[node + 1], targets
+
+    def related(self, curie: str, relation: str) -> Optional[List[dict]]:
+        """``{id, name}`` entries of ``relation`` ("genes", "diseases", "phenotypes"); None for unknown entities."""
+        node = self._node(curie)
+        kind = entity_kind(curie)
+        if node is None or relation not in RELATIONS[kind] or RELATION_SOURCES[f"{kind}_{relation}"] not in self.ingested:
+            return None
+        start, end, targets = self._targets(node, f"{kind}_{relation}")
+        return [self._entry(targets[i]) for i in range(start, end)]
+
+    def categories(self, disease: str) -> Optional[Dict[str, List[dict]]]:
+        """A disease's phenotypes grouped like the API's ``categories``: by top-level HPO term or aspect."""
+        node = self._node(disease)
+        if node is None or entity_kind(disease) != "disease" or "hpoa" not in self.ingested:
+            return None
+        graph = default_hpo_graph()
+        top_level = graph.children(PHENOTYPIC_ABNORMALITY) if graph is not None else []
+        start, end, targets = self._targets(node, "disease_phenotypes")
+        categories: Dict[str, List[dict]] = {}
+        for i in range(start, end):
+            entry = self._entry(targets[i])
+            entry["metadata"] = {"frequency": self._strings.text(self._frequency[i]),
+                                 "onset": self._strings.text(self._onset[i]),
+                                 "sources": [s for s in self._strings.text(self._sources[i]).split(";") if s]}
+            aspect = chr(self._aspect[i])
+            if aspect in ASPECT_CATEGORIES:
+                category = ASPECT_CATEGORIES[aspect]
+            else:
+                ancestors = set(graph.ancestors(entry["id"])) | {entry["id"]} if graph is not None else set()
+                category = next((graph.name(term) for term in top_level if term in ancestors), "Phenotypic abnormality")
+            categories.setdefault(category, []).append(entry)
+        return categories
+
+    def stats(self) -> dict:
+        counts: Dict[str, int] = {}
+        for key in self._keys:
+            kind = entity_kind(entity_curie(key))
+            counts[kind] = counts.get(kind, 0) + 1
+        return {"entities": counts, "ingested": sorted(self.ingested), **{relation: len(targets) for relation, (_, targets) in self._relations.items()}}
+
+
+def build_index(hpoa: Optional[str] = None, genes_to_phenotype: Optional[str] = None,
+                genes_to_disease: Optional[str] = None, path: str = ANNOTATION_INDEX_PATH) -> str:
+    builder, sha = _Builder(), hashlib.sha256(MAGIC + bytes([FORMAT_VERSION]))
+    for source, read in ((hpoa, builder.read_hpoa), (genes_to_phenotype, builder.read_genes_to_phenotype),
+                         (genes_to_disease, builder.read_genes_to_disease)):
+        if source:
+            read(source)
+            sha.update(file_digest(source))
+    _write_snapshot(path, builder.compile(sha.digest()), path)
+    return path
+
+
+_default_index: Optional[AnnotationIndex] = None
+_default_lock = threading.Lock()
+
+
+def default_annotation_index() -> Optional[AnnotationIndex]:
+    """The index at ``BIORAGENT_ANNOTATION_INDEX``, or None until one has been built."""
+    global _default_index
+    if _default_index is None and os.path.exists(ANNOTATION_INDEX_PATH):
+        with _default_lock:
+            if _default_index is None:
+                try:
+                    _default_index = AnnotationIndex.open(ANNOTATION_INDEX_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"HPO annotation index unavailable: {e}")
+    return _default_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile and query the offline HPO annotation index.")
+    parser.add_argument("--path", type=str, default=ANNOTATION_INDEX_PATH,
+                        help="Compiled index (default: BIORAGENT_ANNOTATION_INDEX).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Compile the HPO annotation files.")
+    build_parser.add_argument("--hpoa", type=str, default=None, help="phenotype.hpoa")
+    build_parser.add_argument("--genes-to-phenotype", type=str, default=None, help="genes_to_phenotype.txt")
+    build_parser.add_argument("--genes-to-disease", type=str, default=None, help="genes_to_disease.txt")
+    query_parser = sub.add_parser("query", help="List an entity's associations.")
+    query_parser.add_argument("term", type=str, help="CURIE, number or exact name/symbol.")
+    query_parser.add_argument("relation", type=str, choices=("genes", "diseases", "phenotypes", "categories"))
+    query_parser.add_argument("--kind", type=str, default="disease", choices=tuple(RELATIONS),
+                              help="Entity kind used to resolve names and bare numbers.")
+    sub.add_parser("stats", help="Show entity and association counts.")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        build_index(args.hpoa, args.genes_to_phenotype, args.genes_to_disease, args.path)
+        print(f"{args.path}: {len(AnnotationIndex.open(args.path))} entities in {time.perf_counter() - start:.1f}s")
+        sys.exit(0)
+    index = AnnotationIndex.open(args.path)
+    if args.command == "stats":
+        print(json.dumps(index.stats(), indent=4))
+    else:
+        curie = index.resolve(args.term, args.kind) or args.term
+        result = index.categories(curie) if args.relation == "categories" else index.related(curie, args.relation)
+        print(json.dumps(result, indent=4) if result is not None else "Not Found")
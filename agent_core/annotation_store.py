@@ -0,0 +1,183 @@
+"""Entity-level store for ontology.jax.org ``/network/annotation/{id}`` responses.
+
+The association tools project different keys out of the same response:
+``PhenotypesDiseaseTool`` and ``PhenotypesGeneTool`` both fetch a phenotype's
+annotation, ``GenePhenotypesTool`` and ``GeneDiseaseTool`` a gene's, and the
+disease tools a disease's. Each call used to fetch the URL and parse the JSON
+again (a popular phenotype's annotation is several MB). Each gene tool also
+ran its own ``search/gene`` lookup. This store fetches an entity's annotation
+once, parses it into an ``AnnotationRecord`` and serves every projection
+(genes, diseases, phenotypes, categories) from that record. Gene name -> NCBIGene
+ID resolutions are memoized alongside it.
+
+Records are kept in a bounded in-process LRU; concurrent requests for the same
+entity are coalesced by ``http_client``'s single-flight, and the raw response
+still lands in the on-disk response cache for other processes. Like the other
+caches, the store steps aside while a record/replay cassette is active.
+
+Settings:
+    BIORAGENT_ANNOTATION_STORE_SIZE  annotation records kept in memory (default 512, 0 disables)
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from cassette import active_cassette
+from http_client import afetch_data, fetch_data
+
+load_dotenv()
+
+ANNOTATION_STORE_SIZE = int(os.getenv("BIORAGENT_ANNOTATION_STORE_SIZE", "512"))
+ANNOTATION_URL = "https://ontology.jax.org/api/network/annotation/{}"
+GENE_SEARCH_URL = "https://ontology.jax.org/api/network/search/gene?q={}&page=0&limit=10"
+
+STORE_LOOKUPS = metrics.Counter("bioragent_annotation_store_lookups_total",
+                                "Annotation store lookups by kind (annotation, gene_id) and result (hit, miss).")
+
+
+class AnnotationRecord(NamedTuple):
+    """The projections of one ``/network/annotation`` response; None where the response had no such key."""
+    entity_id: str
+    genes: Optional[List[dict]]
+    diseases: Optional[List[dict]]
+    phenotypes: Optional[List[dict]]
+    categories: Optional[Dict[str, List[dict]]]
+
+    @classmethod
+    def parse(cls, entity_id: str, response: dict) -> "AnnotationRecord":
+        return cls(entity_id, response.get("genes"), response.get("diseases"), response.get("phenotypes"),
+                   response.get("categories"))
+
+
+class AnnotationStore:
+    """Bounded LRU of annotation records and gene ID resolutions; safe to call from any thread."""
+
+    def __init__(self, capacity: int = ANNOTATION_STORE_SIZE):
+        self.capacity = capacity
+        self._records: "OrderedDict[str, AnnotationRecord]" = OrderedDict()
+        self._gene_ids: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, table: OrderedDict, key: str, kind: str):
+        with self._lock:
+            value = table.get(key)
+            if value is not None:
+                table.move_to_end(key)
+        STORE_LOOKUPS.inc(kind=kind, result="miss" if value is None else "hit")
+        return value
+
+    def _put(self, table: OrderedDict, key: str, value):
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.capacity:
+                table.popitem(last=False)
+
+    def record(self, entity_id: str) -> Optional[AnnotationRecord]:
+        return self._get(self._records, entity_id, "annotation")
+
+    def remember(self, entity_id: str, response) -> Optional[AnnotationRecord]:
+        """Parse and keep a fetched annotation; failed or empty responses are not kept."""
+        if not response or not isinstance(response, dict):
+            return None
+        record = AnnotationRecord.parse(entity_id, response)
+        self._put(self._records, entity_id, record)
+        return record
+
+    def gene_id(self, term: str) -> Optional[str]:
+        return self._get(self._gene_ids, term.casefold(), "gene_id")
+
+    def remember_gene_id(self, term: str, gene_id: str):
+        self._put(self._gene_ids, term.casefold(), gene_id)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._gene_ids.clear()
+
+
+_default_store: Optional[AnnotationStore] = None
+_default_lock = threading.Lock()
+
+
+def default_annotation_store() -> Optional[AnnotationStore]:
+    """The process-wide store, or None when disabled or while a cassette is active."""
+    global _default_store
+    if ANNOTATION_STORE_SIZE <= 0 or active_cassette():
+        return None
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = AnnotationStore()
+    return _default_store
+
+
+def annotation(entity_id: str) -> Optional[AnnotationRecord]:
+    """The annotation record of ``entity_id`` (``HP:``, ``NCBIGene:``, ``OMIM:``, ...), fetched at most once."""
+    store = default_annotation_store()
+    record = store.record(entity_id) if store else None
+    if record is not None:
+        return record
+    response = fetch_data(ANNOTATION_URL.format(quote(str(entity_id))))
+    if store:
+        return store.remember(entity_id, response)
+    return AnnotationRecord.parse(entity_id, response) if response and isinstance(response, dict) else None
+
+
+async def aannotation(entity_id: str) -> Optional[AnnotationRecord]:
+    store = default_annotation_store()
+    record = store.record(entity_id) if store else None
+    if record is not None:
+        return record
+    response = await afetch_data(ANNOTATION_URL.format(quote(str(entity_id))))
+    if store:
+        return store.remember(entity_id, response)
+    return AnnotationRecord.parse(entity_id, response) if response and isinstance(response, dict) else None
+
+
+def _literal_gene_id(gene_term: str) -> Optional[str]:
+    if gene_term.startswith("NCBIGene:") and gene_term[9:].isdigit():
+        return gene_term
+    if gene_term.isdigit():
+        return f"NCBIGene:{gene_term}"
+    return None
+
+
+def _first_gene_id(response) -> Optional[str]:
+    if response and 'results' in response and len(response['results']) > 0:
+        return response['results'][0]['id']
+    return None
+
+
+def hpo_gene_id(gene_term: str) -> Optional[str]:
+    """The NCBIGene ID the HPO gene search gives for ``gene_term``, resolved at most once per term."""
+    gene_id = _literal_gene_id(gene_term)
+    if gene_id:
+        return gene_id
+    store = default_annotation_store()
+    gene_id = store.gene_id(gene_term) if store else None
+    if gene_id is None:
+        gene_id = _first_gene_id(fetch_data(GENE_SEARCH_URL.format(quote(gene_term))))
+        if gene_id and store:
+            store.remember_gene_id(gene_term, gene_id)
+    return gene_id
+
+
+async def ahpo_gene_id(gene_term: str) -> Optional[str]:
+    gene_id = _literal_gene_id(gene_term)
+    if gene_id:
+        return gene_id
+    store = default_annotation_store()
+    gene_id = store.gene_id(gene_term) if store else None
+    if gene_id is None:
+        gene_id = _first_gene_id(await afetch_data(GENE_SEARCH_URL.format(quote(gene_term))))
+        if gene_id and store:
+            store.remember_gene_id(gene_term, gene_id)
+    return gene_id
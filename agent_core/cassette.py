@@ -0,0 +1,254 @@
+"""Record/replay of upstream HTTP exchanges for offline, deterministic runs.
+
+With ``BIORAGENT_CASSETTE_MODE=record`` every exchange made through
+``http_get``/``ahttp_get`` (and so every ``fetch_data``) is written to a
+compact SQLite cassette: status, content type, compressed body and the
+observed latency, keyed like the response cache (``api_key`` and credential
+headers are never stored). With ``BIORAGENT_CASSETTE_MODE=replay`` the same
+calls are answered from the cassette without touching the network; a request
+that was never recorded fails with ``CassetteMiss``, which the tools treat as
+an unreachable host.
+
+Replay can inject latency so performance runs still see realistic upstream
+timing. ``BIORAGENT_REPLAY_LATENCY`` takes one of:
+    recorded               sleep for the latency observed while recording
+    fixed:MS               a constant delay
+    uniform:LO,HI          uniformly distributed between LO and HI ms
+    lognormal:MEDIAN,SIGMA log-normal around MEDIAN ms
+Leave it empty for no delay. ``BIORAGENT_REPLAY_SEED`` fixes the random draws.
+
+While a cassette is active the on-disk response cache is bypassed so every
+exchange is recorded (or replayed) as it happens, and ``install_llm_cache``
+stores LLM completions next to the cassette so a replayed run also gets the
+same model answers.
+
+Settings:
+    BIORAGENT_CASSETTE_MODE   off (default), record or replay
+    BIORAGENT_CASSETTE        cassette file (default BIORAGENT_CACHE_DIR/cassette.sqlite3)
+    BIORAGENT_REPLAY_LATENCY  injected latency in replay mode, see above
+    BIORAGENT_REPLAY_SEED     seed for the latency draws
+
+Run ``python agent_core/cassette.py stats`` to inspect a cassette.
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from http.client import responses
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from response_cache import CACHE_DIR, _compress, _decompress, cache_key, normalize_url
+
+load_dotenv()
+
+MODES = ("off", "record", "replay")
+CASSETTE_MODE = os.getenv("BIORAGENT_CASSETTE_MODE", "off").strip().lower() or "off"
+CASSETTE_PATH = os.path.expanduser(os.getenv("BIORAGENT_CASSETTE", os.path.join(CACHE_DIR, "cassette.sqlite3")))
+REPLAY_LATENCY = os.getenv("BIORAGENT_REPLAY_LATENCY", "")
+REPLAY_SEED = os.getenv("BIORAGENT_REPLAY_SEED")
+
+if CASSETTE_MODE not in MODES:
+    raise ValueError(f"BIORAGENT_CASSETTE_MODE must be one of {', '.join(MODES)}, not {CASSETTE_MODE!r}")
+
+
+class CassetteMiss(requests.exceptions.ConnectionError, httpx.TransportError):
+    """Raised in replay mode for a request that is not on the cassette."""
+
+    def __init__(self, message: str):
+        requests.exceptions.ConnectionError.__init__(self, message)
+        httpx.TransportError.__init__(self, message)
+
+
+class Exchange(NamedTuple):
+    status: int
+    content_type: str
+    body: bytes
+    elapsed: float
+
+
+def parse_latency(spec: str) -> Callable[[Exchange, random.Random], float]:
+    """Turn a ``BIORAGENT_REPLAY_LATENCY`` spec into a function returning seconds."""
+    kind, _, args = spec.strip().partition(":")
+    kind = kind.lower()
+    try:
+        values = [float(v) for v in args.split(",") if v.strip()]
+        if not kind:
+            return lambda exchange, rng: 0.0
+        if kind == "recorded":
+            return lambda exchange, rng: exchange.elapsed
+        if kind == "fixed":
+            delay_ms, = values
+            return lambda exchange, rng: delay_ms / 1000
+        if kind == "uniform":
+            low_ms, high_ms = values
+            return lambda exchange, rng: rng.uniform(low_ms, high_ms) / 1000
+        if kind == "lognormal":
+            median_ms, sigma = values
+            return lambda exchange, rng: rng.lognormvariate(math.log(median_ms), sigma) / 1000
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid BIORAGENT_REPLAY_LATENCY: {spec!r}")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exchanges (
+    key TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    content_type TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL,
+    elapsed REAL NOT NULL,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exchanges_host ON exchanges (host);
+"""
+
+
+class Cassette:
+    """SQLite store of recorded exchanges; every method is safe to call from any thread."""
+
+    def __init__(self, path: str = CASSETTE_PATH, latency: str = REPLAY_LATENCY, seed: Optional[str] = REPLAY_SEED):
+        self.path = path
+        self.latency = parse_latency(latency)
+        self.rng = random.Random(seed)
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, url: str, headers, params, response, elapsed: float):
+        """Store a ``requests`` or ``httpx`` response for this request, replacing older takes."""
+        codec, blob = _compress(response.content)
+        row = (cache_key(url, params, headers), (urlsplit(url).hostname or "").lower(), normalize_url(url, params),
+               response.status_code, response.headers.get("Content-Type", ""), codec, blob, elapsed, time.time())
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO exchanges VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        with self._lock:
+            self.recorded += 1
+
+    def lookup(self, url: str, headers, params) -> Exchange:
+        row = self._conn().execute(
+            "SELECT status, content_type, codec, body, elapsed FROM exchanges WHERE key = ?",
+            (cache_key(url, params, headers),)).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                raise CassetteMiss(f"Not on the cassette: {normalize_url(url, params)}")
+            self.hits += 1
+        return Exchange(row[0], row[1], _decompress(row[2], row[3]), row[4])
+
+    def delay(self, exchange: Exchange) -> float:
+        with self._lock:
+            return max(0.0, self.latency(exchange, self.rng))
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM exchanges").fetchone()
+        hosts = {host: {"exchanges": n, "errors": errors, "mean_elapsed": mean}
+                 for host, n, errors, mean in conn.execute(
+                     "SELECT host, COUNT(*), SUM(status >= 400), AVG(elapsed) FROM exchanges "
+                     "GROUP BY host ORDER BY COUNT(*) DESC")}
+        return {"path": self.path, "exchanges": count, "bytes": size, "recorded": self.recorded,
+                "hits": self.hits, "misses": self.misses, "hosts": hosts}
+
+
+_active: Optional[Cassette] = None
+_active_lock = threading.Lock()
+
+
+def active_cassette() -> Optional[Cassette]:
+    """The process-wide cassette, or None when ``BIORAGENT_CASSETTE_MODE`` is off."""
+    global _active
+    if CASSETTE_MODE == "off":
+        return None
+    if _active is None:
+        with _active_lock:
+            if _active is None:
+                _active = Cassette()
+    return _active
+
+
+def recording() -> bool:
+    return CASSETTE_MODE == "record"
+
+
+def replaying() -> bool:
+    return CASSETTE_MODE == "replay"
+
+
+def _replayed_request(url: str, exchange: Exchange) -> requests.Response:
+    response = requests.Response()
+    response.status_code = exchange.status
+    response.reason = responses.get(exchange.status, "")
+    response._content = exchange.body
+    response.headers["Content-Type"] = exchange.content_type
+    response.url = url
+    response.encoding = "utf-8"
+    return response
+
+
+def replay(url: str, headers=None, params=None) -> requests.Response:
+    """Answer a ``http_get`` call from the cassette after the injected latency."""
+    cassette = active_cassette()
+    exchange = cassette.lookup(url, headers, params)
+    time.sleep(cassette.delay(exchange))
+    return _replayed_request(url, exchange)
+
+
+async def areplay(url: str, headers=None, params=None) -> httpx.Response:
+    """Async counterpart of ``replay`` for ``ahttp_get``."""
+    cassette = active_cassette()
+    exchange = cassette.lookup(url, headers, params)
+    await asyncio.sleep(cassette.delay(exchange))
+    return httpx.Response(exchange.status, headers={"Content-Type": exchange.content_type},
+                          content=exchange.body, request=httpx.Request("GET", url, params=params))
+
+
+def install_llm_cache():
+    """With a cassette active, memoize LLM completions in a SQLite file beside it."""
+    if CASSETTE_MODE == "off":
+        return
+    from langchain.globals import set_llm_cache
+    from langchain_community.cache import SQLiteCache
+    set_llm_cache(SQLiteCache(database_path=os.path.splitext(CASSETTE_PATH)[0] + ".llm.sqlite3"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect a BioRAGent HTTP cassette.")
+    parser.add_argument("--path", type=str, default=CASSETTE_PATH, help="Cassette file (default: BIORAGENT_CASSETTE).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show recorded exchanges per host.")
+    args = parser.parse_args()
+
+    stats = Cassette(args.path).stats()
+    print(f"path:      {stats['path']}")
+    print(f"exchanges: {stats['exchanges']} ({stats['bytes'] / 1024 / 1024:.2f} MB compressed)")
+    for host, info in stats["hosts"].items():
+        print(f"  {host:<28} exchanges={info['exchanges']:<7} errors={info['errors']:<5} "
+              f"mean_latency={info['mean_elapsed'] * 1000:.0f}ms")
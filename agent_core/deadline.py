@@ -0,0 +1,122 @@
+"""Per-query deadline budget shared by the agents, the tools and the HTTP layer.
+
+``run_agent(question, deadline_s=20)`` opens a ``deadline_scope``; everything
+that runs inside it (agent executors, tool ``_run``/``_arun`` calls,
+``fetch_data``/``http_get`` and their retries) reads ``remaining()`` to cap its
+own timeouts and sleeps. Once the budget is spent, network calls fail fast with
+``DeadlineExceeded`` and ``GuideAgent.handle_query`` returns the best answer it
+has gathered so far.
+
+The deadline is kept in a ``contextvars.ContextVar`` so concurrent queries
+(Streamlit sessions, asyncio tasks) each see their own budget.
+
+``fan_out`` and ``afan_out`` run independent calls concurrently under a
+(possibly shorter) budget and give up on whatever has not finished when it ends.
+
+Settings:
+    BIORAGENT_DEADLINE         default budget in seconds for ``run_agent`` (unset or 0: no deadline)
+    BIORAGENT_FAN_OUT_WORKERS  threads shared by every ``fan_out`` call (default 16)
+"""
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+import httpx
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_DEADLINE = float(os.getenv("BIORAGENT_DEADLINE", "0") or 0)
+FAN_OUT_WORKERS = int(os.getenv("BIORAGENT_FAN_OUT_WORKERS", "16"))
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("bioragent_deadline", default=None)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout, httpx.TimeoutException):
+    """Raised instead of starting network work once the query's budget is spent.
+
+    Like ``resilience.CircuitOpenError`` it subclasses the timeout errors of
+    both HTTP clients so the tools' existing ``except`` clauses handle it.
+    """
+
+    def __init__(self, message: str = "Query deadline exceeded"):
+        requests.exceptions.Timeout.__init__(self, message)
+        httpx.TimeoutException.__init__(self, message)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run the block with a budget of ``seconds``; None or <= 0 means no deadline.
+
+    A nested scope can only shorten the enclosing deadline, never extend it.
+    """
+    expires = _deadline.get()
+    if seconds is not None and seconds > 0:
+        own = time.monotonic() + seconds
+        expires = own if expires is None else min(expires, own)
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget, or None when no deadline is set."""
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return max(0.0, expires - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(what: str = "request"):
+    if expired():
+        raise DeadlineExceeded(f"Query deadline exceeded before {what}")
+
+
+def budget_executor(executor):
+    """A shallow copy of a LangChain ``AgentExecutor`` whose ``max_execution_time`` is the remaining budget.
+
+    The copy stops between ReAct iterations when the deadline passes. The
+    module-level executors are shared by every session, so the limit is never
+    written onto them; invoke the returned copy instead.
+    """
+    return executor.copy(update={"max_execution_time": remaining()})
+
+
+_fan_out_pool = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="bioragent-fan-out")
+
+
+def fan_out(calls: Sequence[Callable[[], object]], seconds: Optional[float] = None) -> List[object]:
+    """Run ``calls`` concurrently; their results in order, None for those unfinished after ``seconds``.
+
+    Each call runs in a copy of the caller's context inside ``deadline_scope(seconds)``,
+    so HTTP timeouts inside it are capped by whichever deadline is nearer.
+    Exceptions raised by a call propagate.
+    """
+    with deadline_scope(seconds):
+        futures = [_fan_out_pool.submit(contextvars.copy_context().run, call) for call in calls]
+        done, _ = wait(futures, timeout=remaining())
+    for future in futures:
+        future.cancel()
+    return [future.result() if future in done else None for future in futures]
+
+
+async def afan_out(awaitables: Sequence[Awaitable], seconds: Optional[float] = None) -> List[object]:
+    """Async counterpart of ``fan_out``; unfinished awaitables are cancelled."""
+    with deadline_scope(seconds):
+        tasks = [asyncio.ensure_future(a) for a in awaitables]
+        done, pending = await asyncio.wait(tasks, timeout=remaining()) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+    return [task.result() if task in done else None for task in tasks]
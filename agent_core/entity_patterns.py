@@ -0,0 +1,117 @@
+"""Identifier syntaxes that tell ``ExistenceCheckTool`` what an input is.
+
+Many inputs identify themselves: ``rs1042522`` is a SNP, ``HP:0001250`` a
+phenotype, ``OMIM:219700``/``ORPHA:558``/``DOID_1485`` a disease and
+``P04637`` a UniProt accession. ``classify`` recognizes these with one
+precompiled regex before the lexicons or any network probe are consulted, so
+the tool checks HPO, DOID and Orphanet IDs against the lexicons and runs only
+the one relevant check for SNPs, OMIM and Ensembl IDs and proteins instead of
+the whole probe fan-out. Syntax alone never confirms an identifier.
+
+Every match is counted in ``metrics`` by rule, together with the number of
+network probes it avoided.
+
+Settings:
+    BIORAGENT_ENTITY_PATTERNS  comma-separated rules to use, e.g. "rsid,hpo,doid"
+                               (default: all; "none" disables the classifier)
+"""
+import os
+import re
+import sys
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+
+load_dotenv()
+
+# Branches of ExistenceCheckTool's fan-out: NCBI gene ID, NCBI symbol (+ Ensembl), protein, SNP.
+FULL_PROBE_COUNT = 4
+
+PATTERN_MATCHES = metrics.Counter("bioragent_entity_pattern_matches_total",
+                                  "ExistenceCheckTool inputs classified by identifier syntax, by rule.")
+PROBES_AVOIDED = metrics.Counter("bioragent_probes_avoided_total",
+                                 "ExistenceCheckTool network probes skipped thanks to identifier syntax, by rule.")
+
+
+class Rule(NamedTuple):
+    name: str
+    entity: str  # type label in ExistenceCheckTool's output
+    pattern: str  # matched against the whole stripped input
+    canonical: str  # identifier template; {digits} is the input's last run of digits, {upper} the input upper-cased
+    probe: Optional[str] = None  # the single network check to run ("snp", "protein", ...); None answers locally
+    exclusive: bool = True  # False: run the full fan-out when the check finds nothing
+    lexicon: Optional[str] = None  # lexicon_snapshot.SOURCES key to resolve the identifier's name in
+    lexicon_id: Optional[str] = None  # identifier template as the lexicon stores it (default: canonical)
+
+
+RULES = (
+    Rule("rsid", "SNP", r"(?i:rs\d+)", "rs{digits}", probe="snp"),
+    Rule("hpo", "Phenotypes", r"(?i:hp:\s?\d{7})", "HP:{digits}", lexicon="phenotypes"),
+    Rule("doid", "Disease1", r"(?i:doid[_:]\s?\d+)", "DOID_{digits}", lexicon="disease_ontology"),
+    Rule("orphanet", "Disease", r"(?i:orpha(?:net)?[_:]\s?\d+)", "ORPHA:{digits}", lexicon="orphanet",
+         lexicon_id="{digits}"),
+    Rule("omim", "Disease", r"(?i:(?:omim|mim)[_:#]\s?\d{6})", "OMIM:{digits}", probe="omim"),
+    Rule("mondo", "Disease", r"(?i:mondo[_:]\s?\d{7})", "MONDO:{digits}"),
+    Rule("ensembl_gene", "Gene", r"(?i:ensg\d{11}(?:\.\d+)?)", "{upper}", probe="ensembl_id"),
+    # UniProt accessions (https://www.uniprot.org/help/accession_numbers). A few gene
+    # symbols share the syntax, so the other probes still run when no protein matches.
+    Rule("uniprot", "protein", r"[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2}",
+         "{upper}", probe="protein", exclusive=False),
+)
+
+
+class EntityMatch(NamedTuple):
+    rule: Rule
+    identifier: str  # canonical form, e.g. "HP:0001250"
+
+    @property
+    def lexicon_id(self) -> str:
+        return _format(self.rule.lexicon_id, self.identifier) if self.rule.lexicon_id else self.identifier
+
+
+def _format(template: str, text: str) -> str:
+    digits = re.findall(r"\d+", text)
+    return template.format(digits=digits[-1] if digits else "", upper=text.upper())
+
+
+def enabled_rules(spec: Optional[str] = None):
+    """The rules named in ``spec`` (``BIORAGENT_ENTITY_PATTERNS``); unknown names are ignored."""
+    spec = os.getenv("BIORAGENT_ENTITY_PATTERNS", "") if spec is None else spec
+    spec = spec.strip().lower()
+    if not spec:
+        return RULES
+    if spec == "none":
+        return ()
+    names = {name.strip() for name in spec.split(",")}
+    return tuple(rule for rule in RULES if rule.name in names)
+
+
+def compile_rules(rules) -> Optional["re.Pattern"]:
+    if not rules:
+        return None
+    return re.compile("|".join(f"(?P<{rule.name}>{rule.pattern})" for rule in rules))
+
+
+ACTIVE_RULES = {rule.name: rule for rule in enabled_rules()}
+_CLASSIFIER = compile_rules(tuple(ACTIVE_RULES.values()))
+
+
+def classify(name: str) -> Optional[EntityMatch]:
+    """The rule whose identifier syntax ``name`` matches, or None."""
+    if _CLASSIFIER is None:
+        return None
+    text = name.strip()
+    m = _CLASSIFIER.fullmatch(text)
+    if m is None:
+        return None
+    rule = ACTIVE_RULES[m.lastgroup]
+    return EntityMatch(rule, _format(rule.canonical, text))
+
+
+def record(match: EntityMatch, probes_run: int):
+    """Count a classified input and the fan-out probes it did not need."""
+    PATTERN_MATCHES.inc(rule=match.rule.name)
+    PROBES_AVOIDED.inc(max(0, FULL_PROBE_COUNT - probes_run), rule=match.rule.name)
@@ -0,0 +1,233 @@
+"""Approximate matching of misspelled or variant names against the lexicons.
+
+``ExistenceCheckTool`` first looks a name up exactly; when that fails and the
+network probes find nothing either, this index finds the closest lexicon names
+so typos and variants ("Brody's myopathy", hyphenation, plurals) still resolve.
+A near-miss is not tried first: "Ataxin" is a protein, not a misspelled "ataxia".
+
+Names are reduced to a fuzzy key (case-folded, possessive "'s" and
+punctuation removed, plural word endings stripped) and indexed by character
+trigrams. A query keeps only
+the rarest ``3 * d + 1`` of its trigrams (an entry within ``d`` edits must
+share at least one of them), counts shared trigrams over those posting lists,
+drops entries whose length differs by more than ``d`` and verifies the best
+few with an optimal-string-alignment edit distance, so a lookup touches a few
+thousand postings instead of the whole lexicon. ``rapidfuzz``
+speeds up the verification when installed.
+
+The index is compiled into a memory-mapped snapshot next to the lexicon
+snapshots (same file layout, see ``lexicon_snapshot``) and rebuilt when any
+source CSV changes.
+
+Settings:
+    BIORAGENT_FUZZY_MAX_DISTANCE  largest edit distance accepted (default 2, 0 disables)
+    BIORAGENT_FUZZY_MIN_LENGTH    shortest name to match approximately (default 5)
+"""
+import hashlib
+import heapq
+import os
+import re
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from lexicon import normalize_term
+from lexicon_snapshot import (SNAPSHOT_DIR, SOURCES, _map_file, _pack_sections, _StringTable, _string_table,
+                              _uint32s, _unpack_sections, _write_snapshot, file_digest)
+
+try:
+    from rapidfuzz.distance import OSA
+except ImportError:
+    OSA = None
+
+load_dotenv()
+
+FUZZY_MAX_DISTANCE = int(os.getenv("BIORAGENT_FUZZY_MAX_DISTANCE", "2"))
+FUZZY_MIN_LENGTH = int(os.getenv("BIORAGENT_FUZZY_MIN_LENGTH", "5"))
+VERIFY_LIMIT = 16  # entries verified with the edit distance per query
+
+MAGIC = b"BRFZ"
+FORMAT_VERSION = 1
+SECTIONS = ("keys", "lengths", "names", "sources", "grams", "gram_ranges", "postings")
+SOURCE_NAMES = tuple(SOURCES)
+
+_POSSESSIVE = re.compile(r"['’]s\b")
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+
+
+class Candidate(NamedTuple):
+    name: str  # normalized lexicon name, usable with the lexicon's ids_for
+    source: str  # key of lexicon_snapshot.SOURCES
+    distance: int
+
+
+def _singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def fuzzy_key(term: str) -> str:
+    text = _POSSESSIVE.sub("", normalize_term(term))
+    return " ".join(_singular(word) for word in _PUNCTUATION.sub(" ", text).split())
+
+
+def trigrams(key: str) -> List[str]:
+    padded = f" {key} "
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+def allowed_distance(key: str) -> int:
+    """Edits tolerated for a key: none for short or identifier-like keys, more for longer names."""
+    if len(key) < FUZZY_MIN_LENGTH or (" " not in key and any(c.isdigit() for c in key)):
+        return 0
+    return min(FUZZY_MAX_DISTANCE, max(1, len(key) // 6))
+
+
+def osa_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``."""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if OSA is not None:
+        return OSA.distance(a, b, score_cutoff=limit)
+    # Only cells within ``limit`` of the diagonal can stay under the cutoff.
+    n, m, over = len(a), len(b), limit + 1
+    previous2, previous = None, [j if j <= limit else over for j in range(m + 1)]
+    for i in range(1, n + 1):
+        current = [over] * (m + 1)
+        if i <= limit:
+            current[0] = i
+        low, high = max(1, i - limit), min(m, i + limit)
+        ai = a[i - 1]
+        for j in range(low, high + 1):
+            bj = b[j - 1]
+            value = previous[j - 1] + (ai != bj)
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and ai == b[j - 2] and a[i - 2] == bj and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[m], over)
+
+
+def compile_index(lexicons: Dict[str, Iterable[str]], digest: bytes) -> bytes:
+    """Serialize a trigram index over the names of each source lexicon."""
+    entries = sorted({(fuzzy_key(name), name, source)
+                      for source, names in lexicons.items() for name in names if fuzzy_key(name)})
+    postings: Dict[str, List[int]] = {}
+    for index, (key, _, _) in enumerate(entries):
+        for gram in trigrams(key):
+            postings.setdefault(gram, []).append(index)
+    grams = sorted(postings, key=lambda g: g.encode("utf-8"))
+    ranges, position = [0], 0
+    for gram in grams:
+        position += len(postings[gram])
+        ranges.append(position)
+    sections = [
+        _string_table([key.encode("utf-8") for key, _, _ in entries]),
+        _uint32s([len(key) for key, _, _ in entries]),
+        _string_table([name.encode("utf-8") for _, name, _ in entries]),
+        bytes(SOURCE_NAMES.index(source) for _, _, source in entries),
+        _string_table([g.encode("utf-8") for g in grams]),
+        _uint32s(ranges),
+        _uint32s([i for gram in grams for i in postings[gram]]),
+    ]
+    return _pack_sections(MAGIC, FORMAT_VERSION, digest, sections)
+
+
+class FuzzyIndex:
+    def __init__(self, buffer, digest: Optional[bytes] = None):
+        self.digest, sections = _unpack_sections(buffer, MAGIC, FORMAT_VERSION, SECTIONS, digest)
+        self._buffer = buffer
+        self._keys = _StringTable(sections["keys"])
+        self._lengths = np.frombuffer(sections["lengths"], dtype=np.uint32)
+        self._names = _StringTable(sections["names"])
+        self._sources = sections["sources"]
+        self._grams = _StringTable(sections["grams"])
+        self._gram_ranges = sections["gram_ranges"].cast("I")
+        self._postings = np.frombuffer(sections["postings"], dtype=np.uint32)
+        self._gram_ids: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def open(cls, path: str, digest: Optional[bytes] = None, use_mmap: bool = True) -> "FuzzyIndex":
+        return cls(_map_file(path, use_mmap), digest)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, term: str, k: int = 5, max_distance: Optional[int] = None) -> List[Candidate]:
+        """Up to ``k`` lexicon names at the smallest edit distance within the cutoff."""
+        key = fuzzy_key(term)
+        limit = allowed_distance(key) if max_distance is None else max_distance
+        if limit <= 0:
+            return []
+        if self._gram_ids is None:
+            # Bisecting the gram table costs more than the rest of a lookup; a dict is built once.
+            self._gram_ids = {self._grams.text(i): i for i in range(len(self._grams))}
+        ranges = []
+        for gram in trigrams(key):
+            i = self._gram_ids.get(gram)
+            ranges.append((self._gram_ranges[i], self._gram_ranges[i + 1]) if i is not None else (0, 0))
+        ranges.sort(key=lambda r: r[1] - r[0])
+        lists = [self._postings[start:end] for start, end in ranges[:3 * limit + 1]]
+        entries, shared = np.unique(np.concatenate(lists), return_counts=True)
+        length_gap = np.abs(self._lengths[entries].astype(np.int64) - len(key))
+        near = length_gap <= limit
+        entries, shared, length_gap = entries[near], shared[near], length_gap[near]
+        if len(entries) > VERIFY_LIMIT:
+            best = np.argpartition(length_gap - shared * (limit + 1), VERIFY_LIMIT - 1)[:VERIFY_LIMIT]
+            entries, shared = entries[best], shared[best]
+
+        results = []
+        order = np.argsort(-shared, kind="stable")
+        for entry, count in zip(entries[order].tolist(), shared[order].tolist()):
+            distance = osa_distance(key, self._keys.text(entry), limit)
+            if distance <= limit:
+                results.append((distance, -count, entry))
+                limit = distance  # only names at least as close as this one are returned
+        results.sort()
+        return [Candidate(self._names.text(entry), SOURCE_NAMES[self._sources[entry]], distance)
+                for distance, _, entry in results[:k] if distance == limit]
+
+
+def index_digest() -> bytes:
+    sha = hashlib.sha256(MAGIC + bytes([FORMAT_VERSION]))
+    for csv_path, _ in SOURCES.values():
+        sha.update(file_digest(csv_path))
+    return sha.digest()
+
+
+def build_index(snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    digest = index_digest()
+    path = os.path.join(snapshot_dir, f"fuzzy-{digest.hex()[:16]}.idx")
+    lexicons = {source: loader(csv_path).name_to_ids for source, (csv_path, loader) in SOURCES.items()}
+    _write_snapshot(path, compile_index(lexicons, digest), os.path.join(snapshot_dir, "fuzzy-*.idx"))
+    return path
+
+
+def load_index(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[FuzzyIndex]:
+    """The fuzzy index for the current lexicon CSVs, compiled first if needed; None if disabled or unavailable."""
+    if FUZZY_MAX_DISTANCE <= 0:
+        return None
+    digest = index_digest()
+    try:
+        return FuzzyIndex.open(os.path.join(snapshot_dir, f"fuzzy-{digest.hex()[:16]}.idx"), digest)
+    except (OSError, ValueError):
+        pass
+    try:
+        return FuzzyIndex.open(build_index(snapshot_dir), digest)
+    except (OSError, ValueError) as e:
+        print(f"Fuzzy lexicon index unavailable: {e}")
+        return None
@@ -0,0 +1,377 @@
+"""Local index of human genes ingested from NCBI ``gene_info`` or HGNC dumps.
+
+``GeneInfoTool`` needs several HTTP calls per gene (Datasets symbol -> ID,
+esearch, esummary, Ensembl fallback) and ``ExistenceCheckTool`` probes NCBI to
+learn that a name is a gene. With this index both answer symbols, aliases,
+previous symbols, chromosome, map location and (once fetched) the RefSeq
+summary locally, and only go to the network for names the index does not know.
+
+Build it from a downloaded file; either format is detected from its header
+and ``.gz`` files are read directly. Ingesting both merges their aliases:
+
+    python agent_core/gene_index.py ingest Homo_sapiens.gene_info.gz
+    python agent_core/gene_index.py ingest hgnc_complete_set.txt
+
+Neither dump carries the gene summaries; ``summaries`` fills them in with
+batched esummary calls (protein-coding genes by default):
+
+    python agent_core/gene_index.py summaries
+
+Genes live in one SQLite database: a ``genes`` table, a ``names`` table
+(symbol/alias/previous symbol -> gene, indexed case-insensitively) and an FTS5
+table for free-text search over symbols, names and summaries.
+
+Settings:
+    BIORAGENT_GENE_INDEX  database file (default BIORAGENT_CACHE_DIR/gene_index.sqlite3)
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from response_cache import CACHE_DIR
+
+load_dotenv()
+
+GENE_INDEX_PATH = os.path.expanduser(os.getenv("BIORAGENT_GENE_INDEX", os.path.join(CACHE_DIR, "gene_index.sqlite3")))
+HUMAN_TAXON = "9606"
+SUMMARY_BATCH = 200  # ids per esummary GET, NCBI's suggested maximum without POST
+MAX_MATCHES = 5  # genes returned for an ambiguous alias
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS genes (
+    gene_id TEXT PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    chromosome TEXT NOT NULL DEFAULT '',
+    map_location TEXT NOT NULL DEFAULT '',
+    gene_type TEXT NOT NULL DEFAULT '',
+    aliases TEXT NOT NULL DEFAULT '[]',
+    designations TEXT NOT NULL DEFAULT '[]',
+    hgnc_id TEXT NOT NULL DEFAULT '',
+    ensembl_id TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS names (
+    name TEXT NOT NULL COLLATE NOCASE,
+    gene_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    PRIMARY KEY (name, gene_id)
+);
+CREATE INDEX IF NOT EXISTS genes_hgnc ON genes (hgnc_id COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS names_gene ON names (gene_id);
+-- genes_fts.rowid is genes.rowid
+CREATE VIRTUAL TABLE IF NOT EXISTS genes_fts USING fts5(symbol, aliases, name, summary);
+"""
+
+# names.kind, best first: a term that is some gene's approved symbol never resolves through aliases.
+KINDS = ("symbol", "alias", "previous")
+
+
+class GeneRecord(NamedTuple):
+    gene_id: str  # NCBI GeneID, or the HGNC ID for HGNC entries without one
+    symbol: str
+    name: str
+    chromosome: str
+    map_location: str
+    gene_type: str
+    aliases: Tuple[str, ...]
+    designations: Tuple[str, ...]
+    hgnc_id: str
+    ensembl_id: str
+    summary: str
+
+    def esummary(self) -> dict:
+        """The record shaped like an E-utilities gene esummary document."""
+        return {
+            "uid": self.gene_id,
+            "name": self.symbol,
+            "description": self.name,
+            "chromosome": self.chromosome,
+            "maplocation": self.map_location,
+            "otheraliases": ", ".join(self.aliases),
+            "otherdesignations": "|".join(self.designations),
+            "summary": self.summary,
+            "genetype": self.gene_type,
+            "hgnc_id": self.hgnc_id,
+            "ensembl_id": self.ensembl_id,
+            "source": "local gene index",
+        }
+
+
+def _split(value: str, separator: str = "|") -> List[str]:
+    value = (value or "").strip().strip('"')
+    if value in ("", "-"):
+        return []
+    return [part.strip() for part in value.split(separator) if part.strip() and part.strip() != "-"]
+
+
+def _chromosome(location: str) -> str:
+    """Chromosome of an HGNC location such as "17q21.31", "Xp22.33" or "mitochondria"."""
+    location = location.strip()
+    if location.lower().startswith("mito"):
+        return "MT"
+    chromosome = ""
+    for char in location:
+        if not (char.isdigit() or char in "XY"):
+            break
+        chromosome += char
+    return chromosome
+
+
+def _open_text(path: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_gene_info(rows: Iterable[Dict[str, str]]) -> Iterator[Tuple[GeneRecord, List[str]]]:
+    """Records and previous symbols from NCBI ``gene_info`` rows (human genes only)."""
+    for row in rows:
+        if row.get("#tax_id", row.get("tax_id")) != HUMAN_TAXON:
+            continue
+        xrefs = dict(x.split(":", 1) for x in _split(row.get("dbXrefs", "")) if ":" in x)
+        authority_symbol = row.get("Symbol_from_nomenclature_authority", "-")
+        full_name = row.get("Full_name_from_nomenclature_authority", "-")
+        yield GeneRecord(
+            gene_id=row["GeneID"],
+            symbol=row["Symbol"],
+            name=full_name if full_name != "-" else row.get("description", ""),
+            chromosome=row.get("chromosome", "").replace("-", ""),
+            map_location=row.get("map_location", "").replace("-", ""),
+            gene_type=row.get("type_of_gene", ""),
+            aliases=tuple(_split(row.get("Synonyms", ""))),
+            designations=tuple(_split(row.get("Other_designations", ""))),
+            hgnc_id=xrefs.get("HGNC", ""),
+            ensembl_id=xrefs.get("Ensembl", ""),
+            summary="",
+        ), [authority_symbol] if authority_symbol not in ("-", row["Symbol"]) else []
+
+
+def read_hgnc(rows: Iterable[Dict[str, str]]) -> Iterator[Tuple[GeneRecord, List[str]]]:
+    """Records and previous symbols from the HGNC complete set (approved symbols only)."""
+    for row in rows:
+        if row.get("status", "Approved") != "Approved":
+            continue
+        location = row.get("location", "")
+        yield GeneRecord(
+            gene_id=row.get("entrez_id", "").strip() or row["hgnc_id"],
+            symbol=row["symbol"],
+            name=row.get("name", ""),
+            chromosome=_chromosome(location),
+            map_location=location,
+            gene_type=row.get("locus_type", ""),
+            aliases=tuple(_split(row.get("alias_symbol", ""))),
+            designations=tuple(_split(row.get("alias_name", ""))),
+            hgnc_id=row["hgnc_id"],
+            ensembl_id=row.get("ensembl_gene_id", ""),
+            summary="",
+        ), _split(row.get("prev_symbol", ""))
+
+
+def read_dump(path: str) -> Iterator[Tuple[GeneRecord, List[str]]]:
+    """Records from a gene_info or HGNC file, chosen by its header."""
+    with _open_text(path) as f:
+        reader = csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+        fields = set(reader.fieldnames or ())
+        if {"GeneID", "Symbol"} <= fields:
+            yield from read_gene_info(reader)
+        elif {"hgnc_id", "symbol"} <= fields:
+            yield from read_hgnc(reader)
+        else:
+            raise ValueError(f"{path} is neither an NCBI gene_info nor an HGNC file")
+
+
+def _merge(old: Optional[GeneRecord], new: GeneRecord) -> GeneRecord:
+    if old is None:
+        return new
+    merged = {field: getattr(new, field) or getattr(old, field) for field in GeneRecord._fields}
+    merged["aliases"] = tuple(dict.fromkeys(old.aliases + new.aliases))
+    merged["designations"] = tuple(dict.fromkeys(old.designations + new.designations))
+    merged["summary"] = old.summary or new.summary
+    return GeneRecord(**merged)
+
+
+class GeneIndex:
+    """Gene lookups over the SQLite index; every method is safe to call from any thread."""
+
+    def __init__(self, path: str = GENE_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM genes").fetchone()[0]
+
+    @staticmethod
+    def _record(row) -> GeneRecord:
+        values = list(row)
+        values[6], values[7] = tuple(json.loads(values[6])), tuple(json.loads(values[7]))
+        return GeneRecord(*values)
+
+    def get(self, gene_id: str) -> Optional[GeneRecord]:
+        row = self._conn().execute(f"SELECT {', '.join(GeneRecord._fields)} FROM genes WHERE gene_id = ?",
+                                   (str(gene_id),)).fetchone()
+        return self._record(row) if row else None
+
+    def lookup(self, term: str) -> List[GeneRecord]:
+        """Genes whose GeneID, HGNC ID or approved symbol is ``term``, else those with it as alias or previous symbol."""
+        term = term.strip()
+        if term.isdigit() or term.upper().startswith("HGNC:"):
+            record = self.get(term) or next(iter(self._by_hgnc(term)), None)
+            return [record] if record else []
+        rows = self._conn().execute("SELECT gene_id, kind FROM names WHERE name = ?", (term,)).fetchall()
+        if not rows:
+            return []
+        best = min(KINDS.index(kind) for _, kind in rows)
+        gene_ids = [gene_id for gene_id, kind in rows if KINDS.index(kind) == best][:MAX_MATCHES]
+        return [record for record in map(self.get, gene_ids) if record]
+
+    def _by_hgnc(self, hgnc_id: str) -> List[GeneRecord]:
+        rows = self._conn().execute(f"SELECT {', '.join(GeneRecord._fields)} FROM genes WHERE hgnc_id = ? COLLATE NOCASE",
+                                    (hgnc_id,)).fetchall()
+        return [self._record(row) for row in rows]
+
+    def search(self, text: str, limit: int = 10) -> List[GeneRecord]:
+        """Full-text search over symbols, aliases, names and summaries, best match first."""
+        query = " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+        if not query:
+            return []
+        try:
+            rows = self._conn().execute("SELECT genes.gene_id FROM genes_fts JOIN genes ON genes.rowid = genes_fts.rowid "
+                                        "WHERE genes_fts MATCH ? ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [record for record in (self.get(gene_id) for (gene_id,) in rows) if record]
+
+    def ingest(self, records: Iterable[Tuple[GeneRecord, List[str]]]) -> int:
+        """Insert or merge records; returns how many were read."""
+        conn = self._conn()
+        count = 0
+        with conn:
+            for record, previous in records:
+                record = _merge(self.get(record.gene_id), record)
+                columns = ", ".join(GeneRecord._fields)
+                updates = ", ".join(f"{field} = excluded.{field}" for field in GeneRecord._fields[1:])
+                conn.execute(f"INSERT INTO genes ({columns}) VALUES ({', '.join('?' * len(GeneRecord._fields))}) "
+                             f"ON CONFLICT (gene_id) DO UPDATE SET {updates}",
+                             record[:6] + (json.dumps(record.aliases), json.dumps(record.designations)) + record[8:])
+                names = [(record.symbol, "symbol")] + [(alias, "alias") for alias in record.aliases] + \
+                        [(symbol, "previous") for symbol in previous]
+                conn.executemany("INSERT OR REPLACE INTO names (name, gene_id, kind) VALUES (?, ?, ?)",
+                                 [(name, record.gene_id, kind) for name, kind in names])
+                self._index_text(conn, record)
+                count += 1
+        return count
+
+    @staticmethod
+    def _index_text(conn: sqlite3.Connection, record: GeneRecord):
+        (rowid,) = conn.execute("SELECT rowid FROM genes WHERE gene_id = ?", (record.gene_id,)).fetchone()
+        conn.execute("DELETE FROM genes_fts WHERE rowid = ?", (rowid,))
+        conn.execute("INSERT INTO genes_fts (rowid, symbol, aliases, name, summary) VALUES (?, ?, ?, ?, ?)",
+                     (rowid, record.symbol, " ".join(record.aliases), record.name, record.summary))
+
+    def set_summaries(self, summaries: Dict[str, str]):
+        conn = self._conn()
+        with conn:
+            for gene_id, summary in summaries.items():
+                conn.execute("UPDATE genes SET summary = ? WHERE gene_id = ?", (summary, gene_id))
+                record = self.get(gene_id)
+                if record:
+                    self._index_text(conn, record)
+
+    def missing_summaries(self, gene_type: Optional[str] = "protein-coding") -> List[str]:
+        sql = "SELECT gene_id FROM genes WHERE summary = '' AND gene_id GLOB '[0-9]*'"
+        args = ()
+        if gene_type:
+            sql += " AND gene_type IN (?, ?)"
+            args = (gene_type, "gene with protein product")  # gene_info and HGNC spellings
+        return [gene_id for (gene_id,) in self._conn().execute(sql, args)]
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        genes, summaries = conn.execute("SELECT COUNT(*), COALESCE(SUM(summary != ''), 0) FROM genes").fetchone()
+        names = dict(conn.execute("SELECT kind, COUNT(*) FROM names GROUP BY kind").fetchall())
+        return {"path": self.path, "genes": genes, "summaries": summaries, "names": names}
+
+
+_default_index: Optional[GeneIndex] = None
+_default_lock = threading.Lock()
+
+
+def default_gene_index() -> Optional[GeneIndex]:
+    """The gene index at ``BIORAGENT_GENE_INDEX``, or None until one has been ingested."""
+    global _default_index
+    if _default_index is None and os.path.exists(GENE_INDEX_PATH):
+        with _default_lock:
+            if _default_index is None:
+                try:
+                    index = GeneIndex(GENE_INDEX_PATH)
+                    _default_index = index if len(index) else None
+                except sqlite3.Error as e:
+                    print(f"Gene index unavailable: {e}")
+    return _default_index
+
+
+def fetch_summaries(index: GeneIndex, gene_ids: List[str], batch: int = SUMMARY_BATCH) -> int:
+    """Fill in RefSeq summaries from E-utilities esummary, ``batch`` IDs per call."""
+    from http_client import fetch_data
+    url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+    filled = 0
+    for start in range(0, len(gene_ids), batch):
+        ids = gene_ids[start:start + batch]
+        response = fetch_data(url, params={"db": "gene", "id": ",".join(ids), "retmode": "json"})
+        result = (response or {}).get("result", {})
+        summaries = {gene_id: result[gene_id].get("summary", "") for gene_id in ids
+                     if isinstance(result.get(gene_id), dict)}
+        index.set_summaries({gene_id: summary for gene_id, summary in summaries.items() if summary})
+        filled += sum(1 for summary in summaries.values() if summary)
+        print(f"{min(start + batch, len(gene_ids))}/{len(gene_ids)} genes, {filled} summaries")
+    return filled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the local human gene index.")
+    parser.add_argument("--path", type=str, default=GENE_INDEX_PATH, help="Index database (default: BIORAGENT_GENE_INDEX).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = sub.add_parser("ingest", help="Load an NCBI gene_info or HGNC complete-set file (.gz allowed).")
+    ingest_parser.add_argument("files", nargs="+", help="Files to ingest, in order.")
+    summaries_parser = sub.add_parser("summaries", help="Fetch missing gene summaries with batched esummary calls.")
+    summaries_parser.add_argument("--all-types", action="store_true", help="Not only protein-coding genes.")
+    lookup_parser = sub.add_parser("lookup", help="Look up a symbol, alias, GeneID or HGNC ID.")
+    lookup_parser.add_argument("term", type=str)
+    sub.add_parser("stats", help="Show gene, name and summary counts.")
+    args = parser.parse_args()
+
+    index = GeneIndex(args.path)
+    if args.command == "ingest":
+        for path in args.files:
+            start = time.perf_counter()
+            count = index.ingest(read_dump(path))
+            print(f"{path}: {count} genes in {time.perf_counter() - start:.1f}s")
+    elif args.command == "summaries":
+        fetch_summaries(index, index.missing_summaries(None if args.all_types else "protein-coding"))
+    elif args.command == "lookup":
+        print(json.dumps([record.esummary() for record in index.lookup(args.term)], indent=4))
+    else:
+        print(json.dumps(index.stats(), indent=4))
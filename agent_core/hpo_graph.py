@@ -0,0 +1,323 @@
+"""Compact, memory-mapped HPO graph for parents/children/ancestors/descendants queries.
+
+``PhenotypesParentsTool`` and ``PhenotypesChildrenTool`` otherwise make one
+ontology.jax.org call per hop, and descendant lists are pulled remotely. This
+module compiles ``hp.obo`` or ``hp.json`` (obographs) once into an array-backed
+DAG and answers those queries, plus subsumption checks, locally:
+
+    term_ids         sorted uint32 numeric part of each HP ID; a term's node number is its position
+    names            string table of term labels, by node
+    parents          CSR adjacency (per-node range into a uint32 node list) of ``is_a`` edges
+    children         the same edges reversed
+    ancestors        precomputed transitive closure, sorted node numbers per node
+    descendants      the closure reversed
+    alt_ids/targets  sorted alternative (merged) IDs and the node each resolves to
+
+Sections use the ``lexicon_snapshot`` container (header with the source file's
+SHA-256, 4-byte aligned sections) and are read in place through memoryviews,
+so opening the graph costs a page fault, not a parse.
+
+    python agent_core/hpo_graph.py build hp.obo
+    python agent_core/hpo_graph.py descendants HP:0001250
+
+Settings:
+    BIORAGENT_HPO_GRAPH  compiled graph file (default BIORAGENT_CACHE_DIR/hpo_graph.bin)
+"""
+import argparse
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from lexicon_snapshot import _StringTable, _map_file, _pack_sections, _string_table, _unpack_sections, _write_snapshot, file_digest
+from response_cache import CACHE_DIR
+
+load_dotenv()
+
+HPO_GRAPH_PATH = os.path.expanduser(os.getenv("BIORAGENT_HPO_GRAPH", os.path.join(CACHE_DIR, "hpo_graph.bin")))
+MAGIC = b"BRHG"
+FORMAT_VERSION = 1
+SECTIONS = ("term_ids", "names", "parent_ranges", "parents", "child_ranges", "children",
+            "ancestor_ranges", "ancestors", "descendant_ranges", "descendants", "alt_ids", "alt_targets")
+
+_HP_ID = re.compile(r"(?i)^\s*(?:hp[:_])?\s*(\d{1,7})\s*$")
+_OBO_PURL = "http://purl.obolibrary.org/obo/"
+
+# term ID -> (name, parent IDs), and alternative ID -> term ID
+Terms = Dict[str, Tuple[str, List[str]]]
+
+
+def hp_number(term_id) -> Optional[int]:
+    """The numeric part of an HP ID ("HP:0001250", "HP_0001250", "0001250" or 1250), else None."""
+    if isinstance(term_id, int):
+        return term_id
+    m = _HP_ID.match(str(term_id))
+    return int(m.group(1)) if m else None
+
+
+def hp_id(number: int) -> str:
+    return f"HP:{number:07d}"
+
+
+def read_obo(lines: Iterable[str]) -> Tuple[Terms, Dict[str, str]]:
+    """Terms and alternative IDs from ``hp.obo``; obsolete terms are skipped."""
+    terms, alt_ids = {}, {}
+    stanza = None
+
+    def flush():
+        if stanza and stanza.get("id", "").startswith("HP:") and not stanza.get("obsolete"):
+            terms[stanza["id"]] = (stanza.get("name", ""), stanza["is_a"])
+            for alt in stanza["alt_id"]:
+                alt_ids[alt] = stanza["id"]
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith("["):
+            flush()
+            stanza = {"is_a": [], "alt_id": []} if line == "[Term]" else None
+        elif stanza is not None and ": " in line:
+            tag, value = line.split(": ", 1)
+            value = value.split(" ! ", 1)[0].strip()
+            if tag in ("is_a", "alt_id"):
+                stanza[tag].append(value.split()[0])
+            elif tag in ("id", "name"):
+                stanza[tag] = value
+            elif tag == "is_obsolete" and value == "true":
+                stanza["obsolete"] = True
+    flush()
+    return terms, alt_ids
+
+
+def read_obographs(document: dict) -> Tuple[Terms, Dict[str, str]]:
+    """Terms and alternative IDs from ``hp.json`` (obographs); deprecated terms are skipped."""
+    def curie(iri: str) -> str:
+        return iri[len(_OBO_PURL):].replace("_", ":", 1) if iri.startswith(_OBO_PURL) else iri
+
+    graph = document["graphs"][0]
+    terms, alt_ids = {}, {}
+    for node in graph.get("nodes", []):
+        term_id, meta = curie(node["id"]), node.get("meta", {})
+        if not term_id.startswith("HP:") or node.get("type", "CLASS") != "CLASS" or meta.get("deprecated"):
+            continue
+        terms[term_id] = (node.get("lbl", ""), [])
+        for prop in meta.get("basicPropertyValues", []):
+            if prop.get("pred", "").endswith("hasAlternativeId"):
+                alt_ids[prop["val"]] = term_id
+    for edge in graph.get("edges", []):
+        sub, obj = curie(edge["sub"]), curie(edge["obj"])
+        if edge.get("pred") == "is_a" and sub in terms:
+            terms[sub][1].append(obj)
+    return terms, alt_ids
+
+
+def read_ontology(path: str) -> Tuple[Terms, Dict[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return read_obographs(json.load(f))
+        return read_obo(f)
+
+
+def _csr(groups: List[List[int]]) -> Tuple[bytes, bytes]:
+    ranges, position = array("I", [0]), 0
+    for group in groups:
+        position += len(group)
+        ranges.append(position)
+    return ranges.tobytes(), array("I", [i for group in groups for i in group]).tobytes()
+
+
+def compile_graph(terms: Terms, alt_ids: Dict[str, str], digest: bytes) -> bytes:
+    """Serialize the ``is_a`` DAG with its closure in both directions."""
+    numbers = sorted(hp_number(term_id) for term_id in terms)
+    node = {hp_id(number): i for i, number in enumerate(numbers)}
+    parents = [sorted({node[p] for p in terms[hp_id(number)][1] if p in node}) for number in numbers]
+    children = [[] for _ in numbers]
+    for child, group in enumerate(parents):
+        for parent in group:
+            children[parent].append(child)
+
+    # Closure in topological order (parents before children), so each node unions finished sets.
+    ancestors: List[Optional[set]] = [None] * len(numbers)
+    pending = [len(group) for group in parents]
+    ready = [i for i, count in enumerate(pending) if count == 0]
+    while ready:
+        i = ready.pop()
+        closure = set()
+        for parent in parents[i]:
+            closure.add(parent)
+            closure |= ancestors[parent]
+        ancestors[i] = closure
+        for child in children[i]:
+            pending[child] -= 1
+            if pending[child] == 0:
+                ready.append(child)
+    if any(closure is None for closure in ancestors):
+        raise ValueError("the is_a graph has a cycle")
+    descendants = [[] for _ in numbers]
+    for i, closure in enumerate(ancestors):
+        for ancestor in closure:
+            descendants[ancestor].append(i)
+
+    alts = sorted((hp_number(alt), node[target]) for alt, target in alt_ids.items()
+                  if target in node and hp_number(alt) is not None and alt not in node)
+    sections = [array("I", numbers).tobytes(),
+                _string_table([terms[hp_id(number)][0].encode("utf-8") for number in numbers])]
+    for groups in (parents, children, [sorted(closure) for closure in ancestors], descendants):
+        sections.extend(_csr(groups))
+    sections += [array("I", [alt for alt, _ in alts]).tobytes(), array("I", [target for _, target in alts]).tobytes()]
+    return _pack_sections(MAGIC, FORMAT_VERSION, digest, sections)
+
+
+class HPOGraph:
+    """Read-only HPO ``is_a`` graph; term arguments accept any form ``hp_number`` parses."""
+
+    def __init__(self, buffer, digest: Optional[bytes] = None):
+        self.digest, sections = _unpack_sections(buffer, MAGIC, FORMAT_VERSION, SECTIONS, digest)
+        self._buffer = buffer
+        self._numbers = sections["term_ids"].cast("I")
+        self._names = _StringTable(sections["names"])
+        self._edges = {relation: (sections[f"{singular}_ranges"].cast("I"), sections[relation].cast("I"))
+                       for relation, singular in (("parents", "parent"), ("children", "child"),
+                                                  ("ancestors", "ancestor"), ("descendants", "descendant"))}
+        self._alt_ids = sections["alt_ids"].cast("I")
+        self._alt_targets = sections["alt_targets"].cast("I")
+
+    @classmethod
+    def open(cls, path: str, digest: Optional[bytes] = None, use_mmap: bool = True) -> "HPOGraph":
+        return cls(_map_file(path, use_mmap), digest)
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __contains__(self, term_id) -> bool:
+        return self.node(term_id) is not None
+
+    @staticmethod
+    def _find(values, number: int) -> int:
+        i = bisect.bisect_left(values, number)
+        return i if i < len(values) and values[i] == number else -1
+
+    def node(self, term_id) -> Optional[int]:
+        """The node number of a term, following alternative IDs; None when unknown."""
+        number = hp_number(term_id)
+        if number is None:
+            return None
+        i = self._find(self._numbers, number)
+        if i >= 0:
+            return i
+        i = self._find(self._alt_ids, number)
+        return self._alt_targets[i] if i >= 0 else None
+
+    def term_id(self, node: int) -> str:
+        return hp_id(self._numbers[node])
+
+    def name(self, term_id) -> Optional[str]:
+        node = self.node(term_id)
+        return self._names.text(node) if node is not None else None
+
+    def _related(self, relation: str, term_id) -> List[int]:
+        node = self.node(term_id)
+        if node is None:
+            return []
+        ranges, targets = self._edges[relation]
+        return targets[ranges[node]:ranges[node + 1]].tolist()
+
+    def parents(self, term_id) -> List[str]:
+        return [self.term_id(node) for node in self._related("parents", term_id)]
+
+    def children(self, term_id) -> List[str]:
+        return [self.term_id(node) for node in self._related("children", term_id)]
+
+    def ancestors(self, term_id) -> List[str]:
+        return [self.term_id(node) for node in self._related("ancestors", term_id)]
+
+    def descendants(self, term_id) -> List[str]:
+        return [self.term_id(node) for node in self._related("descendants", term_id)]
+
+    def _descendant_count(self, node: int) -> int:
+        ranges = self._edges["descendants"][0]
+        return ranges[node + 1] - ranges[node]
+
+    def descendant_count(self, term_id) -> int:
+        node = self.node(term_id)
+        return self._descendant_count(node) if node is not None else 0
+
+    def is_a(self, term_id, ancestor_id) -> bool:
+        """True when ``term_id`` is ``ancestor_id`` or one of its descendants."""
+        node, ancestor = self.node(term_id), self.node(ancestor_id)
+        if node is None or ancestor is None:
+            return False
+        if node == ancestor:
+            return True
+        ranges, targets = self._edges["ancestors"]
+        start, end = ranges[node], ranges[node + 1]
+        i = bisect.bisect_left(targets, ancestor, start, end)
+        return i < end and targets[i] == ancestor
+
+    def describe(self, term_ids: Iterable[str]) -> List[dict]:
+        """Terms shaped like the ontology.jax.org parents/children/descendants listings."""
+        nodes = [self.node(term_id) for term_id in term_ids]
+        return [{"id": self.term_id(node), "name": self._names.text(node), "descendantCount": self._descendant_count(node)}
+                for node in nodes if node is not None]
+
+
+def build_graph(source: str, path: str = HPO_GRAPH_PATH) -> str:
+    """Compile ``hp.obo``/``hp.json`` into ``path``."""
+    terms, alt_ids = read_ontology(source)
+    _write_snapshot(path, compile_graph(terms, alt_ids, file_digest(source)), path)
+    return path
+
+
+_default_graph: Optional[HPOGraph] = None
+_default_lock = threading.Lock()
+
+
+def default_hpo_graph() -> Optional[HPOGraph]:
+    """The graph at ``BIORAGENT_HPO_GRAPH``, or None until one has been built."""
+    global _default_graph
+    if _default_graph is None and os.path.exists(HPO_GRAPH_PATH):
+        with _default_lock:
+            if _default_graph is None:
+                try:
+                    _default_graph = HPOGraph.open(HPO_GRAPH_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"HPO graph unavailable: {e}")
+    return _default_graph
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile and query the local HPO graph.")
+    parser.add_argument("--path", type=str, default=HPO_GRAPH_PATH, help="Compiled graph (default: BIORAGENT_HPO_GRAPH).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Compile hp.obo or hp.json.")
+    build_parser.add_argument("source", type=str)
+    for relation in ("parents", "children", "ancestors", "descendants"):
+        relation_parser = sub.add_parser(relation, help=f"List the {relation} of a term.")
+        relation_parser.add_argument("term", type=str)
+    is_a_parser = sub.add_parser("is-a", help="Check whether TERM is ANCESTOR or one of its descendants.")
+    is_a_parser.add_argument("term", type=str)
+    is_a_parser.add_argument("ancestor", type=str)
+    sub.add_parser("stats", help="Show term and edge counts.")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        build_graph(args.source, args.path)
+        graph = HPOGraph.open(args.path)
+        print(f"{args.path}: {len(graph)} terms in {time.perf_counter() - start:.1f}s")
+        sys.exit(0)
+    graph = HPOGraph.open(args.path)
+    if args.command == "is-a":
+        print(graph.is_a(args.term, args.ancestor))
+    elif args.command == "stats":
+        print(json.dumps({"path": args.path, "terms": len(graph),
+                          **{relation: len(graph._edges[relation][1]) for relation in graph._edges}}, indent=4))
+    else:
+        print(json.dumps(graph.describe(getattr(graph, args.command)(args.term)), indent=4))
@@ -0,0 +1,420 @@
+"""Shared HTTP transport for the biomedical tools.
+
+Every upstream lookup (NCBI, HPO, UniProt, Ensembl, Orphadata, ...) goes through
+one pooled ``requests.Session`` per host, so repeated calls reuse keep-alive
+connections instead of paying a fresh TCP/TLS handshake each time.
+
+Calls are paced by the per-host token buckets in ``rate_limit``; E-utilities
+requests carry ``NCBI_API_KEY`` (when set) so NCBI grants the higher limit.
+
+Successful JSON responses are kept in the on-disk ``response_cache``, and
+identical requests that are in flight at the same time are coalesced into one
+(see ``inflight.stats()`` for the number of coalesced calls).
+
+Transient failures (connection errors, timeouts, 429, 5xx) are retried with
+decorrelated-jitter backoff and ``Retry-After`` support, and every host sits
+behind a circuit breaker (see ``resilience``) that fails fast while it is down.
+
+Inside a ``deadline.deadline_scope`` request timeouts and retry sleeps are
+capped by the remaining budget, and once it is spent calls fail fast with
+``DeadlineExceeded`` (``fetch_data`` returns None).
+
+With ``BIORAGENT_CASSETTE_MODE`` set, exchanges are recorded to or replayed from
+a ``cassette`` instead of the response cache.
+
+Latency, status codes, bytes, cache lookups and retries are recorded per host
+in ``metrics``.
+
+``ahttp_get``/``afetch_data`` are the asyncio counterparts used by the tools'
+``_arun``; they share one ``httpx.AsyncClient`` per event loop.
+
+Pool size, connection-level adapter retries and the default timeout can be tuned with the
+``BIORAGENT_HTTP_POOL_SIZE``, ``BIORAGENT_HTTP_RETRIES`` and
+``BIORAGENT_HTTP_TIMEOUT`` environment variables.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+from cassette import CassetteMiss, active_cassette, areplay, recording, replay, replaying
+import metrics
+from deadline import DeadlineExceeded, check_deadline, remaining
+from rate_limit import wait_for_slot, wait_for_slot_async
+from resilience import (RETRY_AFTER_MAX, RETRY_STATUSES, CircuitOpenError, breaker_for,
+                        decorrelated_jitter, retry_after_seconds)
+from response_cache import cache_key, default_cache
+from singleflight import SingleFlight
+
+load_dotenv()
+
+POOL_SIZE = int(os.getenv("BIORAGENT_HTTP_POOL_SIZE", "10"))
+POOL_RETRIES = int(os.getenv("BIORAGENT_HTTP_RETRIES", "1"))
+HTTP_TIMEOUT = float(os.getenv("BIORAGENT_HTTP_TIMEOUT", "30"))
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+# Identical fetch_data/afetch_data calls that overlap in time share one upstream request.
+inflight = SingleFlight()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _inflight_metrics():
+    stats = inflight.stats()
+    return [
+        ("bioragent_http_singleflight_leaders_total", "counter", "fetch_data calls that went upstream.",
+         [({}, stats["leaders"])]),
+        ("bioragent_http_singleflight_coalesced_total", "counter", "fetch_data calls served by an identical in-flight call.",
+         [({}, stats["coalesced"])]),
+        ("bioragent_http_singleflight_in_flight", "gauge", "Upstream calls currently in flight.",
+         [({}, stats["in_flight"])]),
+    ]
+
+
+metrics.register_collector(_inflight_metrics)
+
+
+def host_of(url: str) -> str:
+    """Return the ``scheme://netloc`` part of a URL, used as the pool key."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _build_session() -> requests.Session:
+    # Only re-dial broken or stale connections here; status-aware retries live in fetch_data.
+    retry = Retry(
+        total=POOL_RETRIES,
+        connect=POOL_RETRIES,
+        read=POOL_RETRIES,
+        status=0,
+        backoff_factor=0.2,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """Return the keep-alive session that owns the pool for ``url``'s host."""
+    host = host_of(url)
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _build_session()
+                _sessions[host] = session
+    return session
+
+
+def close_sessions():
+    """Close every pooled connection, e.g. before forking worker processes."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def with_ncbi_key(url: str, params):
+    """Add ``api_key`` to E-utilities query params when an NCBI key is configured."""
+    api_key = os.getenv("NCBI_API_KEY")
+    if not api_key or urlsplit(url).hostname != "eutils.ncbi.nlm.nih.gov":
+        return params
+    if isinstance(params, dict) and "api_key" not in params:
+        return {**params, "api_key": api_key}
+    if params is None and "api_key=" not in url:
+        return {"api_key": api_key}
+    return params
+
+
+def _record_outcome(breaker, status_code: int):
+    if status_code in RETRY_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _request_timeout(timeout: Optional[float], attempts: int = 1):
+    """The timeout to send with, and whether the query deadline shortened it.
+
+    ``attempts`` spreads the remaining budget over the adapter's own read retries.
+    """
+    timeout = timeout if timeout is not None else HTTP_TIMEOUT
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Query deadline exceeded before the request was sent")
+    if left is None or left / attempts >= timeout:
+        return timeout, False
+    return left / attempts, True
+
+
+def http_get(url: str, headers=None, params=None, timeout: Optional[float] = None) -> requests.Response:
+    """Drop-in replacement for ``requests.get`` that uses the per-host pool.
+
+    Raises ``CircuitOpenError`` (a ``requests.ConnectionError``) without sending
+    anything while the host's circuit breaker is open, and ``DeadlineExceeded``
+    (a ``requests.Timeout``) once the query deadline has passed.
+    """
+    start = time.monotonic()
+    try:
+        response = _send(url, headers, params, timeout)
+    except Exception as e:
+        metrics.observe_http_error(url, e, time.monotonic() - start)
+        raise
+    metrics.observe_http(url, response.status_code, time.monotonic() - start, len(response.content))
+    return response
+
+
+def _send(url, headers, params, timeout) -> requests.Response:
+    check_deadline(url)
+    if replaying():
+        return replay(url, headers, params)
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {breaker.host}")
+    request_params = with_ncbi_key(url, params)
+    try:
+        wait_for_slot(url)
+        # Waiting for a rate-limit slot may have used up the rest of the budget.
+        check_deadline(url)
+        timeout, clamped = _request_timeout(timeout, attempts=POOL_RETRIES + 1)
+    except Exception:
+        breaker.release()
+        raise
+    start = time.monotonic()
+    try:
+        response = get_session(url).get(url, headers=headers, params=request_params, timeout=timeout)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        # A read timeout the adapter already retried surfaces as ConnectionError.
+        timed_out = isinstance(e, requests.exceptions.Timeout) or "timed out" in str(e)
+        if clamped and timed_out:
+            # Our own budget ran out; that says nothing about the host's health.
+            breaker.release()
+            raise DeadlineExceeded(f"Query deadline exceeded during {url}") from e
+        breaker.record_failure()
+        raise
+    except Exception:
+        # Anything else (InvalidURL, TooManyRedirects, ...) says nothing about the host's health,
+        # but a half-open probe slot must not stay taken.
+        breaker.release()
+        raise
+    _record_outcome(breaker, response.status_code)
+    if recording():
+        active_cassette().record(url, headers, params, response, time.monotonic() - start)
+    return response
+
+
+def _response_cache():
+    # Cassette runs must see every exchange, so the response cache stays out of the way.
+    return None if active_cassette() else default_cache()
+
+
+def fetch_data(url, headers=None, params=None, max_retries=3, delay=5):
+    key = cache_key(url, params, headers)
+    cache = _response_cache()
+    if cache:
+        body = cache.get(key)
+        metrics.HTTP_CACHE.inc(host=metrics.host_label(url), result="miss" if body is None else "hit")
+        if body is not None:
+            return json.loads(body)
+    return inflight.do(key, lambda: _fetch_remote(url, headers, params, max_retries, delay, key))
+
+
+def _next_wait(previous: float, cap: float, retry_after: Optional[float]) -> float:
+    if retry_after is not None:
+        return retry_after
+    return decorrelated_jitter(previous, cap)
+
+
+def _fetch_remote(url, headers, params, max_retries, delay, key):
+    cache = _response_cache()
+    wait = 0.0
+    for attempt in range(max_retries):
+        retry_after = None
+        try:
+            response = http_get(url, headers=headers, params=params)
+        except (CircuitOpenError, DeadlineExceeded, CassetteMiss) as e:
+            print(f"Request skipped: {e}")
+            return None
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            print(f"Connection error: {e}.")
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {e}")
+            return None
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                try:
+                    response.raise_for_status()
+                    data = response.json()
+                except requests.exceptions.RequestException as e:
+                    print(f"Request failed: {e}")
+                    return None
+                if cache:
+                    cache.put(key, url, response.content)
+                return data
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            print(f"Upstream returned {response.status_code} for {url}.")
+        if attempt == max_retries - 1:
+            break
+        if retry_after is not None and retry_after > RETRY_AFTER_MAX:
+            breaker_for(url).open_for(retry_after)
+            print(f"Retry-After of {retry_after:.0f}s exceeds {RETRY_AFTER_MAX:.0f}s; giving up.")
+            return None
+        wait = _next_wait(wait, delay, retry_after)
+        left = remaining()
+        if left is not None and left <= wait:
+            print("Not enough time left in the query deadline to retry.")
+            return None
+        print(f"Retrying in {wait:.1f}s...")
+        metrics.HTTP_RETRIES.inc(host=metrics.host_label(url))
+        time.sleep(wait)
+    return None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared ``httpx.AsyncClient`` for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=POOL_SIZE * 4, max_keepalive_connections=POOL_SIZE * 2),
+            transport=httpx.AsyncHTTPTransport(retries=POOL_RETRIES),
+            follow_redirects=True,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Close the running loop's client, e.g. on application shutdown."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _drop_none(mapping):
+    # requests silently skips None-valued headers and params; httpx rejects them.
+    if isinstance(mapping, dict):
+        return {k: v for k, v in mapping.items() if v is not None}
+    return mapping
+
+
+async def ahttp_get(url: str, headers=None, params=None, timeout: Optional[float] = None) -> httpx.Response:
+    """Async counterpart of ``http_get``; ``CircuitOpenError`` and ``DeadlineExceeded`` are ``httpx.TransportError``s."""
+    start = time.monotonic()
+    try:
+        response = await _asend(url, headers, params, timeout)
+    except Exception as e:
+        metrics.observe_http_error(url, e, time.monotonic() - start)
+        raise
+    metrics.observe_http(url, response.status_code, time.monotonic() - start, len(response.content))
+    return response
+
+
+async def _asend(url, headers, params, timeout) -> httpx.Response:
+    check_deadline(url)
+    if replaying():
+        return await areplay(url, headers, params)
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {breaker.host}")
+    request_params = with_ncbi_key(url, params)
+    try:
+        await wait_for_slot_async(url)
+        check_deadline(url)
+        timeout, clamped = _request_timeout(timeout)
+    except Exception:
+        breaker.release()
+        raise
+    start = time.monotonic()
+    try:
+        response = await get_async_client().get(url, headers=_drop_none(headers), params=_drop_none(request_params),
+                                                 timeout=timeout)
+    except httpx.TimeoutException as e:
+        if clamped:
+            breaker.release()
+            raise DeadlineExceeded(f"Query deadline exceeded during {url}") from e
+        breaker.record_failure()
+        raise
+    except httpx.TransportError:
+        breaker.record_failure()
+        raise
+    except Exception:
+        breaker.release()
+        raise
+    _record_outcome(breaker, response.status_code)
+    if recording():
+        active_cassette().record(url, headers, params, response, time.monotonic() - start)
+    return response
+
+
+async def afetch_data(url, headers=None, params=None, max_retries=3, delay=5):
+    """Async counterpart of ``fetch_data`` with the same caching and result shape."""
+    key = cache_key(url, params, headers)
+    cache = _response_cache()
+    if cache:
+        body = cache.get(key)
+        metrics.HTTP_CACHE.inc(host=metrics.host_label(url), result="miss" if body is None else "hit")
+        if body is not None:
+            return json.loads(body)
+    return await inflight.ado(key, lambda: _afetch_remote(url, headers, params, max_retries, delay, key))
+
+
+async def _afetch_remote(url, headers, params, max_retries, delay, key):
+    cache = _response_cache()
+    wait = 0.0
+    for attempt in range(max_retries):
+        retry_after = None
+        try:
+            response = await ahttp_get(url, headers=headers, params=params)
+        except (CircuitOpenError, DeadlineExceeded, CassetteMiss) as e:
+            print(f"Request skipped: {e}")
+            return None
+        except httpx.TransportError as e:
+            print(f"Connection error: {e}.")
+        except httpx.HTTPError as e:
+            print(f"Request failed: {e}")
+            return None
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                try:
+                    response.raise_for_status()
+                    data = response.json()
+                except (httpx.HTTPError, ValueError) as e:
+                    print(f"Request failed: {e}")
+                    return None
+                if cache:
+                    cache.put(key, url, response.content)
+                return data
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            print(f"Upstream returned {response.status_code} for {url}.")
+        if attempt == max_retries - 1:
+            break
+        if retry_after is not None and retry_after > RETRY_AFTER_MAX:
+            breaker_for(url).open_for(retry_after)
+            print(f"Retry-After of {retry_after:.0f}s exceeds {RETRY_AFTER_MAX:.0f}s; giving up.")
+            return None
+        wait = _next_wait(wait, delay, retry_after)
+        left = remaining()
+        if left is not None and left <= wait:
+            print("Not enough time left in the query deadline to retry.")
+            return None
+        print(f"Retrying in {wait:.1f}s...")
+        metrics.HTTP_RETRIES.inc(host=metrics.host_label(url))
+        await asyncio.sleep(wait)
+    return None
@@ -2,5 +2,8 @@
 from agent_data import agent_data
 from agent_guide import agent_guide, process_input
 from agent_val import agent_val
+from cassette import install_llm_cache
+from metrics import start_exporters
 
-
+install_llm_cache()
+start_exporters()
@@ -0,0 +1,104 @@
+"""Hash-indexed lexicons of the local ontology CSV files.
+
+``ExistenceCheckTool`` checks every name against the Disease Ontology,
+HPO phenotype and Orphanet term lists. Each list is loaded once into a
+``Lexicon`` with a forward index (normalized name -> IDs) and a reverse index
+(normalized ID -> names), so a check is a dict lookup instead of a scan over
+every entry, and it returns the matched ontology IDs instead of a boolean.
+"""
+import csv
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+LEXICON_DIR = os.path.dirname(os.path.abspath(__file__))
+DISEASE_ONTOLOGY_CSV = os.path.join(LEXICON_DIR, "disease_ontology.csv")
+PHENOTYPES_CSV = os.path.join(LEXICON_DIR, "Phenotypes.csv")
+ORPHANET_CSV = os.path.join(LEXICON_DIR, "orphat.csv")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_term(term: str) -> str:
+    """Case-fold, trim and collapse internal whitespace."""
+    return _WHITESPACE.sub(" ", str(term)).strip().casefold()
+
+
+class Match(NamedTuple):
+    kind: str  # "name" when the term is a label or synonym, "id" when it is an identifier
+    ids: Tuple[str, ...]
+
+
+class Lexicon:
+    """Forward (name -> IDs) and reverse (ID -> names) indexes over one term list."""
+
+    def __init__(self, entries: Iterable[Tuple[str, Iterable[str]]] = ()):
+        self.name_to_ids: Dict[str, Tuple[str, ...]] = {}
+        self.id_to_names: Dict[str, Tuple[str, ...]] = {}
+        self.ids: Dict[str, str] = {}  # normalized ID -> ID as written in the source
+        for term_id, names in entries:
+            self.add(term_id, names)
+
+    def add(self, term_id: str, names: Iterable[str]):
+        id_key = normalize_term(term_id)
+        if not id_key:
+            return
+        term_id = self.ids.setdefault(id_key, term_id.strip())
+        known = self.id_to_names.get(id_key, ())
+        added = []
+        for name in names:
+            key = normalize_term(name)
+            name = name.strip()
+            if not key or name in known or name in added:
+                continue
+            added.append(name)
+            ids = self.name_to_ids.get(key, ())
+            if term_id not in ids:
+                self.name_to_ids[key] = ids + (term_id,)
+        if added or not known:
+            self.id_to_names[id_key] = known + tuple(added)
+
+    def __len__(self) -> int:
+        return len(self.id_to_names)
+
+    def __contains__(self, term: str) -> bool:
+        return self.lookup(term) is not None
+
+    def lookup(self, term: str) -> Optional[Match]:
+        key = normalize_term(term)
+        ids = self.name_to_ids.get(key)
+        if ids:
+            return Match("name", ids)
+        if key in self.ids:
+            return Match("id", (self.ids[key],))
+        return None
+
+    def ids_for(self, name: str) -> Tuple[str, ...]:
+        return self.name_to_ids.get(normalize_term(name), ())
+
+    def names_for(self, term_id: str) -> Tuple[str, ...]:
+        return self.id_to_names.get(normalize_term(term_id), ())
+
+
+def _split_names(value: str) -> List[str]:
+    return value.split(", ") if value else []
+
+
+def _read_csv(path: str, encoding: str = "utf-8"):
+    with open(path, mode="r", encoding=encoding, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def load_disease_ontology(path: str = DISEASE_ONTOLOGY_CSV) -> Lexicon:
+    """Disease Ontology: ``id``, ``lbl`` and comma-separated ``synonyms``."""
+    return Lexicon((row["id"], [row["lbl"]] + _split_names(row["synonyms"])) for row in _read_csv(path))
+
+
+def load_phenotypes(path: str = PHENOTYPES_CSV) -> Lexicon:
+    """HPO phenotypes: ``ID`` and comma-separated ``Name`` (label and synonyms)."""
+    return Lexicon((row["ID"], _split_names(row["Name"])) for row in _read_csv(path))
+
+
+def load_orphanet(path: str = ORPHANET_CSV) -> Lexicon:
+    """Orphanet: ``ORPHAcode`` and ``Preferred term`` (GBK encoded)."""
+    return Lexicon((row["ORPHAcode"], [row["Preferred term"]]) for row in _read_csv(path, encoding="gbk"))
@@ -0,0 +1,312 @@
+"""Precompiled binary snapshots of the ``lexicon`` CSV files.
+
+Parsing the three ontology CSVs (about 3.4 MB, one of them GBK encoded) costs
+every process that imports ``agent_guide`` a noticeable startup delay. This
+module compiles each ``Lexicon`` into a versioned binary file once and serves
+lookups straight from it afterwards:
+
+    header     magic, format version, byte order, SHA-256 of the source CSV,
+               then the offset and length of each section
+    name_keys  sorted string table of normalized names
+    postings   per name, a range of indexes into the ID tables
+    id_keys    sorted string table of normalized IDs
+    id_labels  the IDs as written in the source, aligned with ``id_keys``
+    id_names   per ID, a range of entries in ``names``
+    names      the display names, grouped by ID
+
+A string table is a count, ``count + 1`` uint32 offsets and the UTF-8 blob;
+every section starts on a 4-byte boundary. Lookups bisect the sorted tables
+in place, so opening a snapshot builds no dicts or string objects.
+
+Snapshots are memory-mapped read-only: the OS loads pages on first use and
+keeps one copy in the page cache for every process that maps the same file,
+so several workers (Streamlit sessions, evaluation shards) share the
+lexicons instead of each holding tens of MB of Python strings.
+
+Snapshots live in ``BIORAGENT_CACHE_DIR/lexicon`` and are named after the
+source CSV's hash, so editing a CSV makes ``load_snapshot`` compile a fresh
+one (and remove the stale file) on next start. Run
+``python agent_core/lexicon_snapshot.py build`` to compile them ahead of time,
+e.g. while building the Docker image.
+"""
+import argparse
+import bisect
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from lexicon import (DISEASE_ONTOLOGY_CSV, ORPHANET_CSV, PHENOTYPES_CSV, Lexicon, Match, load_disease_ontology,
+                     load_orphanet, load_phenotypes, normalize_term)
+from response_cache import CACHE_DIR
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "lexicon")
+MAGIC = b"BRLX"
+FORMAT_VERSION = 1
+SECTIONS = ("name_keys", "postings_ranges", "postings", "id_keys", "id_labels", "id_names_ranges", "names")
+_HEADER = struct.Struct("<4sII32s")
+_SECTION = struct.Struct("<QQ")
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+
+SOURCES = {
+    "disease_ontology": (DISEASE_ONTOLOGY_CSV, load_disease_ontology),
+    "phenotypes": (PHENOTYPES_CSV, load_phenotypes),
+    "orphanet": (ORPHANET_CSV, load_orphanet),
+}
+
+
+_digests = {}
+
+
+def file_digest(path: str) -> bytes:
+    """SHA-256 of a file, remembered per process until its size or mtime changes."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digests:
+        _digests[memo_key] = _sha256_file(path)
+    return _digests[memo_key]
+
+
+def _sha256_file(path: str) -> bytes:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.digest()
+
+
+def _uint32s(values) -> bytes:
+    return array("I", values).tobytes()
+
+
+def _string_table(strings: List[bytes]) -> bytes:
+    offsets, position = [0], 0
+    for s in strings:
+        position += len(s)
+        offsets.append(position)
+    return _uint32s([len(strings)]) + _uint32s(offsets) + b"".join(strings)
+
+
+def _ranges(groups) -> bytes:
+    offsets, position = [0], 0
+    for group in groups:
+        position += len(group)
+        offsets.append(position)
+    return _uint32s(offsets)
+
+
+def compile_lexicon(lexicon: Lexicon, digest: bytes) -> bytes:
+    """Serialize ``lexicon`` into the snapshot format."""
+    id_keys = sorted(lexicon.id_to_names, key=lambda k: k.encode("utf-8"))
+    id_index = {lexicon.ids[key]: i for i, key in enumerate(id_keys)}
+    name_keys = sorted(lexicon.name_to_ids, key=lambda k: k.encode("utf-8"))
+    postings = [[id_index[term_id] for term_id in lexicon.name_to_ids[key]] for key in name_keys]
+    names = [lexicon.id_to_names[key] for key in id_keys]
+
+    sections = {
+        "name_keys": _string_table([k.encode("utf-8") for k in name_keys]),
+        "postings_ranges": _ranges(postings),
+        "postings": _uint32s([i for group in postings for i in group]),
+        "id_keys": _string_table([k.encode("utf-8") for k in id_keys]),
+        "id_labels": _string_table([lexicon.ids[k].encode("utf-8") for k in id_keys]),
+        "id_names_ranges": _ranges(names),
+        "names": _string_table([n.encode("utf-8") for group in names for n in group]),
+    }
+    return _pack_sections(MAGIC, FORMAT_VERSION, digest, [sections[name] for name in SECTIONS])
+
+
+def _pack_sections(magic: bytes, version: int, digest: bytes, sections: List[bytes]) -> bytes:
+    """Header, section table and 4-byte aligned sections."""
+    position = _HEADER.size + _SECTION.size * len(sections)
+    table, body = [], []
+    for section in sections:
+        padding = -position % 4
+        body.append(b"\0" * padding)
+        position += padding
+        table.append(_SECTION.pack(position, len(section)))
+        body.append(section)
+        position += len(section)
+    return _HEADER.pack(magic, version, _BYTE_ORDER, digest) + b"".join(table) + b"".join(body)
+
+
+def _unpack_sections(buffer, magic: bytes, version: int, names, digest: Optional[bytes] = None):
+    """Validate the header and return the stored digest and a memoryview per section name."""
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size + _SECTION.size * len(names):
+        raise ValueError("truncated snapshot")
+    stored_magic, stored_version, byte_order, stored_digest = _HEADER.unpack_from(view)
+    if stored_magic != magic or stored_version != version or byte_order != _BYTE_ORDER:
+        raise ValueError("not a compatible snapshot")
+    if digest is not None and stored_digest != digest:
+        raise ValueError("snapshot is stale")
+    sections = {}
+    for i, name in enumerate(names):
+        offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+        if offset + length > len(view):
+            raise ValueError("truncated snapshot")
+        sections[name] = view[offset:offset + length]
+    return stored_digest, sections
+
+
+def _map_file(path: str, use_mmap: bool = True):
+    with open(path, "rb") as f:
+        if not use_mmap:
+            return f.read()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _write_snapshot(path: str, data: bytes, stale_pattern: str):
+    """Atomically write ``data`` to ``path`` and remove other files matching ``stale_pattern``."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    for stale in glob.glob(stale_pattern):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+class _StringTable:
+    """Read-only sequence of ``bytes`` over a string-table section."""
+
+    def __init__(self, view: memoryview):
+        count = view[:4].cast("I")[0]
+        self._offsets = view[4:4 * (count + 2)].cast("I")
+        self._blob = view[4 * (count + 2):]
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def find(self, key: bytes) -> int:
+        i = bisect.bisect_left(self, key)
+        return i if i < self._count and self[i] == key else -1
+
+    def text(self, i: int) -> str:
+        return self[i].decode("utf-8")
+
+
+class CompiledLexicon:
+    """``Lexicon``-compatible lookups served from a snapshot buffer."""
+
+    def __init__(self, buffer, digest: Optional[bytes] = None):
+        self.digest, sections = _unpack_sections(buffer, MAGIC, FORMAT_VERSION, SECTIONS, digest)
+        self._buffer = buffer
+        self._name_keys = _StringTable(sections["name_keys"])
+        self._postings_ranges = sections["postings_ranges"].cast("I")
+        self._postings = sections["postings"].cast("I")
+        self._id_keys = _StringTable(sections["id_keys"])
+        self._id_labels = _StringTable(sections["id_labels"])
+        self._id_names_ranges = sections["id_names_ranges"].cast("I")
+        self._names = _StringTable(sections["names"])
+
+    @classmethod
+    def open(cls, path: str, digest: Optional[bytes] = None, use_mmap: bool = True) -> "CompiledLexicon":
+        """Map ``path`` read-only (or read it into memory with ``use_mmap=False``)."""
+        return cls(_map_file(path, use_mmap), digest)
+
+    def __len__(self) -> int:
+        return len(self._id_keys)
+
+    def __contains__(self, term: str) -> bool:
+        return self.lookup(term) is not None
+
+    def _ids_at(self, i: int) -> Tuple[str, ...]:
+        start, end = self._postings_ranges[i], self._postings_ranges[i + 1]
+        return tuple(self._id_labels.text(self._postings[j]) for j in range(start, end))
+
+    def lookup(self, term: str) -> Optional[Match]:
+        key = normalize_term(term).encode("utf-8")
+        i = self._name_keys.find(key)
+        if i >= 0:
+            return Match("name", self._ids_at(i))
+        i = self._id_keys.find(key)
+        if i >= 0:
+            return Match("id", (self._id_labels.text(i),))
+        return None
+
+    def ids_for(self, name: str) -> Tuple[str, ...]:
+        i = self._name_keys.find(normalize_term(name).encode("utf-8"))
+        return self._ids_at(i) if i >= 0 else ()
+
+    def names_for(self, term_id: str) -> Tuple[str, ...]:
+        i = self._id_keys.find(normalize_term(term_id).encode("utf-8"))
+        if i < 0:
+            return ()
+        start, end = self._id_names_ranges[i], self._id_names_ranges[i + 1]
+        return tuple(self._names.text(j) for j in range(start, end))
+
+
+def snapshot_path(csv_path: str, digest: bytes, snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(snapshot_dir, f"{stem}-{digest.hex()[:16]}.lex")
+
+
+def build_snapshot(csv_path: str, loader: Callable[[str], Lexicon], snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    """Compile ``csv_path`` into a snapshot and drop snapshots of older versions of it."""
+    digest = file_digest(csv_path)
+    path = snapshot_path(csv_path, digest, snapshot_dir)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    _write_snapshot(path, compile_lexicon(loader(csv_path), digest), os.path.join(snapshot_dir, f"{stem}-*.lex"))
+    return path
+
+
+def load_snapshot(csv_path: str, loader: Callable[[str], Lexicon], snapshot_dir: str = SNAPSHOT_DIR):
+    """The snapshot for the current contents of ``csv_path``, compiled first if needed.
+
+    Falls back to parsing the CSV when the snapshot directory is not writable.
+    """
+    digest = file_digest(csv_path)
+    path = snapshot_path(csv_path, digest, snapshot_dir)
+    try:
+        return CompiledLexicon.open(path, digest)
+    except (OSError, ValueError):
+        pass
+    try:
+        return CompiledLexicon.open(build_snapshot(csv_path, loader, snapshot_dir), digest)
+    except (OSError, ValueError) as e:
+        print(f"Lexicon snapshot unavailable for {csv_path}: {e}")
+        return loader(csv_path)
+
+
+def disease_ontology():
+    return load_snapshot(*SOURCES["disease_ontology"])
+
+
+def phenotypes():
+    return load_snapshot(*SOURCES["phenotypes"])
+
+
+def orphanet():
+    return load_snapshot(*SOURCES["orphanet"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the ExistenceCheckTool lexicon snapshots and fuzzy index.")
+    parser.add_argument("--dir", type=str, default=SNAPSHOT_DIR, help="Snapshot directory (default: BIORAGENT_CACHE_DIR/lexicon).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Compile every lexicon CSV into a snapshot, then the fuzzy index.")
+    args = parser.parse_args()
+
+    for name, (csv_path, loader) in SOURCES.items():
+        start = time.perf_counter()
+        path = build_snapshot(csv_path, loader, args.dir)
+        print(f"{name:<18} {os.path.getsize(path) / 1024:>8.0f} KB  {time.perf_counter() - start:.2f}s  {path}")
+
+    from fuzzy_index import build_index
+    start = time.perf_counter()
+    path = build_index(args.dir)
+    print(f"{'fuzzy_index':<18} {os.path.getsize(path) / 1024:>8.0f} KB  {time.perf_counter() - start:.2f}s  {path}")
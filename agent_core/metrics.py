@@ -0,0 +1,316 @@
+"""In-process metrics for upstream calls and tools.
+
+``http_get``/``fetch_data`` and every ``tool_run``-wrapped tool record call
+counts, latency histograms, payload bytes, cache hits and retries labelled by
+host and by tool, so it is visible which source dominates a query's latency.
+Circuit breakers, the tool result cache and the single-flight layer register
+collectors that add their current state as gauges.
+
+Metrics can be scraped in the Prometheus text format from a small HTTP
+endpoint (``/metrics``, or ``/metrics.json`` for JSON), and/or dumped as JSON
+to a file periodically and at exit. ``start_exporters`` (called from
+``initialize_agents``) starts whichever is configured.
+
+Settings:
+    BIORAGENT_METRICS_PORT      serve /metrics on this port (unset: no endpoint)
+    BIORAGENT_METRICS_DUMP      write a JSON snapshot to this file (unset: no dump)
+    BIORAGENT_METRICS_INTERVAL  seconds between JSON dumps (default 60)
+
+Run ``python agent_core/metrics.py summary dump.json`` to rank hosts and tools
+by total time spent in them.
+"""
+import argparse
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_PORT = os.getenv("BIORAGENT_METRICS_PORT")
+METRICS_DUMP = os.getenv("BIORAGENT_METRICS_DUMP")
+METRICS_INTERVAL = float(os.getenv("BIORAGENT_METRICS_INTERVAL", "60"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# A collector returns (name, type, help, [(labels, value), ...]) tuples evaluated at export time.
+Collector = Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+_registry: List["_Metric"] = []
+_collectors: List[Collector] = []
+
+
+def host_label(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[Tuple[Dict[str, str], dict]]:
+        """Per label set: cumulative bucket counts (last one is +Inf), sum and count."""
+        with self._lock:
+            states = [(dict(key), list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        result = []
+        for labels, counts, total, count in states:
+            cumulative, running = [], 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                cumulative.append((bound, running))
+            result.append((labels, {"buckets": cumulative, "sum": total, "count": count}))
+        return result
+
+
+HTTP_REQUESTS = Counter("bioragent_http_requests_total", "Upstream HTTP responses by host and status code.")
+HTTP_ERRORS = Counter("bioragent_http_errors_total", "Upstream HTTP calls that raised, by host and error type.")
+HTTP_SECONDS = Histogram("bioragent_http_request_seconds", "Upstream HTTP request latency by host.")
+HTTP_BYTES = Counter("bioragent_http_response_bytes_total", "Upstream HTTP response body bytes by host.")
+HTTP_RETRIES = Counter("bioragent_http_retries_total", "fetch_data retries by host.")
+HTTP_CACHE = Counter("bioragent_http_cache_lookups_total", "Response cache lookups in fetch_data by host and result.")
+TOOL_CALLS = Counter("bioragent_tool_calls_total", "Tool calls by tool and outcome (ok, not_found, cached, deadline, error).")
+TOOL_SECONDS = Histogram("bioragent_tool_seconds", "Tool latency by tool, excluding cached calls.")
+TOOL_BYTES = Counter("bioragent_tool_output_bytes_total", "Characters returned to the agent by tool.")
+
+
+def observe_http(url: str, status: int, seconds: float, nbytes: int):
+    host = host_label(url)
+    HTTP_REQUESTS.inc(host=host, status=status)
+    HTTP_SECONDS.observe(seconds, host=host)
+    HTTP_BYTES.inc(nbytes, host=host)
+
+
+def observe_http_error(url: str, error: BaseException, seconds: float):
+    host = host_label(url)
+    HTTP_ERRORS.inc(host=host, error=type(error).__name__)
+    HTTP_SECONDS.observe(seconds, host=host)
+
+
+def observe_tool(tool: str, outcome: str, seconds: Optional[float] = None, nbytes: int = 0):
+    TOOL_CALLS.inc(tool=tool, outcome=outcome)
+    if seconds is not None:
+        TOOL_SECONDS.observe(seconds, tool=tool)
+    TOOL_BYTES.inc(nbytes, tool=tool)
+
+
+def register_collector(collector: Collector):
+    _collectors.append(collector)
+
+
+def _collected():
+    families = []
+    for collector in list(_collectors):
+        try:
+            families.extend(collector())
+        except Exception as e:  # a broken collector must not take the endpoint down
+            print(f"Metrics collector failed: {e}")
+    return families
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = sorted(labels.items())
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if metric.kind == "histogram":
+            for labels, state in metric.samples():
+                for bound, count in state["buckets"]:
+                    lines.append(f"{metric.name}_bucket{_labels(labels, ('le', _number(bound)))} {count}")
+                lines.append(f"{metric.name}_sum{_labels(labels)} {_number(state['sum'])}")
+                lines.append(f"{metric.name}_count{_labels(labels)} {state['count']}")
+        else:
+            for labels, value in metric.samples():
+                lines.append(f"{metric.name}{_labels(labels)} {_number(value)}")
+    for name, kind, help, samples in _collected():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    """All metrics as a JSON-serializable dict."""
+    metrics = {}
+    for metric in _registry:
+        samples = []
+        for labels, value in metric.samples():
+            if metric.kind == "histogram":
+                value = {"count": value["count"], "sum": value["sum"],
+                         "buckets": {_number(bound): count for bound, count in value["buckets"]}}
+            samples.append({"labels": labels, "value": value})
+        metrics[metric.name] = {"type": metric.kind, "help": metric.help, "samples": samples}
+    for name, kind, help, samples in _collected():
+        metrics[name] = {"type": kind, "help": help,
+                         "samples": [{"labels": labels, "value": value} for labels, value in samples]}
+    return {"time": time.time(), "metrics": metrics}
+
+
+def dump_json(path: str):
+    tmp = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=1)
+    os.replace(tmp, path)
+
+
+def summarize(data: dict, label: str, metric: str) -> List[Tuple[str, int, float]]:
+    """(label value, calls, total seconds) from a snapshot histogram, slowest first."""
+    rows = [(sample["labels"].get(label, ""), sample["value"]["count"], sample["value"]["sum"])
+            for sample in data["metrics"].get(metric, {}).get("samples", [])]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(snapshot()).encode("utf-8"), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = render_prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_dumper: Optional[threading.Thread] = None
+_exporters_lock = threading.Lock()
+
+
+def start_http_server(port: int, address: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` and ``/metrics.json`` from a daemon thread."""
+    global _server
+    with _exporters_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((address, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+
+def start_json_dump(path: str, interval: float = METRICS_INTERVAL):
+    """Write a JSON snapshot to ``path`` every ``interval`` seconds and once more at exit."""
+    global _dumper
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                dump_json(path)
+            except OSError as e:
+                print(f"Metrics dump failed: {e}")
+
+    with _exporters_lock:
+        if _dumper is None:
+            _dumper = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+            _dumper.start()
+            atexit.register(dump_json, path)
+
+
+def start_exporters():
+    """Start the endpoint and/or the JSON dump configured by the environment."""
+    if METRICS_PORT:
+        try:
+            start_http_server(int(METRICS_PORT))
+        except (OSError, ValueError) as e:
+            print(f"Metrics endpoint disabled: {e}")
+    if METRICS_DUMP:
+        start_json_dump(os.path.expanduser(METRICS_DUMP))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a BioRAGent metrics JSON dump.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summary_parser = sub.add_parser("summary", help="Rank hosts and tools by total time spent.")
+    summary_parser.add_argument("path", type=str, help="JSON dump (BIORAGENT_METRICS_DUMP) or saved /metrics.json.")
+    args = parser.parse_args()
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for title, label, metric in (("host", "host", HTTP_SECONDS.name), ("tool", "tool", TOOL_SECONDS.name)):
+        print(f"{title:<40} {'calls':>7} {'total':>9} {'mean':>9}")
+        for name, calls, total in summarize(data, label, metric):
+            print(f"{name:<40} {calls:>7} {total:>8.2f}s {total / calls * 1000 if calls else 0:>7.0f}ms")
+        print()
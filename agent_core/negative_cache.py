@@ -0,0 +1,250 @@
+"""Persistent cache of names known not to exist upstream.
+
+Names that no source recognizes (typos the fuzzy index cannot fix, entities
+the LLM made up) would otherwise be probed again on every occurrence, several
+seconds of 404s each time. ``ExistenceCheckTool``, ``hpo_id`` and
+``DiseaseGeneTool`` record such names here after a conclusive miss, meaning
+every upstream answered and none matched. A failed or timed-out call is never
+recorded. They consult the cache before any network call. Like the response
+cache, it is bypassed while a record/replay cassette is active.
+
+Entries live in a SQLite database next to the response cache, each with its
+own expiry. An in-memory Bloom filter over the stored keys sits in front of
+it, so the common case (a name that is not a known miss) costs a few hashes
+and no database query. Expired keys stay in the filter until the next rebuild
+and only cost a lookup.
+
+Settings:
+    BIORAGENT_NEGATIVE_CACHE           set to 0 to disable
+    BIORAGENT_NEGATIVE_TTL             seconds a miss is remembered (default 7 days)
+    BIORAGENT_NEGATIVE_BLOOM_CAPACITY  keys the filter is sized for before it is rebuilt larger (default 100000)
+
+Run ``python agent_core/negative_cache.py stats`` or ``... purge`` to inspect or
+clear it.
+"""
+import argparse
+import hashlib
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+from cassette import active_cassette
+from response_cache import CACHE_DIR, DAY
+
+load_dotenv()
+
+NEGATIVE_CACHE_ENABLED = os.getenv("BIORAGENT_NEGATIVE_CACHE", "1") != "0"
+NEGATIVE_TTL = float(os.getenv("BIORAGENT_NEGATIVE_TTL", str(7 * DAY)))
+BLOOM_CAPACITY = int(os.getenv("BIORAGENT_NEGATIVE_BLOOM_CAPACITY", "100000"))
+BLOOM_ERROR_RATE = 0.01
+
+NEGATIVE_LOOKUPS = metrics.Counter(
+    "bioragent_negative_cache_lookups_total",
+    "Negative cache lookups by scope and result (bloom_miss, hit, false_positive, expired).")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS negatives (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS negatives_expires ON negatives (expires);
+"""
+
+
+def negative_key(scope: str, name: str) -> str:
+    return f"{scope}\x1f{' '.join(str(name).split()).casefold()}"
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing of one BLAKE2b digest)."""
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = max(1, capacity)
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, step = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class NegativeCache:
+    """SQLite-backed store of known misses behind a Bloom filter; safe to call from any thread."""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = NEGATIVE_TTL, capacity: int = BLOOM_CAPACITY):
+        self.path = path or os.path.join(CACHE_DIR, "negative_cache.sqlite3")
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+        self._rebuild(capacity)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _rebuild(self, capacity: int):
+        """Refill the filter with the unexpired keys, sized for at least twice as many."""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM negatives WHERE expires < ?", (time.time(),))
+        keys = [key for (key,) in conn.execute("SELECT key FROM negatives")]
+        bloom = BloomFilter(max(capacity, 2 * len(keys)))
+        for key in keys:
+            bloom.add(key)
+        self.bloom = bloom
+
+    def contains(self, scope: str, name: str) -> bool:
+        """True when ``name`` is a recorded, unexpired miss in ``scope``."""
+        key = negative_key(scope, name)
+        if key not in self.bloom:
+            NEGATIVE_LOOKUPS.inc(scope=scope, result="bloom_miss")
+            return False
+        try:
+            row = self._conn().execute("SELECT expires FROM negatives WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return False
+        if row is None:
+            result = "false_positive"
+        else:
+            result = "hit" if row[0] >= time.time() else "expired"
+        NEGATIVE_LOOKUPS.inc(scope=scope, result=result)
+        return result == "hit"
+
+    def add(self, scope: str, name: str, ttl: Optional[float] = None):
+        key = negative_key(scope, name)
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO negatives (key, scope, name, created, expires) "
+                             "VALUES (?, ?, ?, ?, ?)", (key, scope, str(name), now, now + (self.ttl if ttl is None else ttl)))
+        except sqlite3.Error:
+            return
+        with self._lock:
+            self.bloom.add(key)
+            if self.bloom.count > self.bloom.capacity:
+                self._rebuild(self.bloom.capacity)
+
+    def discard(self, scope: str, name: str):
+        """Forget a miss (the filter keeps its bits until the next rebuild)."""
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM negatives WHERE key = ?", (negative_key(scope, name),))
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        now = time.time()
+        scopes = {
+            scope: {"entries": n, "expired": expired}
+            for scope, n, expired in conn.execute(
+                "SELECT scope, COUNT(*), COALESCE(SUM(expires < ?), 0) FROM negatives GROUP BY scope", (now,))
+        }
+        return {"path": self.path, "scopes": scopes, "bloom_bits": self.bloom.size,
+                "bloom_hashes": self.bloom.hashes, "bloom_keys": self.bloom.count}
+
+    def purge(self, scope: Optional[str] = None, expired_only: bool = False) -> int:
+        clauses, args = [], []
+        if scope:
+            clauses.append("scope = ?")
+            args.append(scope)
+        if expired_only:
+            clauses.append("expires < ?")
+            args.append(time.time())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._conn()
+        with conn:
+            deleted = conn.execute(f"DELETE FROM negatives{where}", args).rowcount
+        with self._lock:
+            self._rebuild(self.bloom.capacity)
+        return deleted
+
+
+_default_cache: Optional[NegativeCache] = None
+_default_lock = threading.Lock()
+
+
+def default_negative_cache() -> Optional[NegativeCache]:
+    """The process-wide negative cache, or None when disabled or the file cannot be opened."""
+    global _default_cache, NEGATIVE_CACHE_ENABLED
+    if not NEGATIVE_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                try:
+                    _default_cache = NegativeCache()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Negative cache disabled: {e}")
+                    NEGATIVE_CACHE_ENABLED = False
+    return _default_cache
+
+
+def _negative_cache() -> Optional[NegativeCache]:
+    # Like the response cache, stay out of the way of cassette runs so they see every exchange.
+    return None if active_cassette() else default_negative_cache()
+
+
+def known_missing(scope: str, name: str) -> bool:
+    cache = _negative_cache()
+    return cache is not None and cache.contains(scope, name)
+
+
+def record_missing(scope: str, name: str):
+    cache = _negative_cache()
+    if cache is not None:
+        cache.add(scope, name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or purge the BioRAGent negative cache.")
+    parser.add_argument("--path", type=str, default=None, help="Cache database (default: BIORAGENT_CACHE_DIR/negative_cache.sqlite3).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show entry counts per scope and the Bloom filter size.")
+    purge_parser = sub.add_parser("purge", help="Delete recorded misses.")
+    purge_parser.add_argument("--scope", type=str, default=None, help="Only delete entries of this scope.")
+    purge_parser.add_argument("--expired", action="store_true", help="Only delete expired entries.")
+    args = parser.parse_args()
+
+    cache = NegativeCache(args.path)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"path:  {stats['path']}")
+        print(f"bloom: {stats['bloom_bits']} bits, {stats['bloom_hashes']} hashes, {stats['bloom_keys']} keys")
+        for scope, info in stats["scopes"].items():
+            print(f"  {scope:<16} entries={info['entries']:<7} expired={info['expired']}")
+    else:
+        deleted = cache.purge(scope=args.scope, expired_only=args.expired)
+        print(f"Deleted {deleted} entries.")
@@ -0,0 +1,162 @@
+"""Compact, field-projected tool observations.
+
+Whatever a tool returns is pasted into the ReAct prompt as its observation, so
+every byte costs prompt tokens and LLM latency on every later step of the
+question. The raw responses are mostly noise for the questions the agent
+answers (location, function/summary, aliases, associations): a gene esummary
+carries its location history and organism block, a UniProt entry its whole
+amino-acid sequence and an evidence list on every name, a dbSNP esummary
+submitter handles and a docsum string, and everything used to be serialized
+with ``indent=4``.
+
+``render`` is applied by ``tool_runtime.tool_run`` to every fresh result before
+it is cached. It runs the tool's projection from ``PROJECTIONS`` (keyed by tool
+name), drops null and empty values and serializes the rest as compact JSON.
+Strings (``"Not Found"``, notices, tools that serialize themselves) pass through
+unchanged.
+
+Settings:
+    BIORAGENT_COMPACT_OBSERVATIONS  set to 0 to pass full results, serialized with indent=4 as before
+
+Run ``python benchmark/bench_tokens.py`` to compare the token counts of both forms
+over the evaluation_task/ questions.
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Iterable
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+COMPACT_OBSERVATIONS = os.getenv("BIORAGENT_COMPACT_OBSERVATIONS", "1") != "0"
+
+EMPTY = (None, "", [], {})
+
+GENE_FIELDS = ("uid", "name", "description", "chromosome", "maplocation", "genomicinfo", "otheraliases",
+               "otherdesignations", "nomenclaturesymbol", "nomenclaturename", "genetype", "mim", "summary",
+               "hgnc_id", "ensembl_id")
+GENOMIC_INFO_FIELDS = ("chrloc", "chrstart", "chrstop")
+ENSEMBL_GENE_FIELDS = ("id", "display_name", "description", "biotype", "seq_region_name", "start", "end", "strand")
+SNP_FIELDS = ("snp_id", "chr", "chrpos", "genes", "fxn_class", "snp_class", "clinical_significance", "spdi")
+INTERACTION_FIELDS = ("gene", "accession2", "experiments")
+PHENOTYPE_FIELDS = ("id", "name", "definition", "comment", "synonyms")
+ENTITY_FIELDS = ("id", "name")
+ANNOTATION_METADATA_FIELDS = ("frequency", "onset")
+
+
+def prune(value: Any) -> Any:
+    """``value`` without null and empty entries, at any depth (0 and False are kept)."""
+    if isinstance(value, dict):
+        pruned = ((key, prune(item)) for key, item in value.items())
+        return {key: item for key, item in pruned if item not in EMPTY}
+    if isinstance(value, (list, tuple)):
+        pruned = (prune(item) for item in value)
+        return [item for item in pruned if item not in EMPTY]
+    return value
+
+
+def pick(record: dict, fields: Iterable[str]) -> dict:
+    return {field: record[field] for field in fields if field in record}
+
+
+def serialize(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _single(items: list) -> Any:
+    return items[0] if len(items) == 1 else items
+
+
+def project_gene_info(result: dict) -> dict:
+    """Per term: the esummary documents (or the Ensembl lookup) cut down to location, names and summary."""
+    projected = {}
+    for term, info in result.items():
+        if 'uids' not in info:
+            projected[term] = pick(info, ENSEMBL_GENE_FIELDS)
+            continue
+        genes = []
+        for uid in info['uids']:
+            gene = pick(info.get(uid) or {}, GENE_FIELDS)
+            gene['genomicinfo'] = [pick(location, GENOMIC_INFO_FIELDS) for location in gene.get('genomicinfo') or []]
+            genes.append(gene)
+        projected[term] = _single(genes)
+    return projected
+
+
+def _strip_evidences(value: Any) -> Any:
+    """UniProt attaches an ``evidences`` list to every name and text; ``{"value": x}`` wrappers become x."""
+    if isinstance(value, dict):
+        value = {key: _strip_evidences(item) for key, item in value.items() if key != 'evidences'}
+        return value['value'] if set(value) == {'value'} else value
+    if isinstance(value, list):
+        return [_strip_evidences(item) for item in value]
+    return value
+
+
+def project_protein(result: dict) -> dict:
+    """The UniProt entry without evidence lists, with interaction partners only and the sequence's length."""
+    projected = _strip_evidences({key: item for key, item in result.items() if key != 'sequence'})
+    comments = projected.get('comments') or {}
+    if comments.get('INTERACTION'):
+        comments['INTERACTION'] = [pick(interaction, INTERACTION_FIELDS) for interaction in comments['INTERACTION']]
+    if result.get('sequence'):
+        projected['sequenceLength'] = len(result['sequence'])
+    return projected
+
+
+def project_snp(result: dict) -> dict:
+    """``rs<id>`` -> position, genes and consequence of each esummary document."""
+    documents = (result.get('result') or {})
+    return {f"rs{documents[uid].get('snp_id', uid)}": pick(documents[uid], SNP_FIELDS)
+            for uid in documents.get('uids', []) if isinstance(documents.get(uid), dict)}
+
+
+def project_phenotype(result: dict) -> dict:
+    return pick(result, PHENOTYPE_FIELDS)
+
+
+def project_entities(result: list) -> list:
+    """Association lists keep each entity's ID and name; plain names (OMIM gene symbols) pass through."""
+    return [pick(item, ENTITY_FIELDS) if isinstance(item, dict) else item for item in result]
+
+
+def project_categories(result: dict) -> dict:
+    """A disease's phenotypes by category, each with its frequency and onset but not the source references."""
+    projected = {}
+    for category, entries in result.items():
+        projected[category] = []
+        for entry in entries:
+            item = pick(entry, ENTITY_FIELDS)
+            item.update(pick(entry.get('metadata') or {}, ANNOTATION_METADATA_FIELDS))
+            projected[category].append(item)
+    return projected
+
+
+PROJECTIONS: Dict[str, Callable[[Any], Any]] = {
+    "Gene Information Tool": project_gene_info,
+    "Protein Information Extractor": project_protein,
+    "SNP Information Extractor": project_snp,
+    "Phenotypes Info Extractor": project_phenotype,
+    "Phenotypes Disease Extractor": project_entities,
+    "Phenotypes Gene Extractor": project_entities,
+    "Gene Phenotypes Extractor": project_entities,
+    "Gene Diseases Extractor": project_entities,
+    "Disease Gene Extractor": project_entities,
+    "Disease Phenotypes Extractor": project_categories,
+}
+
+
+def render(tool_name: str, result: Any, compact: bool = COMPACT_OBSERVATIONS) -> Any:
+    """The observation text for a tool's result; strings and None are returned as they are."""
+    if not isinstance(result, (dict, list)):
+        return result
+    if not compact:
+        return json.dumps(result, indent=4)
+    projection = PROJECTIONS.get(tool_name)
+    if projection is not None:
+        try:
+            result = projection(result)
+        except (AttributeError, KeyError, TypeError):
+            pass  # an unexpected shape is still worth passing on, unprojected
+    return serialize(prune(result))
@@ -0,0 +1,105 @@
+"""Per-host token-bucket rate limiting for upstream APIs.
+
+A call only waits when the host's budget for the current second is actually
+used up; hosts without a configured rate are never delayed.
+
+NCBI allows 3 requests/s per client, or 10 requests/s when ``NCBI_API_KEY`` is
+set. Other hosts can be limited (or the NCBI default overridden) with
+``BIORAGENT_RATE_LIMITS``, e.g. ``"ontology.jax.org=5,rest.uniprot.org=10"``.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+NCBI_HOSTS = ("eutils.ncbi.nlm.nih.gov", "api.ncbi.nlm.nih.gov")
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """Parse ``"host=rate,host=rate"`` into a dict; malformed entries are ignored."""
+    rates = {}
+    for item in spec.split(","):
+        host, _, rate = item.partition("=")
+        try:
+            rates[host.strip().lower()] = float(rate)
+        except ValueError:
+            continue
+    return {host: rate for host, rate in rates.items() if host and rate > 0}
+
+
+def default_rates() -> Dict[str, float]:
+    ncbi_rate = 10.0 if os.getenv("NCBI_API_KEY") else 3.0
+    rates = {host: ncbi_rate for host in NCBI_HOSTS}
+    rates["grch37.rest.ensembl.org"] = 15.0
+    rates.update(parse_rate_limits(os.getenv("BIORAGENT_RATE_LIMITS", "")))
+    return rates
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of holding a lock while waiting.
+
+    ``reserve`` takes a token (possibly going into debt) and returns how long the
+    caller has to wait for it, so the same bucket can be shared by threads and
+    by coroutines on any event loop.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_rates = default_rates()
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def limiter_for(url: str) -> Optional[TokenBucket]:
+    """Return the bucket for ``url``'s host, or None if the host is unlimited."""
+    host = (urlsplit(url).hostname or "").lower()
+    rate = _rates.get(host)
+    if rate is None:
+        return None
+    bucket = _buckets.get(host)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.setdefault(host, TokenBucket(rate))
+    return bucket
+
+
+def wait_for_slot(url: str) -> float:
+    bucket = limiter_for(url)
+    return bucket.acquire() if bucket else 0.0
+
+
+async def wait_for_slot_async(url: str) -> float:
+    bucket = limiter_for(url)
+    return await bucket.acquire_async() if bucket else 0.0
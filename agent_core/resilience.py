@@ -0,0 +1,163 @@
+"""Retry backoff and per-host circuit breakers for upstream APIs.
+
+``fetch_data`` retries transient failures (connection errors, timeouts, 429
+and 5xx) with decorrelated-jitter backoff and honours ``Retry-After``. Each
+host has a circuit breaker: after ``BIORAGENT_BREAKER_FAILURES`` consecutive
+failures it opens and requests to that host fail immediately with
+``CircuitOpenError`` for ``BIORAGENT_BREAKER_RESET`` seconds, after which a
+single probe request decides whether it closes again. The agent can then move
+on to the next source instead of stalling on a degraded one.
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+RETRY_BASE = float(os.getenv("BIORAGENT_RETRY_BASE", "0.5"))
+RETRY_AFTER_MAX = float(os.getenv("BIORAGENT_RETRY_AFTER_MAX", "30"))
+BREAKER_FAILURES = int(os.getenv("BIORAGENT_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BIORAGENT_BREAKER_RESET", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError, httpx.TransportError):
+    """Raised instead of sending a request to a host whose breaker is open.
+
+    It subclasses both the requests and httpx transport errors so existing
+    ``except`` clauses on either client treat it like an unreachable host.
+    """
+
+    def __init__(self, message: str):
+        requests.exceptions.ConnectionError.__init__(self, message)
+        httpx.TransportError.__init__(self, message)
+
+
+def decorrelated_jitter(previous: float, cap: float, base: float = RETRY_BASE) -> float:
+    """Next backoff delay: uniform in [base, 3 * previous], capped."""
+    return min(cap, random.uniform(base, max(base, previous) * 3))
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    def __init__(self, host: str, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_until = 0.0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open(self.reset_timeout)
+
+    def release(self):
+        """Give back a half-open probe slot whose request ended without a verdict."""
+        with self._lock:
+            self._probing = False
+
+    def open_for(self, seconds: float):
+        """Open the breaker for at least ``seconds``, e.g. a long ``Retry-After``."""
+        with self._lock:
+            self._open(max(seconds, self.reset_timeout))
+
+    def _open(self, seconds: float):
+        if self.state != OPEN:
+            self.trips += 1
+            print(f"Circuit opened for {self.host} ({self.failures} consecutive failures).")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.open_until = self.opened_at + seconds
+        self._probing = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "trips": self.trips,
+                "retry_in": max(0.0, self.open_until - time.monotonic()) if self.state == OPEN else 0.0,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    host = (urlsplit(url).hostname or "").lower()
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(host))
+    return breaker
+
+
+def breaker_states() -> Dict[str, dict]:
+    """Current state of every host's breaker, for metrics and debugging."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.host: breaker.snapshot() for breaker in breakers}
+
+
+def _breaker_metrics():
+    states = breaker_states()
+    return [
+        ("bioragent_circuit_state", "gauge", "Circuit breaker state by host (0 closed, 1 half-open, 2 open).",
+         [({"host": host}, {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[state["state"]]) for host, state in states.items()]),
+        ("bioragent_circuit_trips_total", "counter", "Times each host's circuit breaker has opened.",
+         [({"host": host}, state["trips"]) for host, state in states.items()]),
+    ]
+
+
+metrics.register_collector(_breaker_metrics)
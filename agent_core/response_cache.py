@@ -0,0 +1,309 @@
+"""Persistent on-disk cache for upstream API responses.
+
+``fetch_data`` consults this cache before going to the network, so repeated
+questions and repeated evaluation runs re-use HPO annotations, NCBI esummary
+records, UniProt entries, etc. instead of downloading them again.
+
+Entries live in one SQLite database in WAL mode, which lets several processes
+(Streamlit sessions, evaluation shards) share it. Bodies are compressed with
+zstd when ``zstandard`` is installed, otherwise zlib. Each host has its own TTL,
+and once the database grows past its size bound the least recently used
+entries are evicted. Each process keeps a running total of the bytes stored, so
+a ``put`` does not scan the table; the total is recounted, and expired entries
+dropped, whenever it passes the bound and every ``EVICT_EVERY`` puts, which also
+picks up what other processes have written meanwhile.
+
+Settings:
+    BIORAGENT_CACHE_DIR          directory for cache files (default ~/.cache/bioragent)
+    BIORAGENT_HTTP_CACHE         set to 0 to disable the cache
+    BIORAGENT_HTTP_CACHE_MAX_MB  size bound for stored bodies (default 512)
+    BIORAGENT_CACHE_TTLS         per-host TTL overrides, "host=seconds,host=seconds"
+
+Run ``python agent_core/response_cache.py stats`` or ``... purge`` to inspect or
+clear the cache.
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from dotenv import load_dotenv
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+CACHE_DIR = os.path.expanduser(os.getenv("BIORAGENT_CACHE_DIR", "~/.cache/bioragent"))
+CACHE_ENABLED = os.getenv("BIORAGENT_HTTP_CACHE", "1") != "0"
+CACHE_MAX_BYTES = int(float(os.getenv("BIORAGENT_HTTP_CACHE_MAX_MB", "512")) * 1024 * 1024)
+
+DAY = 24 * 3600
+DEFAULT_TTL = DAY
+HOST_TTLS = {
+    "ontology.jax.org": 7 * DAY,
+    "eutils.ncbi.nlm.nih.gov": DAY,
+    "api.ncbi.nlm.nih.gov": DAY,
+    "rest.uniprot.org": 7 * DAY,
+    "www.ebi.ac.uk": 7 * DAY,
+    "grch37.rest.ensembl.org": 30 * DAY,
+    "api.orphadata.com": 30 * DAY,
+    "data.bioontology.org": 7 * DAY,
+    "clinicaltrials.gov": DAY,
+}
+
+# Headers that change the representation returned; credentials are left out on purpose.
+KEY_HEADERS = ("accept", "content-type")
+# Query parameters that never change the response body.
+IGNORED_PARAMS = ("api_key",)
+# Puts between full eviction passes while the running total stays under the bound.
+EVICT_EVERY = 256
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    ttls = {}
+    for item in spec.split(","):
+        host, _, seconds = item.partition("=")
+        try:
+            ttls[host.strip().lower()] = float(seconds)
+        except ValueError:
+            continue
+    return {host: ttl for host, ttl in ttls.items() if host}
+
+
+HOST_TTLS.update(parse_ttls(os.getenv("BIORAGENT_CACHE_TTLS", "")))
+
+
+def ttl_for(url: str) -> float:
+    return HOST_TTLS.get((urlsplit(url).hostname or "").lower(), DEFAULT_TTL)
+
+
+def normalize_url(url: str, params=None) -> str:
+    """Canonical form of a GET request URL: lower-cased host, merged and sorted query."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        items = params.items() if isinstance(params, dict) else params
+        for name, value in items:
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple)) else [value]
+            query.extend((name, str(v)) for v in values)
+    query = sorted((name, value) for name, value in query if name not in IGNORED_PARAMS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def cache_key(url: str, params=None, headers=None) -> str:
+    header_part = ""
+    if headers:
+        relevant = sorted((k.lower(), str(v)) for k, v in headers.items()
+                          if v is not None and k.lower() in KEY_HEADERS)
+        header_part = urlencode(relevant)
+    raw = normalize_url(url, params) + "\n" + header_part
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _compress(body: bytes):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(body)
+    return "zlib", zlib.compress(body, 6)
+
+
+def _decompress(codec: str, blob: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstandard is required to read this cache entry")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    return blob
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    url TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_host ON entries (host);
+"""
+
+
+class ResponseCache:
+    """SQLite-backed response store; every method is safe to call from any thread."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path or os.path.join(CACHE_DIR, "http_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+        self._bytes = self._total(self._conn())
+
+    @staticmethod
+    def _total(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT codec, body, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[2] < now:
+                return None
+            with conn:
+                conn.execute("UPDATE entries SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            return _decompress(row[0], row[1])
+        except (sqlite3.Error, ValueError, zlib.error):
+            return None
+
+    def put(self, key: str, url: str, body: bytes, ttl: Optional[float] = None):
+        now = time.time()
+        ttl = ttl_for(url) if ttl is None else ttl
+        codec, blob = _compress(body)
+        host = (urlsplit(url).hostname or "").lower()
+        try:
+            conn = self._conn()
+            with conn:
+                replaced = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, host, url, codec, body, size, created, expires, accessed, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                    (key, host, url, codec, blob, len(blob), now, now + ttl, now),
+                )
+            with self._lock:
+                self._bytes += len(blob) - (replaced[0] if replaced else 0)
+                self._puts += 1
+                due = self._bytes > self.max_bytes or self._puts >= EVICT_EVERY
+            if due:
+                self.evict()
+        except sqlite3.Error:
+            pass
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under 90% of the bound.
+
+        Recounts the stored bytes, so ``put`` only calls it when its running total is due a check.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+            total = self._total(conn)
+            if total > self.max_bytes:
+                target = total - int(self.max_bytes * 0.9)
+                freed, victims = 0, []
+                for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= target:
+                        break
+                conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+                total -= freed
+        with self._lock:
+            self._bytes, self._puts = total, 0
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        now = time.time()
+        count, size, hits, expired = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), "
+            "COALESCE(SUM(expires < ?), 0) FROM entries", (now,)).fetchone()
+        hosts = {
+            host: {"entries": n, "bytes": b, "hits": h}
+            for host, n, b, h in conn.execute(
+                "SELECT host, COUNT(*), SUM(size), SUM(hits) FROM entries GROUP BY host ORDER BY SUM(size) DESC")
+        }
+        return {"path": self.path, "entries": count, "bytes": size, "max_bytes": self.max_bytes,
+                "hits": hits, "expired": expired, "hosts": hosts}
+
+    def purge(self, host: Optional[str] = None, expired_only: bool = False) -> int:
+        clauses, args = [], []
+        if host:
+            clauses.append("host = ?")
+            args.append(host.lower())
+        if expired_only:
+            clauses.append("expires < ?")
+            args.append(time.time())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        conn = self._conn()
+        with conn:
+            deleted = conn.execute(f"DELETE FROM entries{where}", args).rowcount
+            total = self._total(conn)
+        with self._lock:
+            self._bytes = total
+        try:
+            conn.execute("VACUUM")
+        except sqlite3.OperationalError:
+            pass
+        return deleted
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> Optional[ResponseCache]:
+    """The process-wide cache, or None when disabled or the cache file cannot be opened."""
+    global _default_cache, CACHE_ENABLED
+    if not CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                try:
+                    _default_cache = ResponseCache()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Response cache disabled: {e}")
+                    CACHE_ENABLED = False
+    return _default_cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or purge the BioRAGent response cache.")
+    parser.add_argument("--path", type=str, default=None, help="Cache database (default: BIORAGENT_CACHE_DIR/http_cache.sqlite3).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show entry counts, sizes and hits per host.")
+    purge_parser = sub.add_parser("purge", help="Delete cache entries.")
+    purge_parser.add_argument("--host", type=str, default=None, help="Only delete entries for this host.")
+    purge_parser.add_argument("--expired", action="store_true", help="Only delete expired entries.")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.path)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"path:    {stats['path']}")
+        print(f"entries: {stats['entries']} ({stats['expired']} expired)")
+        print(f"size:    {stats['bytes'] / 1024 / 1024:.2f} MB of {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+        print(f"hits:    {stats['hits']}")
+        for host, info in stats["hosts"].items():
+            print(f"  {host:<28} entries={info['entries']:<7} bytes={info['bytes']:<10} hits={info['hits']}")
+    else:
+        deleted = cache.purge(host=args.host, expired_only=args.expired)
+        print(f"Deleted {deleted} entries.")
@@ -0,0 +1,111 @@
+"""Single-flight coalescing of identical concurrent upstream requests.
+
+When several threads or coroutines ask for the same key at the same time, only
+the first (the leader) performs the call; the others wait for it and receive
+the same result object (or exception). A cancelled async leader is the
+exception: its followers retry instead of being cancelled with it.
+``coalesced`` counts the calls that were served this way.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _cancelling(task) -> bool:
+    """Whether ``task`` itself has a cancellation pending (Task.cancelling, Python 3.11+)."""
+    return bool(getattr(task, "cancelling", lambda: 0)())
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` unless a call for ``key`` is already in flight, then share its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of ``do``; calls are coalesced per event loop.
+
+        A leader cancelled by its own caller (a deadline, a disconnect) does not cancel the followers:
+        they retry the call, and the first to do so becomes the new leader.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        while True:
+            with self._lock:
+                future = self._async_calls.get(loop_key)
+                if future is None:
+                    future = self._async_calls[loop_key] = loop.create_future()
+                    self.leaders += 1
+                    leader = True
+                else:
+                    self.coalesced += 1
+                    leader = False
+            if leader:
+                break
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or _cancelling(asyncio.current_task()):
+                    raise  # this caller was cancelled, not the leader
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            self._forget(loop_key, future)  # before waking the followers, so that they start a new call
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when no follower is waiting
+            raise
+        finally:
+            self._forget(loop_key, future)
+
+    def _forget(self, loop_key: Tuple[int, Hashable], future: asyncio.Future):
+        with self._lock:
+            if self._async_calls.get(loop_key) is future:
+                del self._async_calls[loop_key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced,
+                    "in_flight": len(self._calls) + len(self._async_calls)}
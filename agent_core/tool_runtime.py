@@ -0,0 +1,232 @@
+"""Runtime wrapper shared by every retrieval tool's ``_run`` and ``_arun``.
+
+``tool_run`` memoizes tool results in a bounded in-process TTL/LRU cache keyed
+on the tool name and the normalized argument, so the ReAct loop and the
+refine loop in ``GuideAgent.handle_query`` can repeat a call without going back
+to the upstream APIs.
+
+Inside a ``deadline.deadline_scope`` a tool whose result is not cached returns a
+short notice instead of running once the budget is spent, and results produced
+after the deadline (likely truncated) are not memoized.
+
+Fresh results are turned into compact, field-projected observations by
+``observation.render`` before they are cached or returned.
+
+Every call is counted in ``metrics`` by tool and outcome, with its latency and
+output size.
+
+Settings:
+    BIORAGENT_TOOL_CACHE_TTL          seconds a result stays valid (default 600, 0 disables)
+    BIORAGENT_TOOL_CACHE_MAX_ENTRIES  maximum number of cached results (default 2048)
+    BIORAGENT_TOOL_CACHE_MAX_MB       maximum approximate size of cached results (default 64)
+"""
+import functools
+import inspect
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Tuple
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import metrics
+import observation
+from deadline import expired
+
+load_dotenv()
+
+TOOL_CACHE_TTL = float(os.getenv("BIORAGENT_TOOL_CACHE_TTL", "600"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("BIORAGENT_TOOL_CACHE_MAX_ENTRIES", "2048"))
+TOOL_CACHE_MAX_BYTES = int(float(os.getenv("BIORAGENT_TOOL_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+_MISSING = object()
+
+
+def normalize_argument(value: Any) -> str:
+    """Case-fold, trim and collapse whitespace; lists become one comma-separated string."""
+    if isinstance(value, (list, tuple)):
+        value = ",".join(str(v) for v in value)
+    text = re.sub(r"\s+", " ", str(value)).strip().casefold()
+    return re.sub(r"\s*,\s*", ",", text)
+
+
+def approximate_size(value: Any) -> int:
+    return len(value) if isinstance(value, (str, bytes)) else len(repr(value))
+
+
+class ToolResultCache:
+    """Thread-safe LRU cache with a per-entry TTL and entry-count and byte bounds."""
+
+    def __init__(self, ttl: float = TOOL_CACHE_TTL, max_entries: int = TOOL_CACHE_MAX_ENTRIES,
+                 max_bytes: int = TOOL_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires, size, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        size = approximate_size(value)
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+tool_cache = ToolResultCache()
+
+
+def _tool_cache_metrics():
+    stats = tool_cache.stats()
+    return [(f"bioragent_tool_cache_{name}", "gauge" if name in ("entries", "bytes") else "counter",
+             f"Tool result cache {name}.", [({}, stats[name])])
+            for name in ("entries", "bytes", "hits", "misses", "evictions")]
+
+
+metrics.register_collector(_tool_cache_metrics)
+
+
+# What the tools return when nothing matched (ExistenceCheckTool uses the lower-case form)
+# or an upstream call failed (SNPInfoTool).
+NOT_FOUND = ("Not Found", "not found.", "Request failed or no results found")
+EMPTY_RESULTS = ("", [], {})
+
+
+def is_cacheable(result: Any) -> bool:
+    """Empty and "Not Found" results may come from a transient upstream failure.
+
+    Judged on the tool's own result; once rendered, an empty list is the non-empty string "[]".
+    """
+    return result is not None and result not in NOT_FOUND and result not in EMPTY_RESULTS
+
+
+class Uncached(NamedTuple):
+    """A result ``tool_run`` returns without memoizing it, e.g. a batch answer with an inconclusive part."""
+    value: Any
+
+
+def deadline_notice(tool) -> str:
+    return f"{tool.name} was not run: the time budget for this query is used up. Answer with what you have."
+
+
+def _outcome(result: Any) -> str:
+    return "ok" if is_cacheable(result) else "not_found"
+
+
+def _call_key(tool, args, kwargs) -> Hashable:
+    return (tool.name,
+            tuple(normalize_argument(a) for a in args),
+            tuple(sorted((k, normalize_argument(v)) for k, v in kwargs.items())))
+
+
+def cached_call(tool, *args, **kwargs) -> Any:
+    """The memoized result of ``tool`` for these arguments, or None (for per-item caching inside batch calls)."""
+    cached = tool_cache.get(_call_key(tool, args, kwargs))
+    return None if cached is _MISSING else cached
+
+
+def remember_call(tool, result: Any, *args, **kwargs):
+    """Memoize ``result`` as ``tool``'s result for these arguments, under the same rules as ``tool_run``."""
+    if is_cacheable(result) and not expired():
+        tool_cache.put(_call_key(tool, args, kwargs), result)
+
+
+def tool_run(func):
+    """Decorate a tool's ``_run`` or ``_arun`` so identical calls are served from ``tool_cache``.
+
+    Sync and async entry points of the same tool share cache entries.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            key = _call_key(self, args, kwargs)
+            cached = tool_cache.get(key)
+            if cached is not _MISSING:
+                metrics.observe_tool(self.name, "cached", nbytes=approximate_size(cached))
+                return cached
+            if expired():
+                metrics.observe_tool(self.name, "deadline")
+                return deadline_notice(self)
+            start = time.monotonic()
+            try:
+                result = await func(self, *args, **kwargs)
+            except Exception:
+                metrics.observe_tool(self.name, "error", time.monotonic() - start)
+                raise
+            memoize = not isinstance(result, Uncached)
+            raw = result if memoize else result.value
+            result = observation.render(self.name, raw)
+            metrics.observe_tool(self.name, _outcome(raw), time.monotonic() - start, approximate_size(result))
+            if memoize and is_cacheable(raw) and not expired():
+                tool_cache.put(key, result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        key = _call_key(self, args, kwargs)
+        cached = tool_cache.get(key)
+        if cached is not _MISSING:
+            metrics.observe_tool(self.name, "cached", nbytes=approximate_size(cached))
+            return cached
+        if expired():
+            metrics.observe_tool(self.name, "deadline")
+            return deadline_notice(self)
+        start = time.monotonic()
+        try:
+            result = func(self, *args, **kwargs)
+        except Exception:
+            metrics.observe_tool(self.name, "error", time.monotonic() - start)
+            raise
+        memoize = not isinstance(result, Uncached)
+        raw = result if memoize else result.value
+        result = observation.render(self.name, raw)
+        metrics.observe_tool(self.name, _outcome(raw), time.monotonic() - start, approximate_size(result))
+        if memoize and is_cacheable(raw) and not expired():
+            tool_cache.put(key, result)
+        return result
+    return wrapper
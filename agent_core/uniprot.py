@@ -0,0 +1,76 @@
+"""UniProt search-hit matching and entry shaping for the ``ProteinInfoTool`` copies.
+
+Shared by agent_core and extensibility_tool, which run the same UniProt search
+and Proteins API lookup; ``observation.project_protein`` cuts the output down
+further for the prompt.
+"""
+
+
+def match_protein_accession(term, search_response):
+    """Return the accession of the first UniProt search hit that matches ``term``."""
+    for entry in search_response.get('results', []):
+        primary_accession = entry.get('primaryAccession', '')
+        uni_protkb_id = entry.get('uniProtkbId', '')
+        alternative_names = [
+            name.get('fullName', {}).get('value', '')
+            for name in entry.get('proteinDescription', {}).get('alternativeNames', [])
+        ]
+        if term.lower() in (primary_accession.lower(), *map(str.lower, alternative_names)) or \
+           f"{term}_HUMAN".lower() == uni_protkb_id.lower():
+            return primary_accession
+    return None
+
+
+def protein_output(protein_response):
+    """The entry's names, gene, sequence and its comments of interest, grouped by comment type."""
+    comment_types = {
+        "FUNCTION": [],
+        "PTM": [],
+        "SUBUNIT": [],
+        "INTERACTION": [],
+        "TISSUE_SPECIFICITY": [],
+        "MASS_SPECTROMETRY": [],
+        "DISEASE": [],
+        "POLYMORPHISM": [],
+        "MISCELLANEOUS": [],
+        "SIMILARITY": [],
+        "CAUTION": []
+    }
+
+    for comment in protein_response.get('comments', []):
+        comment_type = comment.get('type')
+        if comment_type in comment_types:
+            if comment_type == "INTERACTION":
+                comment_types[comment_type].extend(comment.get('interactions', []))
+            elif comment_type == "MASS_SPECTROMETRY":
+                comment_types[comment_type].append({
+                    "type": comment.get('type'),
+                    "molecule": comment.get('molecule'),
+                    "method": comment.get('method'),
+                    "mass": comment.get('mass'),
+                    "error": comment.get('error')
+                })
+            elif comment_type == "DISEASE":
+                comment_types[comment_type].append({
+                    "type": comment.get('type'),
+                    "diseaseId": comment.get('diseaseId'),
+                    "acronym": comment.get('acronym'),
+                    "dbReference": comment.get('dbReference'),
+                    "description": comment.get('description', {}).get('value', '')
+                })
+            else:
+                comment_types[comment_type].extend(
+                    text.get('value', '') for text in comment.get('text', []) if isinstance(text, dict)
+                )
+
+    output = {
+        "id": protein_response.get("id"),
+        "accession": protein_response.get("accession"),
+        "secondaryAccession": protein_response.get("secondaryAccession"),
+        "protein": protein_response.get("protein"),
+        "alternativeName": protein_response.get("alternativeName"),
+        "gene": protein_response.get("gene"),
+        "comments": comment_types,
+        "sequence": protein_response.get("sequence", {}).get("sequence", "")
+    }
+    return output
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import random
+import string
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "agent_core")))
+from lexicon_snapshot import SOURCES
+from fuzzy_index import allowed_distance, build_index, fuzzy_key, load_index
+
+
+def misspell(name, rng):
+    """One random substitution, insertion, deletion or adjacent transposition."""
+    i = rng.randrange(1, len(name) - 1)
+    edit = rng.choice(("substitute", "insert", "delete", "transpose"))
+    letter = rng.choice(string.ascii_lowercase)
+    if edit == "substitute":
+        return name[:i] + letter + name[i + 1:]
+    if edit == "insert":
+        return name[:i] + letter + name[i:]
+    if edit == "delete":
+        return name[:i] + name[i + 1:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resolution rate and latency of the fuzzy lexicon index on misspelled names.")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of misspelled names to resolve.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for picking and misspelling names.")
+    args = parser.parse_args()
+
+    snapshot_dir = tempfile.mkdtemp(prefix="bench_fuzzy_")
+    start = time.perf_counter()
+    build_index(snapshot_dir)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    index = load_index(snapshot_dir)
+    open_time = time.perf_counter() - start
+    index.search("warm up the gram table")
+
+    names = sorted({name for path, loader in SOURCES.values() for name in loader(path).name_to_ids
+                    if allowed_distance(fuzzy_key(name)) > 0})
+    rng = random.Random(args.seed)
+    queries = [(name, misspell(name, rng)) for name in rng.sample(names, args.queries)]
+
+    latencies, resolved, top1 = [], 0, 0
+    for name, typo in queries:
+        start = time.perf_counter()
+        candidates = index.search(typo)
+        latencies.append(time.perf_counter() - start)
+        resolved += fuzzy_key(name) in {fuzzy_key(c.name) for c in candidates}
+        top1 += bool(candidates) and fuzzy_key(candidates[0].name) == fuzzy_key(name)
+
+    print(f"index: {len(index)} entries, built in {build_time:.2f}s, opened in {open_time * 1e3:.2f}ms")
+    print(f"resolved {resolved / len(queries):.1%} of {len(queries)} one-edit typos "
+          f"(top-1 {top1 / len(queries):.1%})")
+    print(f"latency mean {sum(latencies) / len(latencies) * 1e6:.0f}us  p50 {percentile(latencies, 0.5) * 1e6:.0f}us  "
+          f"p95 {percentile(latencies, 0.95) * 1e6:.0f}us  max {max(latencies) * 1e6:.0f}us")
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "agent_core")))
+from http_client import http_get, close_sessions
+
+os.environ["NO_PROXY"] = "127.0.0.1,localhost"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every GET with a small JSON body and counts new TCP connections."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubHandler.lock:
+            StubHandler.connections += 1
+
+    def do_GET(self):
+        body = json.dumps({"esearchresult": {"idlist": ["672"]}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_case(label, get, url, n_requests, n_threads):
+    StubHandler.connections = 0
+    per_thread = n_requests // n_threads
+
+    def worker():
+        for i in range(per_thread):
+            get(url, params={"term": str(i)}).json()
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done = per_thread * n_threads
+    print(f"{label:<22} requests={done:<6} connections={StubHandler.connections:<6} "
+          f"total={elapsed:.3f}s per_request={elapsed / done * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare bare requests.get with the pooled http_client against a local stub server.")
+    parser.add_argument("--requests", type=int, default=500, help="Number of requests per case.")
+    parser.add_argument("--threads", type=int, default=4, help="Number of concurrent client threads.")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/entrez/eutils/esearch.fcgi"
+
+    run_case("requests.get", requests.get, url, args.requests, args.threads)
+    run_case("http_client.http_get", http_get, url, args.requests, args.threads)
+
+    close_sessions()
+    server.shutdown()
@@ -0,0 +1,84 @@
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "agent_core")))
+from lexicon import (DISEASE_ONTOLOGY_CSV, ORPHANET_CSV, PHENOTYPES_CSV, load_disease_ontology, load_orphanet,
+                     load_phenotypes)
+from lexicon_snapshot import SOURCES, load_snapshot
+
+
+def load_dicts():
+    """The dictionaries ExistenceCheckTool used to build with pandas ``iterrows``."""
+    disease_dict, pheno_dict, orphat_dict = {}, {}, {}
+    for _, row in pd.read_csv(DISEASE_ONTOLOGY_CSV).iterrows():
+        synonyms = row['synonyms'].lower().split(', ') if pd.notna(row['synonyms']) else []
+        disease_dict[row['lbl'].lower()] = row['id'].lower()
+        for synonym in synonyms:
+            disease_dict[synonym] = row['id'].lower()
+    for _, row in pd.read_csv(PHENOTYPES_CSV).iterrows():
+        for name in row['Name'].lower().split(', '):
+            pheno_dict[name] = row['ID'].lower()
+    with open(ORPHANET_CSV, mode='r', encoding='gbk') as f:
+        for row in csv.DictReader(f):
+            orphat_dict[row['ORPHAcode'].lower()] = row['Preferred term'].lower()
+    return disease_dict, pheno_dict, orphat_dict
+
+
+def scan(d, name):
+    """The previous linear query_* lookup."""
+    for code, term in d.items():
+        if name.lower() == code.lower() or name.lower() == term.lower():
+            return True
+    return False
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare linear-scan, hash-indexed and snapshot ExistenceCheckTool lexicon lookups.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of names to look up (half hits, half misses).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for picking names.")
+    args = parser.parse_args()
+
+    dicts, dict_build = timed(load_dicts)
+    lexicons, lexicon_build = timed(lambda: (load_disease_ontology(), load_phenotypes(), load_orphanet()))
+    snapshot_dir = tempfile.mkdtemp(prefix="bench_lexicon_")
+    _, snapshot_compile = timed(lambda: [load_snapshot(path, loader, snapshot_dir) for path, loader in SOURCES.values()])
+    snapshots, snapshot_open = timed(lambda: [load_snapshot(path, loader, snapshot_dir) for path, loader in SOURCES.values()])
+
+    rng = random.Random(args.seed)
+    names = rng.sample(sorted(dicts[1]), args.queries // 2) + [f"no such term {i}" for i in range(args.queries - args.queries // 2)]
+    rng.shuffle(names)
+
+    def run_scan():
+        return [scan(dicts[1], n) or scan(dicts[0], n) or scan(dicts[2], n) for n in names]
+
+    def run_index():
+        return [n in lexicons[1] or n in lexicons[0] or n in lexicons[2] for n in names]
+
+    def run_snapshot():
+        return [n in snapshots[1] or n in snapshots[0] or n in snapshots[2] for n in names]
+
+    scanned, scan_time = timed(run_scan)
+    indexed, index_time = timed(run_index)
+    from_snapshot, snapshot_time = timed(run_snapshot)
+    assert scanned == indexed == from_snapshot, "indexed lookups disagree with the linear scan"
+
+    print(f"{'':<14} {'startup':>9} {'per lookup':>12}")
+    print(f"{'linear scan':<14} {dict_build:>8.3f}s {scan_time / len(names) * 1e6:>10.1f}us")
+    print(f"{'hash index':<14} {lexicon_build:>8.3f}s {index_time / len(names) * 1e6:>10.1f}us")
+    print(f"{'snapshot':<14} {snapshot_open:>8.3f}s {snapshot_time / len(names) * 1e6:>10.1f}us"
+          f"  (first compile {snapshot_compile:.2f}s)")
+    print(f"speed-up per lookup: {scan_time / index_time:.0f}x over {len(names)} names "
+          f"({sum(indexed)} found; {len(lexicons[0]) + len(lexicons[1]) + len(lexicons[2])} ontology terms)")
@@ -0,0 +1,75 @@
+import os
+import sys
+import argparse
+import tempfile
+import multiprocessing as mp
+
+AGENT_CORE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "agent_core"))
+sys.path.append(AGENT_CORE)
+
+
+def memory_kb():
+    """Rss, Pss and private (USS) memory of this process from /proc/self/smaps_rollup, in kB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def load(representation, snapshot_dir):
+    from lexicon_snapshot import SOURCES, load_snapshot
+    if representation == "dict":
+        return [loader(path) for path, loader in SOURCES.values()]
+    return [load_snapshot(path, loader, snapshot_dir) for path, loader in SOURCES.values()]
+
+
+def worker(representation, snapshot_dir, names, barrier, results):
+    import lexicon_snapshot  # noqa: F401  (imports are not part of the measurement)
+    before = memory_kb()
+    lexicons = load(representation, snapshot_dir)
+    # Touch every entry so all of a mapped snapshot is paged in, as in a long-running worker.
+    found = sum(any(name in lexicon for lexicon in lexicons) for name in names)
+    barrier.wait()  # every worker holds its lexicons while the others measure
+    after = memory_kb()
+    results.put({key: after[key] - before[key] for key in after} | {"found": found})
+    barrier.wait()
+
+
+def run_case(representation, workers, snapshot_dir, names):
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(representation, snapshot_dir, names, barrier, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    mean = {key: sum(s[key] for s in samples) / len(samples) for key in ("rss", "pss", "uss")}
+    print(f"{representation:<10} workers={workers:<3} per worker: rss={mean['rss'] / 1024:>6.1f} MB "
+          f"pss={mean['pss'] / 1024:>6.1f} MB uss={mean['uss'] / 1024:>6.1f} MB   "
+          f"total pss={mean['pss'] * workers / 1024:>6.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-process memory of dict lexicons vs. the shared memory-mapped snapshot.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes per case.")
+    args = parser.parse_args()
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        sys.exit("This benchmark reads /proc/self/smaps_rollup and needs Linux 4.14 or later.")
+
+    from lexicon_snapshot import SOURCES, build_snapshot
+    from lexicon import load_phenotypes, load_disease_ontology, load_orphanet
+
+    snapshot_dir = tempfile.mkdtemp(prefix="bench_lexicon_memory_")
+    for path, loader in SOURCES.values():
+        build_snapshot(path, loader, snapshot_dir)
+    names = [name for lexicon in (load_disease_ontology(), load_phenotypes(), load_orphanet())
+             for name in lexicon.name_to_ids]
+
+    run_case("dict", args.workers, snapshot_dir, names)
+    run_case("mmap", args.workers, snapshot_dir, names)
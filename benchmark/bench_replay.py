@@ -0,0 +1,76 @@
+import os
+import sys
+import csv
+import glob
+import time
+import argparse
+import statistics
+
+
+def read_questions(path, limit):
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            with open(path, "r", encoding=encoding) as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                questions = [row[0].strip() for row in reader if row and row[0].strip()]
+            return questions[:limit] if limit else questions
+        except UnicodeDecodeError:
+            continue
+    return []
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+if __name__ == "__main__":
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Record or replay upstream API traffic of run_agent over the evaluation_task/ questions.")
+    parser.add_argument("--mode", choices=["record", "replay"], required=True, help="Record a cassette from the live APIs, or replay it offline.")
+    parser.add_argument("--tasks", type=str, default=os.path.join(root, "evaluation_task", "**", "*.csv"), help="Glob of task CSV files.")
+    parser.add_argument("--limit", type=int, default=5, help="Questions per task file (0 for all).")
+    parser.add_argument("--cassette", type=str, default=None, help="Cassette file (default: BIORAGENT_CASSETTE).")
+    parser.add_argument("--latency", type=str, default=None, help="Injected replay latency, e.g. recorded, fixed:50, uniform:20,200, lognormal:120,0.6.")
+    parser.add_argument("--seed", type=str, default="0", help="Seed for the latency draws.")
+    parser.add_argument("--deadline", type=float, default=None, help="Per-question deadline in seconds.")
+    args = parser.parse_args()
+
+    # The agent modules read their settings at import time.
+    os.environ["BIORAGENT_CASSETTE_MODE"] = args.mode
+    os.environ["BIORAGENT_REPLAY_SEED"] = args.seed
+    if args.cassette:
+        os.environ["BIORAGENT_CASSETTE"] = args.cassette
+    if args.latency is not None:
+        os.environ["BIORAGENT_REPLAY_LATENCY"] = args.latency
+
+    sys.path.append(os.path.join(root, "agent_core"))
+    from agent_main import run_agent
+    from cassette import active_cassette
+    from tool_runtime import tool_cache
+
+    latencies = []
+    for path in sorted(glob.glob(args.tasks, recursive=True)):
+        task_latencies = []
+        for question in read_questions(path, args.limit):
+            start = time.perf_counter()
+            try:
+                run_agent(question, deadline_s=args.deadline)
+            except Exception as e:
+                print(f"[ERROR] {question}: {e}")
+            task_latencies.append(time.perf_counter() - start)
+        if task_latencies:
+            latencies.extend(task_latencies)
+            print(f"{os.path.relpath(path, root):<70} questions={len(task_latencies):<4} "
+                  f"mean={statistics.mean(task_latencies):.2f}s max={max(task_latencies):.2f}s")
+
+    if not latencies:
+        print("No questions found.")
+        sys.exit(1)
+    stats = active_cassette().stats()
+    print(f"\nquestions={len(latencies)} mean={statistics.mean(latencies):.2f}s "
+          f"p50={percentile(latencies, 0.5):.2f}s p95={percentile(latencies, 0.95):.2f}s")
+    print(f"cassette: {stats['path']} exchanges={stats['exchanges']} recorded={stats['recorded']} "
+          f"hits={stats['hits']} misses={stats['misses']}")
+    print(f"tool cache: {tool_cache.stats()}")
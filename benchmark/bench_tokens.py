@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+import csv
+import glob
+import argparse
+import statistics
+
+# Task file -> (tool class in agent_data, pattern whose first group is the tool argument).
+# Multi-hop tasks are measured on their first hop.
+TASKS = {
+    "disease_definition": ("DiseaseInfoTool", r"What is \(are\)\s*(.+?)\s*\?"),
+    "gene_function": ("GeneInfoTool", r"function of the gene\s+(\S+)"),
+    "phenotype_definition": ("PhenotypesInfoTool", r"What is\s+(.+?)\s*\?"),
+    "protein_function": ("ProteinInfoTool", r"function of the protein\s+(.+?)\s*\?"),
+    "gene_disease_association": ("DiseaseGeneTool", r"genes related to\s+(.+?)\s*\?"),
+    "phenotype_disease_association": ("PhenotypesDiseaseTool", r"disease related to\s+(.+?)\s*\?"),
+    "phenotype_gene_association": ("PhenotypesGeneTool", r"genes related to\s+(.+?)\s*\?"),
+    "SNP_location": ("SNPInfoTool", r"(rs\d+)"),
+    "gene_SNP_association": ("SNPInfoTool", r"(rs\d+)"),
+    "gene_location": ("GeneInfoTool", r"Which chromosome is\s+(\S+)\s+gene"),
+    "gene_alias": ("GeneInfoTool", r"official gene symbol of\s+(.+?)\s*\?"),
+    "SNP_gene_function": ("SNPInfoTool", r"(rs\d+)"),
+    "disease_gene_location": ("DiseaseGeneTool", r"genes related to\s+(.+?)\.?\s*$"),
+    "phenotype_gene_location": ("PhenotypesGeneTool", r"genes related to\s+(.+?)\.?\s*$"),
+}
+
+
+def read_questions(path, limit):
+    for encoding in ("utf-8", "latin-1"):
+        try:
+            with open(path, "r", encoding=encoding) as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                questions = [row[0].strip() for row in reader if row and row[0].strip()]
+            return questions[:limit] if limit else questions
+        except UnicodeDecodeError:
+            continue
+    return []
+
+
+def token_counter(encoding_name):
+    """tiktoken's count when it is installed, otherwise a word/punctuation approximation."""
+    try:
+        import tiktoken
+    except ImportError:
+        pattern = re.compile(r"\w+|[^\w\s]")
+        return lambda text: len(pattern.findall(text)), "approx (words + punctuation)"
+    encoding = tiktoken.get_encoding(encoding_name)
+    return lambda text: len(encoding.encode(text, disallowed_special=())), encoding_name
+
+
+if __name__ == "__main__":
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Compare prompt tokens of full and compact tool observations over the evaluation_task/ questions.")
+    parser.add_argument("--tasks", type=str, default=os.path.join(root, "evaluation_task", "**", "*.csv"), help="Glob of task CSV files.")
+    parser.add_argument("--limit", type=int, default=5, help="Questions per task file (0 for all).")
+    parser.add_argument("--encoding", type=str, default="cl100k_base", help="tiktoken encoding used to count tokens.")
+    parser.add_argument("--mode", choices=["off", "record", "replay"], default="off", help="Run against the live APIs, or record/replay a cassette.")
+    parser.add_argument("--cassette", type=str, default=None, help="Cassette file (default: BIORAGENT_CASSETTE).")
+    args = parser.parse_args()
+
+    # The agent modules read their settings at import time.
+    os.environ["BIORAGENT_CASSETTE_MODE"] = args.mode
+    if args.cassette:
+        os.environ["BIORAGENT_CASSETTE"] = args.cassette
+
+    sys.path.append(os.path.join(root, "agent_core"))
+    import agent_data
+    from observation import render
+
+    count, counted_as = token_counter(args.encoding)
+    print(f"tokens: {counted_as}")
+    print(f"{'task':<32}{'calls':>6}{'full':>10}{'compact':>10}{'saved':>8}")
+    totals = {"full": 0, "compact": 0}
+    for path in sorted(glob.glob(args.tasks, recursive=True)):
+        task = os.path.splitext(os.path.basename(path))[0]
+        if task not in TASKS:
+            continue
+        tool_class, pattern = TASKS[task]
+        tool = getattr(agent_data, tool_class)()
+        full, compact = [], []
+        for question in read_questions(path, args.limit):
+            match = re.search(pattern, question)
+            if not match:
+                continue
+            try:
+                # The undecorated _run: no result cache and no rendering, so both forms start from the same result.
+                result = tool._run.__wrapped__(tool, match.group(1).strip())
+            except Exception as e:
+                print(f"  {tool.name}({match.group(1)!r}) failed: {e}")
+                continue
+            full.append(count(str(render(tool.name, result, compact=False))))
+            compact.append(count(str(render(tool.name, result, compact=True))))
+        if not full:
+            continue
+        totals["full"] += sum(full)
+        totals["compact"] += sum(compact)
+        saved = 1 - sum(compact) / sum(full) if sum(full) else 0.0
+        print(f"{task:<32}{len(full):>6}{statistics.mean(full):>10.0f}{statistics.mean(compact):>10.0f}{saved:>8.1%}")
+    if totals["full"]:
+        print(f"total: {totals['full']} -> {totals['compact']} tokens "
+              f"({1 - totals['compact'] / totals['full']:.1%} fewer)")
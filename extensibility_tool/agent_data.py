@@ -6,8 +6,7 @@ from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from typing import List, Union, Dict, Any, Optional
 from urllib.parse import urlencode, quote
-from urllib3.exceptions import MaxRetryError, ProxyError
-import requests
+import asyncio
 import json
 import time
 import re
@@ -15,23 +14,37 @@ import sys
 import os
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'agent_core')))
+from http_client import fetch_data, afetch_data
+from tool_runtime import tool_run
+from annotation_store import ahpo_gene_id, hpo_gene_id
+from uniprot import match_protein_accession, protein_output
+
 load_dotenv()
 bioontology_api_key = os.getenv("BIOONTOLOGY_API_KEY")
 def is_id(s):
             return s.startswith("HP:") and s[3:].isdigit()    
 
+def _pick_hpo_id(data, phenotype_name):
+    for term in data.get('terms', []):
+        name = term.get('name', '')
+        synonyms = term.get('synonyms', [])           
+        if phenotype_name.lower() in name.lower() or any(phenotype_name.lower() in synonym.lower() for synonym in synonyms):
+            return term.get('id')
+    return None
+
+def _hpo_search_url(phenotype_name):
+    return f"https://ontology.jax.org/api/hp/search?q={quote(phenotype_name)}&page=0&limit=10"
+
 def hpo_id(phenotype_name):
-    url_name = f"https://ontology.jax.org/api/hp/search?q={quote(phenotype_name)}&page=0&limit=10"    
-    response = requests.get(url_name)   
-    if response.status_code == 200:
-        data = response.json()        
-        for term in data.get('terms', []):
-            name = term.get('name', '')
-            synonyms = term.get('synonyms', [])           
-            if phenotype_name.lower() in name.lower() or any(phenotype_name.lower() in synonym.lower() for synonym in synonyms):
-                return term.get('id')
-            else:
-                return None
+    data = fetch_data(_hpo_search_url(phenotype_name))
+    if data:
+        return _pick_hpo_id(data, phenotype_name)
+
+async def ahpo_id(phenotype_name):
+    data = await afetch_data(_hpo_search_url(phenotype_name))
+    if data:
+        return _pick_hpo_id(data, phenotype_name)
 
 def get_phenotype_id(phenotype_term):
         if is_id(phenotype_term):
@@ -40,37 +53,44 @@ def get_phenotype_id(phenotype_term):
             return f"HP:{phenotype_term}"
         return hpo_id(phenotype_term)
 
-def fetch_data(url, headers=None, params=None, max_retries=3, delay=5):
-    for _ in range(max_retries):
-        try:
-            response = requests.get(url, headers=headers, params=params)  
-            response.raise_for_status() 
-            time.sleep(0.4) 
-            return response.json() 
-        except (MaxRetryError, ProxyError) as e:
-            print(f"Connection error: {e}. Retrying...")
-            time.sleep(delay)  
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
-            break  
-    return None 
+async def aget_phenotype_id(phenotype_term):
+        if is_id(phenotype_term):
+            return phenotype_term
+        if phenotype_term.isdigit():
+            return f"HP:{phenotype_term}"
+        return await ahpo_id(phenotype_term)
 
 class PhenotypesInfoTool(BaseTool):
     name = "Phenotypes Info Extractor"
     description = "Use this tool to extract information from a given symptom/Phenotypes name"
+    @tool_run
     def _run(self, phenotype_term: str) -> str:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}"       
         data = fetch_data(url_id)
         return data if data else "Not Found"   
+
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> str:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}"
+        data = await afetch_data(url_id)
+        return data if data else "Not Found"
                    
 class PhenotypesParentsTool(BaseTool):
     name = "Phenotypes Parents Extractor"
     description = "Use this tool to extract parents from a given symptom/Phenotypes name"
+    @tool_run
     def _run(self, phenotype_term: str) -> str:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/parents"
         data = fetch_data(url_id)
         if data:
@@ -79,13 +99,27 @@ class PhenotypesParentsTool(BaseTool):
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> str:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/parents"
+        data = await afetch_data(url_id)
+        if data:
+            return [{'id': item['id'], 'name': item['name'], 'descendantCount': item['descendantCount']} for item in data]
+        return "Not Found"
+
 class PhenotypesChildrenTool(BaseTool):
     name = "Phenotypes Childrens Extractor"
     description = "Use this tool to extract symptom/Phenotypes children from a given symptom/Phenotypes name"
+    @tool_run
     def _run(self, phenotype_term: str) -> str:
         phenotype_id=None
         results = []
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
         url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/children"
         data = fetch_data(url_id)
         if data:
@@ -94,12 +128,26 @@ class PhenotypesChildrenTool(BaseTool):
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> str:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        url_id = f"https://ontology.jax.org/api/hp/terms/{quote(str(phenotype_id))}/children"
+        data = await afetch_data(url_id)
+        if data:
+            return [{'id': item['id'], 'name': item['name'], 'descendantCount': item['descendantCount']} for item in data]
+        return "Not Found"
+
 class PhenotypesDiseaseTool(BaseTool):
     name = "Phenotypes Disease Extractor"
     description = "Use this tool to extract diseases associated with the given phenotypes/symptom name"
+    @tool_run
     def _run(self, phenotype_term: str) -> Union[List[str], str]:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
         url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(phenotype_id))}"
         data = fetch_data(url_annotation)     
         if data and 'diseases' in data:
@@ -107,12 +155,26 @@ class PhenotypesDiseaseTool(BaseTool):
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> Union[List[str], str]:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(phenotype_id))}"
+        data = await afetch_data(url_annotation)
+        if data and 'diseases' in data:
+            return data['diseases']
+        return "Not Found"
+
 class PhenotypesGeneTool(BaseTool):
     name = "Phenotypes Gene Extractor"
     description = "Use this tool to extract genes associated with a given phenotypes/symptom name."
+    @tool_run
     def _run(self, phenotype_term: str) -> Union[List[str], str]:
         phenotype_id=None
         phenotype_id = get_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
         url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(phenotype_id))}"
         data = fetch_data(url_annotation)    
         if data and 'genes' in data:
@@ -120,25 +182,23 @@ class PhenotypesGeneTool(BaseTool):
         else:
             return "Not Found"
 
+    @tool_run
+    async def _arun(self, phenotype_term: str) -> Union[List[str], str]:
+        phenotype_id = await aget_phenotype_id(phenotype_term)
+        if phenotype_id is None:
+            return "Not Found"
+        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(phenotype_id))}"
+        data = await afetch_data(url_annotation)
+        if data and 'genes' in data:
+            return data['genes']
+        return "Not Found"
+
 class GenePhenotypesTool(BaseTool):
     name = "Gene Phenotypes Extractor"
     description = "Use this tool to extract Phenotypes associated with a gene for a given term"
+    @tool_run
     def _run(self, gene_term: str) -> Union[List[str], str]:
-        gene_id = None
-
-        def is_gene_id(s):
-            return s.startswith("NCBIGene:") and s[9:].isdigit()
-        if is_gene_id(gene_term):
-            gene_id = gene_term
-        elif gene_term.isdigit():
-            gene_id = f"NCBIGene:{gene_term}"
-        else:
-            url_name = f"https://ontology.jax.org/api/network/search/gene?q={quote(gene_term)}&page=0&limit=10"
-            response = fetch_data(url_name)
-            if response and 'results' in response and len(response['results']) > 0:
-                gene_id = response['results'][0]['id']
-            else:
-                return "Not Found"
+        gene_id = hpo_gene_id(gene_term)
         if gene_id is None:
             return "Not Found"
         url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(gene_id))}"
@@ -147,26 +207,24 @@ class GenePhenotypesTool(BaseTool):
             return response['phenotypes']
 
         return "Not Found"   
+
+    @tool_run
+    async def _arun(self, gene_term: str) -> Union[List[str], str]:
+        gene_id = await ahpo_gene_id(gene_term)
+        if gene_id is None:
+            return "Not Found"
+        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(gene_id))}"
+        response = await afetch_data(url_annotation)
+        if response and 'phenotypes' in response:
+            return response['phenotypes']
+        return "Not Found"
     
 class GeneDiseaseTool(BaseTool):
     name = "Gene Diseases Extractor"
     description = "Use this tool to extract Diseases associated with a gene for a given term"
+    @tool_run
     def _run(self, gene_term: str) -> Union[List[str], str]:        
-        gene_id = None
-        def is_gene_id(s):
-            return s.startswith("NCBIGene:") and s[9:].isdigit()
-
-        if is_gene_id(gene_term):
-            gene_id = gene_term
-        elif gene_term.isdigit():
-            gene_id = f"NCBIGene:{gene_term}"
-        else:
-            url_name = f"https://ontology.jax.org/api/network/search/gene?q={quote(gene_term)}&page=0&limit=10"
-            response = fetch_data(url_name)
-            if response and 'results' in response and len(response['results']) > 0:
-                gene_id = response['results'][0]['id']
-            else:
-                return "Not Found" 
+        gene_id = hpo_gene_id(gene_term)
         if gene_id is None:
             return "Not Found"
         url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(gene_id))}"
@@ -175,9 +233,21 @@ class GeneDiseaseTool(BaseTool):
             return response['diseases']
         return "Not Found"
 
+    @tool_run
+    async def _arun(self, gene_term: str) -> Union[List[str], str]:
+        gene_id = await ahpo_gene_id(gene_term)
+        if gene_id is None:
+            return "Not Found"
+        url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(gene_id))}"
+        response = await afetch_data(url_annotation)
+        if response and 'diseases' in response:
+            return response['diseases']
+        return "Not Found"
+
 class DiseasePhenotypesTool(BaseTool):
     name = "Disease Phenotypes Extractor"
     description = "Use this tool to extract the phenotypes associated with the given disease name."
+    @tool_run
     def _run(self, disease_term: str) -> Union[str, None]:
             disease_id=None
             def is_disease_id(s):
@@ -186,9 +256,9 @@ class DiseasePhenotypesTool(BaseTool):
                 if is_disease_id(disease_term):
                     disease_id=disease_term
                 else:
-                    url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(str(disease_id))}&page=0&limit=10"
+                    url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_term)}&page=0&limit=10"
                     response = fetch_data(url_name) 
-                    if response and 'results' in response:
+                    if response and response.get('results'):
                         disease_name = response['results'][0]['name']
                         if disease_name.lower() == disease_term.lower():
                             disease_id = response['results'][0]['id']                                       
@@ -214,11 +284,33 @@ class DiseasePhenotypesTool(BaseTool):
                         return response['categories']
                     else:
                         return "Not Found"                 
+
+    @tool_run
+    async def _arun(self, disease_term: str) -> Union[str, None]:
+        if disease_term.isdigit():
+            candidates = [f"OMIM:{disease_term}", f"ORPHA:{disease_term}"]
+        elif (disease_term.startswith("OMIM:") and disease_term[5:].isdigit()) or \
+                (disease_term.startswith("ORPHA:") and disease_term[6:].isdigit()):
+            candidates = [disease_term]
+        else:
+            url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_term)}&page=0&limit=10"
+            response = await afetch_data(url_name)
+            candidates = []
+            if response and response.get('results') and \
+                    response['results'][0]['name'].lower() == disease_term.lower():
+                candidates = [response['results'][0]['id']]
+        for disease_id in candidates:
+            url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(str(disease_id))}"
+            response = await afetch_data(url_annotation)
+            if response and 'categories' in response:
+                return response['categories']
+        return "Not Found"
                
 class ProteinInfoTool(BaseTool):
     name = "Protein Information Extractor"
     description = "Use this tool to extract protein information from UniProt API"
 
+    @tool_run
     def _run(self, term: str) -> Optional[str]:
         search_url = f'https://rest.uniprot.org/uniprotkb/search?query={term}'
         base_url = "https://www.ebi.ac.uk/proteins/api/proteins"
@@ -226,83 +318,38 @@ class ProteinInfoTool(BaseTool):
         if not search_response:
             print(f"Error: Unable to fetch data from UniProt.")
             return None
+        protein_id = match_protein_accession(term, search_response)
+        if protein_id:
+            protein_response = fetch_data(f"{base_url}/{protein_id}")
+            if not protein_response:
+                print(f"Error: Unable to fetch detailed protein information for '{protein_id}'.")
+                return None
+            return protein_output(protein_response)
+        print(f"No matching protein found for '{term}'.")
+        return None
 
-        for entry in search_response.get('results', []):
-            primary_accession = entry.get('primaryAccession', '')
-            uni_protkb_id = entry.get('uniProtkbId', '')
-            recommended_name = entry.get('proteinDescription', {}).get('recommendedName', {}).get('fullName', {}).get('value', '')
-            alternative_names = [
-                name.get('fullName', {}).get('value', '') 
-                for name in entry.get('proteinDescription', {}).get('alternativeNames', [])
-            ]
-
-            if term.lower() in (primary_accession.lower(), *map(str.lower, alternative_names)) or \
-               f"{term}_HUMAN".lower() == uni_protkb_id.lower():
-                protein_id = primary_accession
-                protein_url = f"{base_url}/{protein_id}"
-
-                protein_response = fetch_data(protein_url)
-                if not protein_response:
-                    print(f"Error: Unable to fetch detailed protein information for '{protein_id}'.")
-                    return None
-                comment_types = {
-                    "FUNCTION": [],
-                    "PTM": [],
-                    "SUBUNIT": [],
-                    "INTERACTION": [],
-                    "TISSUE_SPECIFICITY": [],
-                    "MASS_SPECTROMETRY": [],
-                    "DISEASE": [],
-                    "POLYMORPHISM": [],
-                    "MISCELLANEOUS": [],
-                    "SIMILARITY": [],
-                    "CAUTION": []
-                }
-
-                for comment in protein_response.get('comments', []):
-                    comment_type = comment.get('type')
-                    if comment_type in comment_types:
-                        if comment_type == "INTERACTION":
-                            comment_types[comment_type].extend(comment.get('interactions', []))
-                        elif comment_type == "MASS_SPECTROMETRY":
-                            comment_types[comment_type].append({
-                                "type": comment.get('type'),
-                                "molecule": comment.get('molecule'),
-                                "method": comment.get('method'),
-                                "mass": comment.get('mass'),
-                                "error": comment.get('error')
-                            })
-                        elif comment_type == "DISEASE":
-                            comment_types[comment_type].append({
-                                "type": comment.get('type'),
-                                "diseaseId": comment.get('diseaseId'),
-                                "acronym": comment.get('acronym'),
-                                "dbReference": comment.get('dbReference'),
-                                "description": comment.get('description', {}).get('value', '')
-                            })
-                        else:
-                            comment_types[comment_type].extend(
-                                text.get('value', '') for text in comment.get('text', []) if isinstance(text, dict)
-                            )
-
-                output = {
-                    "id": protein_response.get("id"),
-                    "accession": protein_response.get("accession"),
-                    "secondaryAccession": protein_response.get("secondaryAccession"),
-                    "protein": protein_response.get("protein"),
-                    "alternativeName": protein_response.get("alternativeName"),
-                    "gene": protein_response.get("gene"),
-                    "comments": comment_types,
-                    "sequence": protein_response.get("sequence", {}).get("sequence", "")
-                }
-                return json.dumps(output, indent=4)
-
+    @tool_run
+    async def _arun(self, term: str) -> Optional[str]:
+        search_url = f'https://rest.uniprot.org/uniprotkb/search?query={term}'
+        base_url = "https://www.ebi.ac.uk/proteins/api/proteins"
+        search_response = await afetch_data(search_url)
+        if not search_response:
+            print(f"Error: Unable to fetch data from UniProt.")
+            return None
+        protein_id = match_protein_accession(term, search_response)
+        if protein_id:
+            protein_response = await afetch_data(f"{base_url}/{protein_id}")
+            if not protein_response:
+                print(f"Error: Unable to fetch detailed protein information for '{protein_id}'.")
+                return None
+            return protein_output(protein_response)
         print(f"No matching protein found for '{term}'.")
         return None
     
 class GeneInfoTool(BaseTool):
     name = "Gene Information Tool"
     description = "Use this tool to fetch gene information with given gene name."
+    @tool_run
     def _run(self, search_term: Union[str, List[str]]) -> str:
         base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
         search_url = base_url + 'esearch.fcgi'
@@ -353,70 +400,148 @@ class GeneInfoTool(BaseTool):
                         gene_information_dict[term] = response
         if not gene_information_dict:
             return "Not Found"
-        return json.dumps(gene_information_dict, indent=4)
+        return gene_information_dict
 
+    @tool_run
+    async def _arun(self, search_term: Union[str, List[str]]) -> str:
+        base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+        search_url = base_url + 'esearch.fcgi'
+        summary_url = base_url + 'esummary.fcgi'
+        base_url_gene = "https://api.ncbi.nlm.nih.gov/datasets/v2alpha/gene/symbol/"
+        headers = {
+            "accept": "application/json",
+            "api-key": os.getenv("NCBI_API_KEY")
+        }
+        if isinstance(search_term, list):
+            search_term = ','.join(search_term)
+        search_terms = [term.strip() for term in search_term.split(',')]
 
-class DiseaseInfoTool(BaseTool):
-    name = "Disease Information Extractor"
-    description = "Use this tool to extract detailed disease information in JSON format for a given term"
-    def _run(self, disease_name: str) -> Union[str, None]:
-        def fetch_bioontology_info(disease_name):
-            url = f'https://data.bioontology.org/search?q={disease_name}'
-            headers = {'Authorization': 'apikey token={bioontology_api_key}'}
-            response = fetch_data(url, headers=headers)
-            if response:
-                collection = response.get('collection', [])
-                for item in collection:
-                    if disease_name.lower() in [item.get('prefLabel', '').lower()] + \
-                            [syn.lower() for syn in item.get('synonym', [])]:
-                        return {
-                            'prefLabel': item.get('prefLabel', ''),
-                            'synonym': item.get('synonym', []),
-                            'definition': item.get('definition', [])
-                        }
+        async def fetch_gene_id(term: str) -> Optional[str]:
+            if term.isdigit():
+                return term
+            response = await afetch_data(f"{base_url_gene}{term}/taxon/9606", headers=headers)
+            if response and 'reports' in response:
+                return response['reports'][0]['gene']['gene_id']
             return None
 
-        def fetch_orpha_info(disease_name):
-            url = f"https://api.orphadata.com/rd-cross-referencing/orphacodes/names/{quote(disease_name)}?lang=en"
-            response = fetch_data(url)
-            if response and "data" in response and "results" in response["data"]:
-                data = response["data"]["results"]
-                return {
-                    "ORPHAcode": data.get("ORPHAcode", ""),
-                    "preferredTerm": data.get("Preferred term", ""),
-                    "summary": (
-                        data.get("SummaryInformation")[0].get("Definition", "")
-                        if isinstance(data.get("SummaryInformation"), list) and len(data.get("SummaryInformation")) > 0
-                        else ""
-                    ),
-                    "Synonym": data.get("Synonym", [])
-                }
+        async def fetch_gene_info(gene_id: str) -> Optional[dict]:
+            search_params = {'db': 'gene', 'term': gene_id, 'retmode': 'json'}
+            search_response = await afetch_data(search_url, params=search_params)
+            if search_response and 'esearchresult' in search_response:
+                gene_ids = search_response['esearchresult'].get('idlist', [])
+                if gene_ids:
+                    summary_params = {'db': 'gene', 'id': ','.join(gene_ids), 'retmode': 'json'}
+                    summary_response = await afetch_data(summary_url, params=summary_params)
+                    if summary_response and 'result' in summary_response:
+                        return summary_response['result']
             return None
 
-        def fetch_hpo_info(disease_name):
-            url = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_name)}&page=0&limit=10"
-            response = fetch_data(url)
-            if response and response.get("results"):
-                data = response["results"][0]
+        async def lookup(term: str):
+            gene_id = await fetch_gene_id(term)
+            if not gene_id:
+                return None
+            gene_info = await fetch_gene_info(gene_id)
+            if gene_info:
+                return gene_info
+            server = "https://grch37.rest.ensembl.org"
+            ext = f"/lookup/symbol/homo_sapiens/{term}?"
+            return await afetch_data(server + ext, headers={"Content-Type": "application/json"})
+
+        results = await asyncio.gather(*(lookup(term) for term in search_terms))
+        gene_information_dict = {term: info for term, info in zip(search_terms, results) if info}
+        if not gene_information_dict:
+            return "Not Found"
+        return gene_information_dict
+
+
+def _parse_bioontology_info(response, disease_name):
+    if response:
+        collection = response.get('collection', [])
+        for item in collection:
+            if disease_name.lower() in [item.get('prefLabel', '').lower()] + \
+                    [syn.lower() for syn in item.get('synonym', [])]:
                 return {
-                    "id": data.get("id", ""),
-                    "name": data.get("name", ""),
-                    "mondoId": data.get("mondoId", ""),
-                    "description": data.get("description", [])
+                    'prefLabel': item.get('prefLabel', ''),
+                    'synonym': item.get('synonym', []),
+                    'definition': item.get('definition', [])
                 }
-            return None
+    return None
+
+def _parse_orpha_info(response, disease_name):
+    if response and "data" in response and "results" in response["data"]:
+        data = response["data"]["results"]
+        return {
+            "ORPHAcode": data.get("ORPHAcode", ""),
+            "preferredTerm": data.get("Preferred term", ""),
+            "summary": (
+                data.get("SummaryInformation")[0].get("Definition", "")
+                if isinstance(data.get("SummaryInformation"), list) and len(data.get("SummaryInformation")) > 0
+                else ""
+            ),
+            "Synonym": data.get("Synonym", [])
+        }
+    return None
+
+def _parse_hpo_disease_info(response, disease_name):
+    if response and response.get("results"):
+        data = response["results"][0]
+        return {
+            "id": data.get("id", ""),
+            "name": data.get("name", ""),
+            "mondoId": data.get("mondoId", ""),
+            "description": data.get("description", [])
+        }
+    return None
+
+def _disease_info_sources(disease_name):
+    """(source, url, headers, parser) for every source DiseaseInfoTool combines."""
+    return [
+        ('Bioontology', f'https://data.bioontology.org/search?q={disease_name}',
+         {'Authorization': f'apikey token={bioontology_api_key}'}, _parse_bioontology_info),
+        ('Orpha', f"https://api.orphadata.com/rd-cross-referencing/orphacodes/names/{quote(disease_name)}?lang=en",
+         None, _parse_orpha_info),
+        ('HPO', f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_name)}&page=0&limit=10",
+         None, _parse_hpo_disease_info),
+    ]
+
+class DiseaseInfoTool(BaseTool):
+    name = "Disease Information Extractor"
+    description = "Use this tool to extract detailed disease information in JSON format for a given term"
+    @tool_run
+    def _run(self, disease_name: str) -> Union[str, None]:
+        combined_result = {
+            source: parse(fetch_data(url, headers=headers), disease_name)
+            for source, url, headers, parse in _disease_info_sources(disease_name)
+        }
+        combined_result = {key: value for key, value in combined_result.items() if value}
+        return combined_result if combined_result else "Not Found"
+
+    @tool_run
+    async def _arun(self, disease_name: str) -> Union[str, None]:
+        sources = _disease_info_sources(disease_name)
+        responses = await asyncio.gather(*(afetch_data(url, headers=headers) for _, url, headers, _ in sources))
         combined_result = {
-            'Bioontology': fetch_bioontology_info(disease_name),
-            'Orpha': fetch_orpha_info(disease_name),
-            'HPO': fetch_hpo_info(disease_name)
+            source: parse(response, disease_name)
+            for (source, _, _, parse), response in zip(sources, responses)
         }
         combined_result = {key: value for key, value in combined_result.items() if value}
         return combined_result if combined_result else "Not Found"
 
+def _omim_gene_symbols(summary_response):
+    """Gene symbols are the last ';'-separated part of each OMIM esummary title."""
+    annotation_result = []
+    for uid in summary_response['result']['uids']:
+        title = summary_response['result'][uid]['title']
+        parts = title.split(';')
+        if len(parts) > 1:
+            annotation_result.append(parts[-1].strip())
+    return annotation_result
+
 class DiseaseGeneTool(BaseTool):
     name = "Disease Gene Extractor"
     description = "Use this tool to extract genes associated with a given disease."
 
+    @tool_run
     def _run(self, disease_term: str) -> Union[str, None]:
         def is_disease_id(s: str) -> bool:
             """Check if the string is a disease ID (OMIM or ORPHA)."""
@@ -438,7 +563,6 @@ class DiseaseGeneTool(BaseTool):
                         return item['id']
             return None
         
-        annotation_result = []
         if disease_term.isdigit():
             disease_id = f"OMIM:{disease_term}"
             genes = fetch_genes_by_id(disease_id)
@@ -469,18 +593,54 @@ class DiseaseGeneTool(BaseTool):
             summary_params = {'db': 'omim', 'id': ','.join(gene_ids), 'retmode': 'json'}
             summary_response = fetch_data(summary_url, params=summary_params)
             if summary_response and 'result' in summary_response and 'uids' in summary_response['result']:
-                for uid in summary_response['result']['uids']:
-                    title = summary_response['result'][uid]['title']
-                    parts = title.split(';')
-                    if len(parts) > 1:
-                        annotation_result.append(parts[-1].strip())
-                return annotation_result
+                return _omim_gene_symbols(summary_response)
+        return "Not Found"
+
+    @tool_run
+    async def _arun(self, disease_term: str) -> Union[str, None]:
+        async def fetch_genes_by_id(disease_id: str) -> Optional[List[str]]:
+            url_annotation = f"https://ontology.jax.org/api/network/annotation/{quote(disease_id)}"
+            response = await afetch_data(url_annotation)
+            return response.get('genes', []) if response else None
+
+        async def fetch_disease_id_by_name(disease_name: str) -> Optional[str]:
+            url_name = f"https://ontology.jax.org/api/network/search/disease?q={quote(disease_name)}&page=0&limit=10"
+            response = await afetch_data(url_name)
+            if response and response.get('results'):
+                for item in response['results']:
+                    if item['name'].lower() == disease_name.lower():
+                        return item['id']
+            return None
+
+        if disease_term.isdigit():
+            candidates = [f"OMIM:{disease_term}", f"ORPHA:{disease_term}"]
+        elif (disease_term.startswith("OMIM:") and disease_term[5:].isdigit()) or \
+                (disease_term.startswith("ORPHA:") and disease_term[6:].isdigit()):
+            candidates = [disease_term]
+        else:
+            disease_id = await fetch_disease_id_by_name(disease_term)
+            candidates = [disease_id] if disease_id else []
+        for disease_id in candidates:
+            genes = await fetch_genes_by_id(disease_id)
+            if genes:
+                return genes
+
+        base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+        search_params = {'db': 'omim', 'term': disease_term, 'retmode': 'json'}
+        search_response = await afetch_data(base_url + 'esearch.fcgi', params=search_params)
+        if search_response and 'esearchresult' in search_response and 'idlist' in search_response['esearchresult']:
+            gene_ids = search_response['esearchresult']['idlist']
+            summary_params = {'db': 'omim', 'id': ','.join(gene_ids), 'retmode': 'json'}
+            summary_response = await afetch_data(base_url + 'esummary.fcgi', params=summary_params)
+            if summary_response and 'result' in summary_response and 'uids' in summary_response['result']:
+                return _omim_gene_symbols(summary_response)
         return "Not Found"
 
 
 class SNPInfoTool(BaseTool):
     name = "SNP Information Extractor"
     description = "Use this tool to extract detailed SNP information in JSON format for a given term"
+    @tool_run
     def _run(self, snp_term: str) -> Union[dict, None]:
         base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
         search_url = base_url + 'esearch.fcgi'
@@ -509,10 +669,53 @@ class SNPInfoTool(BaseTool):
             return None
         return summary_response
 
+    @tool_run
+    async def _arun(self, snp_term: str) -> Union[dict, None]:
+        base_url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+        search_params = {'db': 'snp', 'term': snp_term, 'retmode': 'json'}
+        search_response = await afetch_data(base_url + 'esearch.fcgi', params=search_params)
+        if not search_response:
+            return "Request failed or no results found"
+        snp_ids = search_response.get('esearchresult', {}).get('idlist', [])
+        if not snp_ids:
+            print(f"No results found for '{snp_term}'.")
+            return None
+        summary_params = {'db': 'snp', 'id': ','.join(snp_ids), 'retmode': 'json'}
+        summary_response = await afetch_data(base_url + 'esummary.fcgi', params=summary_params)
+        if not summary_response:
+            print("Failed to retrieve SNP summary information.")
+            return None
+        return summary_response
+
+
+def _extract_study(study):
+    protocol = study.get('protocolSection', {})
+    identification = protocol.get('identificationModule', {})
+    derived = study.get('derivedSection', {})
+    outcome_measures = {}
+    results = study.get('resultsSection', {})
+
+    if 'outcomeMeasuresModule' in results:
+        outcome_measures = results['outcomeMeasuresModule']
+    elif 'outcomeMeasuresModule' in protocol:
+        outcome_measures = protocol['outcomeMeasuresModule']
+
+    return {
+        'NCTId': identification.get('nctId'),
+        'OfficialTitle': identification.get('officialTitle'),
+        'BriefTitle': identification.get('briefTitle'),
+        'DescriptionModule': protocol.get('descriptionModule', {}),
+        'ConditionsModule': protocol.get('conditionsModule', {}),
+        'Design': protocol.get('designModule', {}),
+        'ArmsInterventionsModule': protocol.get('armsInterventionsModule', {}),
+        'OutcomeMeasuresModule': outcome_measures,
+        'InterventionBrowseModule': derived.get('interventionBrowseModule', {}),
+    }
 
 class ClinicalTrialTool(BaseTool):
     name = "Clinical Trial Extractor"
     description = "Use this tool to extract clinical trial information from ClinicalTrials.gov based on a search term or NCT ID"
+    @tool_run
     def _run(self, search_term: str) -> Union[Dict, str, None]:
         nct_pattern = re.compile(r'^NCT\d{8}$', re.IGNORECASE)
         if nct_pattern.match(search_term):
@@ -543,34 +746,28 @@ class ClinicalTrialTool(BaseTool):
             if not studies:
                 return f"No clinical trials found for '{search_term}'."
 
-            extracted_results = []
-            for study in studies:
-                protocol = study.get('protocolSection', {})
-                identification = protocol.get('identificationModule', {})
-                derived = study.get('derivedSection', {})
-                outcome_measures = {}
-                results = study.get('resultsSection', {})
-
-                if 'outcomeMeasuresModule' in results:
-                    outcome_measures = results['outcomeMeasuresModule']
-                elif 'outcomeMeasuresModule' in protocol:
-                    outcome_measures = protocol['outcomeMeasuresModule']
-
-                extracted_study_info = {
-                    'NCTId': identification.get('nctId'),
-                    'OfficialTitle': identification.get('officialTitle'),
-                    'BriefTitle': identification.get('briefTitle'),
-                    'DescriptionModule': protocol.get('descriptionModule', {}),
-                    'ConditionsModule': protocol.get('conditionsModule', {}),
-                    'Design': protocol.get('designModule', {}),
-                    'ArmsInterventionsModule': protocol.get('armsInterventionsModule', {}),
-                    'OutcomeMeasuresModule': outcome_measures,
-                    'InterventionBrowseModule': derived.get('interventionBrowseModule', {}),
-                }
-
-                extracted_results.append(extracted_study_info)
+            return {"clinical_trials": [_extract_study(study) for study in studies]}
 
-            return {"clinical_trials": extracted_results}
+    @tool_run
+    async def _arun(self, search_term: str) -> Union[Dict, str, None]:
+        if re.match(r'^NCT\d{8}$', search_term, re.IGNORECASE):
+            nct_id = search_term.upper()
+            response_data = await afetch_data(f"https://clinicaltrials.gov/api/v2/studies/{nct_id}")
+            if not response_data:
+                return f"No clinical trial found for NCT ID '{nct_id}'."
+            return response_data
+        params = {
+            'query.term': search_term,
+            'format': 'json',
+            'pageSize': 3
+        }
+        response_data = await afetch_data("https://clinicaltrials.gov/api/v2/studies", params=params)
+        if not response_data:
+            return f"Request failed or no results found for '{search_term}' from ClinicalTrials.gov."
+        studies = response_data.get('studies', [])
+        if not studies:
+            return f"No clinical trials found for '{search_term}'."
+        return {"clinical_trials": [_extract_study(study) for study in studies]}
     
 sys_msg =  """
 You are an AI database administrator supported by the Human Phenotype Ontology ,UniProt and NCBI database. 